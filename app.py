@@ -1,7 +1,12 @@
+import os
+
 from flask import Flask, render_template
 from flask_login import LoginManager
 from config import Config
-from models import db, User
+from models import db
+from services.schema_service import upgrade_schema
+from services import identity_service, notification_service
+from commands import register_commands
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -12,15 +17,20 @@ login_manager.login_view = 'auth.login'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return identity_service.load_user(int(user_id))
 
 # Register blueprints
-from routes import auth, books, borrow, admin, reviews
+from routes import auth, books, borrow, admin, reviews, tags, notifications, recommendations
 app.register_blueprint(auth.bp)
 app.register_blueprint(books.bp)
 app.register_blueprint(borrow.bp)
 app.register_blueprint(admin.bp)
 app.register_blueprint(reviews.bp)
+app.register_blueprint(tags.bp)
+app.register_blueprint(notifications.bp)
+app.register_blueprint(recommendations.bp)
+
+register_commands(app)
 
 
 @app.route('/')
@@ -30,5 +40,8 @@ def index():
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        upgrade_schema()
+    # 调试模式下重载器会启动两个进程，只在实际服务的子进程里启动 worker
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        notification_service.start_worker(app)
     app.run(debug=True, port=5000)
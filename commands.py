@@ -0,0 +1,149 @@
+import click
+from flask import current_app
+from services.search_service import rebuild_index
+from services.tag_service import rebuild_tags
+from services.borrow_service import check_borrow_counters
+from services.stats_service import rebuild_stats
+from services.rollup_service import rebuild_rollups
+from services.rating_service import rebuild_ratings
+from services.recommendation_service import rebuild_similarities, refresh_stale
+from services import notification_service, import_service, roster_service, password_service
+
+
+@click.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """重建图书全文索引"""
+    count = rebuild_index()
+    click.echo(f'已为 {count} 本图书重建全文索引')
+
+
+@click.command('rebuild-tags')
+def rebuild_tags_command():
+    """根据图书的标签字段重建标签表"""
+    count = rebuild_tags()
+    click.echo(f'已为 {count} 本图书重建标签')
+
+
+@click.command('check-borrow-counters')
+@click.option('--repair', is_flag=True, help='修复不一致的数据')
+def check_borrow_counters_command(repair):
+    """核对用户持书量和图书当前借阅记录"""
+    mismatches = check_borrow_counters(repair=repair)
+    for kind, obj_id, actual, expected in mismatches:
+        click.echo(f'{kind} {obj_id}: 当前值 {actual}，应为 {expected}')
+    if not mismatches:
+        click.echo('数据一致')
+    elif repair:
+        click.echo(f'已修复 {len(mismatches)} 处不一致')
+
+
+@click.command('rebuild-stats')
+def rebuild_stats_command():
+    """从业务表重新计算看板计数器"""
+    stats = rebuild_stats()
+    for key in sorted(stats):
+        click.echo(f'{key}: {stats[key]}')
+
+
+@click.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """从借阅记录重新生成每日借阅汇总"""
+    count = rebuild_rollups()
+    click.echo(f'已汇总 {count} 次借阅')
+
+
+@click.command('rebuild-ratings')
+def rebuild_ratings_command():
+    """从书评表重新计算图书的评分汇总"""
+    count = rebuild_ratings()
+    click.echo(f'已为 {count} 本图书汇总评分')
+
+
+@click.command('rebuild-recommendations')
+def rebuild_recommendations_command():
+    """根据全部已完成借阅重新计算每本书的相似图书"""
+    count = rebuild_similarities()
+    click.echo(f'已写入 {count} 条相似图书')
+
+
+@click.command('refresh-recommendations')
+def refresh_recommendations_command():
+    """只重算有新借阅或评价的图书及其相关图书，适合定时执行"""
+    count = refresh_stale()
+    click.echo(f'已重算 {count} 本图书的相似图书')
+
+
+@click.command('enqueue-overdue-reminders')
+def enqueue_overdue_reminders_command():
+    """为全部逾期借阅生成提醒通知"""
+    reminded = notification_service.enqueue_overdue_reminders()
+    click.echo(f'已为 {len(reminded)} 条逾期借阅生成提醒')
+
+
+@click.command('notification-worker')
+def notification_worker_command():
+    """在前台运行通知投递 worker，Ctrl+C 退出"""
+    worker = notification_service.NotificationWorker(current_app._get_current_object())
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+@click.command('import-books')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(import_service.FORMATS), help='默认按扩展名判断')
+@click.option('--allow-duplicates', is_flag=True, help='不跳过已存在的 ISBN（同一本书有多册时使用）')
+def import_books_command(path, fmt, allow_duplicates):
+    """从 CSV 或 JSONL 文件批量导入图书"""
+    fmt = import_service.detect_format(path, fmt)
+    if fmt is None:
+        raise click.UsageError('无法识别文件格式，请使用 --format 指定')
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = import_service.import_books(stream, fmt, skip_duplicates=not allow_duplicates)
+    for error in report['errors']:
+        click.echo(f"第 {error['line']} 行：{error['message']}")
+    click.echo(f"共 {report['total']} 行，导入 {report['imported']}，跳过重复 {report['skipped']}，失败 {report['failed']}")
+
+
+@click.command('import-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(import_service.FORMATS), help='默认按扩展名判断')
+def import_users_command(path, fmt):
+    """从花名册（student_id, name, password）批量创建学生账号"""
+    fmt = import_service.detect_format(path, fmt)
+    if fmt is None:
+        raise click.UsageError('无法识别文件格式，请使用 --format 指定')
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = roster_service.import_roster(stream, fmt)
+    for error in report['errors']:
+        click.echo(f"第 {error['line']} 行：{error['message']}")
+    click.echo(f"共 {report['total']} 行，导入 {report['imported']}，跳过 {report['skipped']}，失败 {report['failed']}")
+
+
+@click.command('bench-login')
+@click.option('--method', 'methods', multiple=True, help='要测试的哈希策略，可重复指定')
+@click.option('--rounds', default=10, show_default=True, help='每种策略校验的次数')
+def bench_login_command(methods, rounds):
+    """测量不同密码哈希策略下的登录校验吞吐量"""
+    current = current_app.config['PASSWORD_HASH_METHOD']
+    methods = methods or tuple(dict.fromkeys((current,) + password_service.BENCHMARK_METHODS))
+    for method, per_second in password_service.benchmark(methods, rounds):
+        marker = '（当前）' if method == current else ''
+        click.echo(f'{method:<24} {per_second:8.1f} 次/秒{marker}')
+
+
+def register_commands(app):
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(rebuild_tags_command)
+    app.cli.add_command(check_borrow_counters_command)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(rebuild_ratings_command)
+    app.cli.add_command(rebuild_recommendations_command)
+    app.cli.add_command(refresh_recommendations_command)
+    app.cli.add_command(enqueue_overdue_reminders_command)
+    app.cli.add_command(notification_worker_command)
+    app.cli.add_command(import_books_command)
+    app.cli.add_command(import_users_command)
+    app.cli.add_command(bench_login_command)
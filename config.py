@@ -1,11 +1,51 @@
 import os
+from datetime import timedelta
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///library.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 规则设置的默认值，管理员在设置页修改后以数据库为准
     MAX_BORROW_DAYS = 30
     MAX_BOOKS_PER_USER = 5
+    # 设置缓存多久检查一次版本号（秒）
+    SETTINGS_CACHE_TTL = 5
+    # 登录用户身份缓存的有效期（秒）和最大条数，0 表示不缓存。
+    # 缓存在进程内，命中前核对数据库里的版本号，其他 worker 修改或删除用户后立即失效
+    IDENTITY_CACHE_TTL = 30
+    IDENTITY_CACHE_SIZE = 1024
+    # 密码哈希策略，werkzeug 格式：scrypt:n:r:p 或 pbkdf2:sha256:迭代次数。
+    # 修改后旧密码在用户下次登录成功时自动按新策略重新计算
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    # 勾选"记住我"后，免密登录 cookie 的有效期
+    REMEMBER_COOKIE_DURATION = timedelta(days=30)
+    REMEMBER_COOKIE_HTTPONLY = True
+    REMEMBER_COOKIE_SAMESITE = 'Lax'
+    # 导入花名册时计算密码哈希的进程数，None 表示 CPU 核数
+    ROSTER_HASH_WORKERS = None
+    # 通知投递渠道，可选 inbox（站内信）和 email（经 SMTP 发送）
+    NOTIFICATION_CHANNELS = ['inbox']
+    NOTIFICATION_BATCH_SIZE = 100
+    NOTIFICATION_MAX_ATTEMPTS = 5
+    # 投递失败后第 n 次重试等待 NOTIFICATION_RETRY_BASE * 2^(n-1) 秒
+    NOTIFICATION_RETRY_BASE = 60
+    NOTIFICATION_POLL_INTERVAL = 5
+    # 认领后多久未完成投递（进程退出等）可被其他 worker 重新认领，秒
+    NOTIFICATION_CLAIM_TIMEOUT = 300
+    # 后台 worker 自动生成逾期提醒的间隔（秒），0 表示关闭
+    OVERDUE_REMINDER_INTERVAL = 3600
+    MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'localhost'
+    MAIL_PORT = int(os.environ.get('MAIL_PORT') or 1025)
+    MAIL_SENDER = os.environ.get('MAIL_SENDER') or 'library@localhost'
+    MAIL_ADDRESS_FORMAT = '{student_id}@localhost'
+    # ISBN 查询的数据源，按顺序查询：local（随项目附带的 CSV/JSONL 数据）、openlibrary（需联网）
+    ISBN_PROVIDERS = ['local']
+    ISBN_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'isbn_books.csv')
+    # 查询结果缓存的条数上限，以及查到和查不到时的缓存有效期（秒）
+    ISBN_CACHE_SIZE = 10000
+    ISBN_CACHE_TTL = 30 * 24 * 3600
+    ISBN_NEGATIVE_TTL = 24 * 3600
+    ISBN_LOOKUP_TIMEOUT = 5
 
 class DevelopmentConfig(Config):
     DEBUG = True
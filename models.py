@@ -1,22 +1,46 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from datetime import datetime, timezone
+from services import password_service
 
 db = SQLAlchemy()
 
+# 占用图书、计入个人持书量的借阅状态
+ACTIVE_BORROW_STATUSES = ['approved', 'pending', 'donor_pending', 'return_pending']
+
+
+def split_tags(value):
+    """把逗号分隔的标签字符串拆成去重后的列表（兼容中文逗号）"""
+    if not value:
+        return []
+    tags = []
+    for tag in value.replace('，', ',').split(','):
+        tag = tag.strip()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        # 用户目录按姓名前缀搜索和排序
+        db.Index('ix_users_name', 'name'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.String(20), unique=True, nullable=False)
     name = db.Column(db.String(50), nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
+    # 未结束的借阅数量，由 services/borrow_service.py 的状态流转维护
+    active_borrow_count = db.Column(db.Integer, default=0, nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # 哈希策略统一由 services/password_service.py 决定
+        self.password_hash = password_service.hash_password(password)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -30,59 +54,123 @@ class User(UserMixin, db.Model):
         }
 
 
+book_tags = db.Table(
+    'book_tags',
+    db.Column('book_id', db.Integer, db.ForeignKey('books.id'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'), primary_key=True),
+    db.Index('ix_book_tags_tag_id_book_id', 'tag_id', 'book_id')
+)
+
+
+class Tag(db.Model):
+    __tablename__ = 'tags'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name
+        }
+
+
 class Book(db.Model):
     __tablename__ = 'books'
+    __table_args__ = (
+        db.Index('ix_books_created_at_id', 'created_at', 'id'),
+        db.Index('ix_books_isbn_key', 'isbn_key'),
+        db.Index('ix_books_rating_avg_id', 'rating_avg', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     author = db.Column(db.String(50), nullable=False)
     publisher = db.Column(db.String(100), nullable=False)
     isbn = db.Column(db.String(20))
+    # 规范化的 ISBN（尽量转为 ISBN-13），用于判断重复入库，见 services/isbn_service.py
+    isbn_key = db.Column(db.String(20))
     tags = db.Column(db.String(200))
     source = db.Column(db.String(20), default='class')  # class, donated
     donor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     status = db.Column(db.String(20), default='available')  # available, pending_borrow, borrowed, pending_return, unavailable
+    # 当前占用该书的借阅记录，由 services/borrow_service.py 的状态流转维护
+    current_borrow_record_id = db.Column(db.Integer, nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    # 书评汇总，由 services/rating_service.py 在新增书评时同一事务内累加
+    rating_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+    rating_avg = db.Column(db.Float, default=0, nullable=False)  # 无书评时为 0，排序时排在最后
+    rating_1 = db.Column(db.Integer, default=0, nullable=False)
+    rating_2 = db.Column(db.Integer, default=0, nullable=False)
+    rating_3 = db.Column(db.Integer, default=0, nullable=False)
+    rating_4 = db.Column(db.Integer, default=0, nullable=False)
+    rating_5 = db.Column(db.Integer, default=0, nullable=False)
+    recommend_count = db.Column(db.Integer, default=0, nullable=False)
+    warn_count = db.Column(db.Integer, default=0, nullable=False)
+    neutral_count = db.Column(db.Integer, default=0, nullable=False)
     
     donor = db.relationship('User', foreign_keys=[donor_id])
+    # 规范化后的标签，由 tags 字段在 flush 前同步，见 services/tag_service.py
+    tag_items = db.relationship('Tag', secondary=book_tags, backref=db.backref('books', lazy='dynamic'))
     borrow_records = db.relationship('BorrowRecord', backref='book_record', lazy='dynamic')
     
-    def to_dict(self):
-        # 获取借阅历史
-        borrow_history = []
-        if hasattr(self, 'borrow_records'):
-            borrow_history = [record.to_dict() for record in self.borrow_records]
-
-        # 获取当前借阅记录
-        current_borrow = None
-        if self.status in ['borrowed', 'pending_borrow', 'pending_return']:
-            from sqlalchemy import or_
-            current_record = BorrowRecord.query.filter(
-                BorrowRecord.book_id == self.id,
-                BorrowRecord.status.in_(['approved', 'pending', 'donor_pending', 'return_pending'])
-            ).first()
-            if current_record:
-                current_borrow = current_record.to_dict()
-
+    def to_summary_dict(self):
+        """列表用的精简表示，不包含借阅历史和当前借阅"""
         return {
             'id': self.id,
             'title': self.title,
             'author': self.author,
             'publisher': self.publisher,
             'isbn': self.isbn,
-            'tags': self.tags.split(',') if self.tags else [],
+            'tags': split_tags(self.tags),
             'source': self.source,
             'donor_id': self.donor_id,
             'donor_name': self.donor.name if self.donor else None,
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'borrow_history': borrow_history,
-            'current_borrow': current_borrow
+            'rating': self.rating_summary()
         }
 
+    def rating_summary(self):
+        count = self.rating_count or 0
+        return {
+            'count': count,
+            'average': round(self.rating_avg, 2) if count else None,
+            'histogram': {str(n): getattr(self, f'rating_{n}') or 0 for n in range(1, 6)},
+            'review_types': {
+                'recommend': self.recommend_count or 0,
+                'warn': self.warn_count or 0,
+                'neutral': self.neutral_count or 0,
+            }
+        }
+
+    def to_dict(self):
+        # 获取借阅历史
+        borrow_history = []
+        if hasattr(self, 'borrow_records'):
+            borrow_history = [record.to_dict() for record in self.borrow_records]
+
+        # 获取当前借阅记录
+        current_borrow = None
+        if self.status in ['borrowed', 'pending_borrow', 'pending_return'] and self.current_borrow_record_id:
+            current_record = db.session.get(BorrowRecord, self.current_borrow_record_id)
+            if current_record:
+                current_borrow = current_record.to_dict()
+
+        data = self.to_summary_dict()
+        data['borrow_history'] = borrow_history
+        data['current_borrow'] = current_borrow
+        return data
+
 
 class BorrowRecord(db.Model):
     __tablename__ = 'borrow_records'
+    __table_args__ = (
+        db.Index('ix_borrow_records_status_due_at', 'status', 'due_at'),
+        db.Index('ix_borrow_records_borrower_id_status', 'borrower_id', 'status'),
+        db.Index('ix_borrow_records_book_id_approve_at', 'book_id', 'approve_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     book_id = db.Column(db.Integer, db.ForeignKey('books.id'), nullable=False)
@@ -91,6 +179,7 @@ class BorrowRecord(db.Model):
     request_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     approve_at = db.Column(db.DateTime, nullable=True)
     return_at = db.Column(db.DateTime, nullable=True)
+    due_at = db.Column(db.DateTime, nullable=True)  # 批准时按最大借阅天数计算，设置修改后重算
     
     book = db.relationship('Book', overlaps='borrow_records')
     borrower = db.relationship('User', foreign_keys=[borrower_id])
@@ -107,6 +196,7 @@ class BorrowRecord(db.Model):
             'request_at': self.request_at.isoformat() if self.request_at else None,
             'approve_at': self.approve_at.isoformat() if self.approve_at else None,
             'return_at': self.return_at.isoformat() if self.return_at else None,
+            'due_at': self.due_at.isoformat() if self.due_at else None,
             'created_at': self.request_at.isoformat() if self.request_at else None,
             'updated_at': self.return_at.isoformat() if self.return_at else (self.approve_at.isoformat() if self.approve_at else self.request_at.isoformat())
         }
@@ -152,6 +242,10 @@ class Setting(db.Model):
 
 class BookReview(db.Model):
     __tablename__ = 'book_reviews'
+    __table_args__ = (
+        db.Index('ix_book_reviews_book_id_created_at', 'book_id', 'created_at'),
+        db.Index('ix_book_reviews_created_at_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     book_id = db.Column(db.Integer, db.ForeignKey('books.id'), nullable=False)
@@ -180,6 +274,11 @@ class BookReview(db.Model):
 
 class WishList(db.Model):
     __tablename__ = 'wish_lists'
+    __table_args__ = (
+        db.Index('ix_wish_lists_status_isbn13', 'status', 'isbn13'),
+        db.Index('ix_wish_lists_status_title_key', 'status', 'title_key'),
+        db.Index('ix_wish_lists_status_demand_key_user_id', 'status', 'demand_key', 'user_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -190,6 +289,14 @@ class WishList(db.Model):
     reason = db.Column(db.Text)  # 想看的原因
     status = db.Column(db.String(20), default='pending')  # pending, fulfilled, rejected
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    # 匹配键，由书名、作者、ISBN 在 flush 前生成，见 services/wishlist_service.py
+    isbn13 = db.Column(db.String(13))
+    title_key = db.Column(db.String(100))
+    author_key = db.Column(db.String(50))
+    # 同一本书的心愿聚合在一起：有 ISBN 时按 ISBN，否则按书名 + 作者
+    demand_key = db.Column(db.String(160))
+    # 自动匹配时满足该心愿的图书
+    fulfilled_book_id = db.Column(db.Integer, db.ForeignKey('books.id'), nullable=True)
 
     user = db.relationship('User')
 
@@ -204,6 +311,7 @@ class WishList(db.Model):
             'isbn': self.isbn,
             'reason': self.reason,
             'status': self.status,
+            'fulfilled_book_id': self.fulfilled_book_id,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -239,3 +347,121 @@ class DonationRequest(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+
+
+class DashboardStat(db.Model):
+    """看板计数器，随各状态变化在同一事务内增减，见 services/stats_service.py"""
+    __tablename__ = 'dashboard_stats'
+
+    key = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+
+
+class BorrowDailyBook(db.Model):
+    """每本书每天的借出次数（按审批通过日期），用于热门图书榜"""
+    __tablename__ = 'borrow_daily_books'
+
+    day = db.Column(db.Date, primary_key=True)
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id'), primary_key=True)
+    borrow_count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class BorrowDailyUser(db.Model):
+    """每位学生每天的借阅次数，用于阅读排行榜"""
+    __tablename__ = 'borrow_daily_users'
+
+    day = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    borrow_count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class BorrowDailyTrend(db.Model):
+    """每天的借出和归还数量，用于趋势图"""
+    __tablename__ = 'borrow_daily_trends'
+
+    day = db.Column(db.Date, primary_key=True)
+    borrows = db.Column(db.Integer, default=0, nullable=False)
+    returns = db.Column(db.Integer, default=0, nullable=False)
+
+
+class Notification(db.Model):
+    """通知发件箱：先落库再由后台 worker 按渠道投递，见 services/notification_service.py"""
+    __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_status_next_attempt_at', 'status', 'next_attempt_at'),
+        db.Index('ix_notifications_user_id_channel_read_at', 'user_id', 'channel', 'read_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    channel = db.Column(db.String(20), nullable=False, default='inbox')  # inbox, email
+    kind = db.Column(db.String(30), nullable=False)  # overdue_reminder
+    title = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text)
+    # 同一条提醒只入队一次，例如 overdue:<借阅记录>:<日期>:<渠道>
+    dedupe_key = db.Column(db.String(100), unique=True)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    last_error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sent_at = db.Column(db.DateTime, nullable=True)
+    read_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'title': self.title,
+            'body': self.body,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'read': self.read_at is not None
+        }
+
+
+class BookSimilarity(db.Model):
+    """每本书最相似的若干本书（共同借阅的余弦相似度），由 services/recommendation_service.py 离线计算"""
+    __tablename__ = 'book_similarities'
+    __table_args__ = (
+        db.Index('ix_book_similarities_book_id_score', 'book_id', 'score'),
+    )
+
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id'), primary_key=True)
+    similar_book_id = db.Column(db.Integer, db.ForeignKey('books.id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+
+
+class StaleSimilarity(db.Model):
+    """借阅数据有变化、相似列表待重新计算的图书"""
+    __tablename__ = 'stale_similarities'
+
+    book_id = db.Column(db.Integer, primary_key=True)
+
+
+class IsbnCache(db.Model):
+    """ISBN 查询结果缓存，found 为 False 表示各数据源都查不到（负缓存）"""
+    __tablename__ = 'isbn_cache'
+    __table_args__ = (
+        db.Index('ix_isbn_cache_last_used_at', 'last_used_at'),
+    )
+
+    isbn13 = db.Column(db.String(13), primary_key=True)
+    found = db.Column(db.Boolean, nullable=False)
+    title = db.Column(db.String(100))
+    author = db.Column(db.String(50))
+    publisher = db.Column(db.String(100))
+    tags = db.Column(db.String(200))
+    provider = db.Column(db.String(20))
+    fetched_at = db.Column(db.DateTime, nullable=False)
+    # 最近一次被查询的时间，超出容量时按它淘汰最久未用的条目
+    last_used_at = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        if not self.found:
+            return None
+        return {
+            'title': self.title,
+            'author': self.author,
+            'publisher': self.publisher,
+            'tags': split_tags(self.tags),
+        }
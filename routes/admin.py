@@ -1,6 +1,14 @@
-from flask import Blueprint, request, jsonify
+import io
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_login import login_required, current_user
-from models import User, Book, BorrowRecord, Setting, DonationRequest, db
+from models import User, BorrowRecord, db
+from services.serializers import serialize_borrow_records, parse_fields
+from services.pagination import keyset_paginate, parse_limit, InvalidCursor
+from services import borrow_service, settings_service, identity_service, stats_service
+from services import rollup_service, overdue_service, notification_service, export_service, roster_service
+from services import user_service
+from services.import_service import detect_format
 from datetime import datetime, timezone
 
 bp = Blueprint('admin', __name__, url_prefix='/api/admin')
@@ -19,7 +27,8 @@ def get_all_borrows():
         query = query.filter_by(status=status)
 
     records = query.order_by(BorrowRecord.request_at.desc()).all()
-    return jsonify({'success': True, 'records': [r.to_dict() for r in records]})
+    fields = parse_fields(request.args.get('fields'))
+    return jsonify({'success': True, 'records': serialize_borrow_records(records, fields)})
 
 
 @bp.route('/borrows/<int:record_id>/approve', methods=['PUT'])
@@ -29,16 +38,8 @@ def approve_borrow(record_id):
         return jsonify({'success': False, 'message': '权限不足'}), 403
 
     record = BorrowRecord.query.get_or_404(record_id)
-
-    if record.status != 'pending':
-        return jsonify({'success': False, 'message': '当前状态不可通过'}), 400
-
-    record.status = 'approved'
-    record.approve_at = datetime.now(timezone.utc)
-    record.book.status = 'borrowed'
-
-    db.session.commit()
-    return jsonify({'success': True, 'record': record.to_dict()})
+    result, status_code = borrow_service.transition(record, 'approve')
+    return jsonify(result), status_code
 
 
 @bp.route('/borrows/<int:record_id>/reject', methods=['PUT'])
@@ -48,15 +49,8 @@ def reject_borrow(record_id):
         return jsonify({'success': False, 'message': '权限不足'}), 403
 
     record = BorrowRecord.query.get_or_404(record_id)
-
-    if record.status not in ['pending', 'donor_pending']:
-        return jsonify({'success': False, 'message': '当前状态不可拒绝'}), 400
-
-    record.status = 'rejected'
-    record.book.status = 'available'
-
-    db.session.commit()
-    return jsonify({'success': True})
+    result, status_code = borrow_service.transition(record, 'reject')
+    return jsonify(result), status_code
 
 
 @bp.route('/borrows/<int:record_id>/confirm-return', methods=['PUT'])
@@ -66,16 +60,55 @@ def confirm_return(record_id):
         return jsonify({'success': False, 'message': '权限不足'}), 403
 
     record = BorrowRecord.query.get_or_404(record_id)
+    result, status_code = borrow_service.transition(record, 'confirm_return')
+    return jsonify(result), status_code
 
-    if record.status != 'return_pending':
-        return jsonify({'success': False, 'message': '当前状态不可确认归还'}), 400
 
-    record.status = 'completed'
-    record.return_at = datetime.now(timezone.utc)
-    record.book.status = 'available'
+# 批量操作单次最多处理的记录数
+MAX_BULK_RECORDS = 500
+
+
+def _bulk_transition(action):
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    data = request.get_json(silent=True) or {}
+    record_ids = data.get('record_ids')
+    if not isinstance(record_ids, list) or not record_ids:
+        return jsonify({'success': False, 'message': '请选择要处理的记录'}), 400
+    if len(record_ids) > MAX_BULK_RECORDS:
+        return jsonify({'success': False, 'message': f'单次最多处理{MAX_BULK_RECORDS}条记录'}), 400
+    try:
+        record_ids = [int(i) for i in record_ids]
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': '无效的记录编号'}), 400
+
+    results = borrow_service.bulk_transition(record_ids, action)
+    succeeded = sum(1 for r in results if r['success'])
+    return jsonify({
+        'success': True,
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results
+    })
+
+
+@bp.route('/borrows/bulk-approve', methods=['PUT'])
+@login_required
+def bulk_approve_borrows():
+    return _bulk_transition('approve')
 
-    db.session.commit()
-    return jsonify({'success': True, 'record': record.to_dict()})
+
+@bp.route('/borrows/bulk-reject', methods=['PUT'])
+@login_required
+def bulk_reject_borrows():
+    return _bulk_transition('reject')
+
+
+@bp.route('/borrows/bulk-confirm-return', methods=['PUT'])
+@login_required
+def bulk_confirm_returns():
+    return _bulk_transition('confirm_return')
 
 
 @bp.route('/users', methods=['GET'])
@@ -84,8 +117,37 @@ def get_users():
     if not current_user.is_admin:
         return jsonify({'success': False, 'message': '权限不足'}), 403
 
-    users = User.query.all()
-    return jsonify({'success': True, 'users': [u.to_dict() for u in users]})
+    args = request.args
+    if not any(args.get(k) for k in ('limit', 'cursor', 'q', 'sort')):
+        users = User.query.all()
+        return jsonify({'success': True, 'users': [u.to_dict() for u in users]})
+
+    # 分页目录：q 按学号或姓名前缀搜索，sort/order 指定排序
+    sort = args.get('sort', 'student_id')
+    direction = args.get('order', 'asc')
+    if sort not in user_service.SORTS or direction not in ('asc', 'desc'):
+        return jsonify({'success': False, 'message': '无效的排序方式'}), 400
+
+    query, sort_column = user_service.directory_query(args.get('q'), sort)
+    total = query.order_by(None).count() if args.get('with_total') else None
+    try:
+        rows, next_cursor = keyset_paginate(
+            query,
+            [(sort_column, direction), (User.id, direction)],
+            cursor=args.get('cursor'),
+            limit=parse_limit(args.get('limit'))
+        )
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '无效的分页游标'}), 400
+
+    response = jsonify({
+        'success': True,
+        'users': [user_service.directory_entry(user, total_borrows) for user, total_borrows in rows],
+        'next_cursor': next_cursor
+    })
+    if total is not None:
+        response.headers['X-Total-Count'] = str(total)
+    return response
 
 
 @bp.route('/users', methods=['POST'])
@@ -107,11 +169,38 @@ def create_user():
     user.set_password(data.get('password', '123456'))
 
     db.session.add(user)
+    if not user.is_admin:
+        stats_service.students_added(1)
+    db.session.flush()
+    identity_service.invalidate(user.id)
     db.session.commit()
 
     return jsonify({'success': True, 'user': user.to_dict()}), 201
 
 
+@bp.route('/users/import', methods=['POST'])
+@login_required
+def import_users():
+    """批量导入学生花名册：CSV 或 JSONL，列为 student_id, name, password（可省略）"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'success': False, 'message': '请上传文件'}), 400
+    fmt = detect_format(upload.filename, request.form.get('format'))
+    if fmt is None:
+        return jsonify({'success': False, 'message': '仅支持 CSV 或 JSONL 文件'}), 400
+
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    try:
+        report = roster_service.import_roster(stream, fmt)
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': '文件必须是 UTF-8 编码'}), 400
+    return jsonify({'success': True, 'report': report})
+
+
 @bp.route('/users/<int:user_id>', methods=['DELETE'])
 @login_required
 def delete_user(user_id):
@@ -121,15 +210,13 @@ def delete_user(user_id):
     user = User.query.get_or_404(user_id)
 
     # 检查是否有未还图书
-    has_borrow = BorrowRecord.query.filter(
-        BorrowRecord.borrower_id == user_id,
-        BorrowRecord.status.in_(['approved', 'pending', 'donor_pending', 'return_pending'])
-    ).first()
-
-    if has_borrow:
+    if user.active_borrow_count:
         return jsonify({'success': False, 'message': '该用户有未还图书，无法删除'}), 400
 
     db.session.delete(user)
+    if not user.is_admin:
+        stats_service.students_added(-1)
+    identity_service.invalidate(user_id)
     db.session.commit()
 
     return jsonify({'success': True})
@@ -141,42 +228,21 @@ def get_dashboard():
     if not current_user.is_admin:
         return jsonify({'success': False, 'message': '权限不足'}), 403
 
-    # 基础统计
-    total_books = Book.query.count()
-    available_books = Book.query.filter_by(status='available').count()
-    borrowed_books = Book.query.filter_by(status='borrowed').count()
-    total_users = User.query.filter_by(is_admin=False).count()
+    # 基础统计，来自随状态变化增量维护的计数器
+    counters = stats_service.get_stats()
+    total_books = counters.get('books.total', 0)
+    available_books = counters.get('books.status.available', 0)
+    borrowed_books = counters.get('books.status.borrowed', 0)
+    total_users = counters.get('users.students', 0)
 
     # 待审核数量（借阅申请 + 归还申请 + 捐赠申请）
-    pending_borrows = BorrowRecord.query.filter(BorrowRecord.status.in_(['pending', 'donor_pending'])).count()
-    pending_returns = BorrowRecord.query.filter_by(status='return_pending').count()
-    pending_donations = DonationRequest.query.filter_by(status='pending').count()
+    pending_borrows = counters.get('borrows.status.pending', 0) + counters.get('borrows.status.donor_pending', 0)
+    pending_returns = counters.get('borrows.status.return_pending', 0)
+    pending_donations = counters.get('donations.status.pending', 0)
     pending_reviews = pending_borrows + pending_returns + pending_donations
 
-    # 热门图书榜（借阅次数最多的书）
-    from sqlalchemy import func
-    popular_books = db.session.query(
-        Book.title,
-        func.count(BorrowRecord.id).label('borrow_count')
-    ).join(BorrowRecord).group_by(Book.id).order_by(func.count(BorrowRecord.id).desc()).limit(10).all()
-
-    # 班级阅读排行榜（借阅最多的学生）
-    top_readers = db.session.query(
-        User.name,
-        func.count(BorrowRecord.id).label('read_count')
-    ).join(BorrowRecord).filter(User.is_admin == False).group_by(User.id).order_by(func.count(BorrowRecord.id).desc()).limit(10).all()
-
-    # 逾期列表（已批准借阅且超过最大借阅天数）
-    max_days_setting = Setting.query.filter_by(key='max_borrow_days').first()
-    max_days = int(max_days_setting.value) if max_days_setting else 30
-
-    from datetime import timedelta
-    overdue_threshold = datetime.now(timezone.utc) - timedelta(days=max_days)
-
-    overdue_records = BorrowRecord.query.filter(
-        BorrowRecord.status == 'approved',
-        BorrowRecord.approve_at < overdue_threshold
-    ).all()
+    # 热门图书榜和班级阅读排行榜，读取日汇总表
+    boards = rollup_service.leaderboards()
 
     return jsonify({
         'success': True,
@@ -190,27 +256,86 @@ def get_dashboard():
             'pending_returns': pending_returns,
             'pending_donations': pending_donations
         },
-        'popular_books': [{'title': b.title, 'count': b.borrow_count} for b in popular_books],
-        'top_readers': [{'name': r.name, 'count': r.read_count} for r in top_readers],
-        'overdue': [r.to_dict() for r in overdue_records]
+        'popular_books': boards['popular_books'],
+        'top_readers': boards['top_readers']
     })
 
 
-@bp.route('/settings', methods=['GET'])
+@bp.route('/leaderboards', methods=['GET'])
 @login_required
-def get_settings():
+def get_leaderboards():
+    """热门图书榜和阅读排行榜：window=7/30/90 天、term=2026-spring 或 start/end"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    date_range = rollup_service.resolve_range(
+        window=request.args.get('window'),
+        term=request.args.get('term'),
+        start=request.args.get('start'),
+        end=request.args.get('end')
+    )
+    if date_range is None:
+        return jsonify({'success': False, 'message': '无效的时间范围'}), 400
+
+    limit = request.args.get('limit', 10, type=int)
+    boards = rollup_service.leaderboards(*date_range, limit=max(1, min(limit, 100)))
+    return jsonify({'success': True, **boards})
+
+
+@bp.route('/trends', methods=['GET'])
+@login_required
+def get_trends():
+    """每日借出/归还趋势，默认最近 30 天"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    term = request.args.get('term')
+    start = request.args.get('start')
+    end = request.args.get('end')
+    window = request.args.get('window') or (None if term or start or end else 30)
+
+    date_range = rollup_service.resolve_range(window=window, term=term, start=start, end=end)
+    if date_range is None or None in date_range or (date_range[1] - date_range[0]).days > 731:
+        return jsonify({'success': False, 'message': '无效的时间范围'}), 400
+
+    return jsonify({'success': True, 'trend': rollup_service.trend(*date_range)})
+
+
+@bp.route('/export/<kind>', methods=['GET'])
+@login_required
+def export(kind):
+    """流式导出借阅记录、图书目录或书评：format=csv|ndjson，start/end 按日期过滤（含 end 当天）"""
     if not current_user.is_admin:
         return jsonify({'success': False, 'message': '权限不足'}), 403
+    if kind not in export_service.EXPORTS:
+        return jsonify({'success': False, 'message': '不支持的导出类型'}), 404
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export_service.FORMATS:
+        return jsonify({'success': False, 'message': '仅支持 csv 或 ndjson 格式'}), 400
+    date_range = rollup_service.resolve_range(start=request.args.get('start'), end=request.args.get('end'))
+    if date_range is None:
+        return jsonify({'success': False, 'message': '无效的时间范围'}), 400
+
+    result = export_service.export_result(kind, *date_range)
+    # content_type 原样作为响应头；mimetype 遇到 text/* 会被 Werkzeug 再追加一次 charset
+    if fmt == 'csv':
+        body, content_type = export_service.iter_csv(result), 'text/csv; charset=utf-8'
+    else:
+        body, content_type = export_service.iter_ndjson(result), 'application/x-ndjson; charset=utf-8'
 
-    settings = Setting.query.all()
-    result = {s.key: s.value for s in settings}
+    filename = f"{kind}-{datetime.now(timezone.utc):%Y%m%d}.{fmt}"
+    return Response(stream_with_context(body), content_type=content_type,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
-    # 默认值
-    if 'max_borrow_days' not in result:
-        result['max_borrow_days'] = '30'
-    if 'max_books_per_user' not in result:
-        result['max_books_per_user'] = '5'
 
+@bp.route('/settings', methods=['GET'])
+@login_required
+def get_settings():
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    result = {key: str(value) for key, value in settings_service.get_all().items()}
     return jsonify({'success': True, 'settings': result})
 
 
@@ -221,17 +346,49 @@ def update_settings():
         return jsonify({'success': False, 'message': '权限不足'}), 403
 
     data = request.get_json()
+    settings_service.update(data)
+    return jsonify({'success': True})
 
-    for key, value in data.items():
-        setting = Setting.query.filter_by(key=key).first()
-        if setting:
-            setting.value = str(value)
-        else:
-            setting = Setting(key=key, value=str(value))
-            db.session.add(setting)
 
-    db.session.commit()
-    return jsonify({'success': True})
+@bp.route('/cache/stats', methods=['GET'])
+@login_required
+def get_cache_stats():
+    """查看身份缓存和设置缓存的命中情况"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    return jsonify({
+        'success': True,
+        'identity': identity_service.cache_stats(),
+        'settings': settings_service.cache_stats()
+    })
+
+
+@bp.route('/overdue', methods=['GET'])
+@login_required
+def get_overdue():
+    """逾期未还列表，按应还日期分页；bucket=1-7/8-14/15-30/30+ 按逾期天数筛选"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    try:
+        page = overdue_service.overdue_page(
+            bucket=request.args.get('bucket') or None,
+            cursor=request.args.get('cursor'),
+            limit=parse_limit(request.args.get('limit'))
+        )
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '无效的分页游标'}), 400
+    if page is None:
+        return jsonify({'success': False, 'message': '无效的逾期分段'}), 400
+
+    records, next_cursor = page
+    return jsonify({
+        'success': True,
+        'records': records,
+        'next_cursor': next_cursor,
+        'buckets': overdue_service.bucket_counts()
+    })
 
 
 @bp.route('/overdue/send-reminder', methods=['POST'])
@@ -241,25 +398,22 @@ def send_overdue_reminder():
     if not current_user.is_admin:
         return jsonify({'success': False, 'message': '权限不足'}), 403
 
-    data = request.get_json()
-    record_ids = data.get('record_ids', [])
-
-    if not record_ids:
+    data = request.get_json(silent=True) or {}
+    record_ids = data.get('record_ids')
+    if not isinstance(record_ids, list) or not record_ids:
         return jsonify({'success': False, 'message': '请选择要提醒的记录'}), 400
+    if len(record_ids) > MAX_BULK_RECORDS:
+        return jsonify({'success': False, 'message': f'单次最多处理{MAX_BULK_RECORDS}条记录'}), 400
+    try:
+        record_ids = [int(i) for i in record_ids]
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': '无效的记录编号'}), 400
 
-    # 在本地系统中标记已发送提醒
-    reminder_sent = []
-    for record_id in record_ids:
-        record = BorrowRecord.query.get(record_id)
-        if record and record.status == 'approved':
-            reminder_sent.append({
-                'record_id': record_id,
-                'borrower_name': record.borrower.name if record.borrower else None,
-                'book_title': record.book.title if record.book else None
-            })
+    # 写入通知发件箱，由后台 worker 投递
+    reminder_sent = notification_service.enqueue_overdue_reminders(record_ids)
 
     return jsonify({
         'success': True,
-        'message': f'已向 {len(reminder_sent)} 位用户发送提醒',
+        'message': f'已为 {len(reminder_sent)} 条借阅生成提醒',
         'reminder_sent': reminder_sent
     })
@@ -1,6 +1,7 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, session
 from flask_login import login_user, logout_user, login_required, current_user
 from models import User, db
+from services import identity_service, password_service
 
 bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -13,8 +14,19 @@ def login():
 
     user = User.query.filter_by(student_id=student_id).first()
 
-    if user and user.check_password(password):
-        login_user(user)
+    verified, rehashed = password_service.verify_and_update(user, password) if user else (False, False)
+    if verified:
+        # 哈希策略变化时 verify_and_update 会更新密码哈希，只有这时才需要写库
+        if rehashed:
+            db.session.commit()
+        # 重新登录时刷新身份缓存
+        identity_service.forget(user.id)
+        # 记住我：写入长期 cookie，会话过期后由 Flask-Login 免密恢复登录
+        remember = bool(data.get('remember'))
+        login_user(user, remember=remember)
+        if not remember and current_app.config.get('REMEMBER_COOKIE_NAME', 'remember_token') in request.cookies:
+            # 共用电脑上删掉上一个用户留下的记住我 cookie，否则会话过期后会恢复成那个用户
+            session['_remember'] = 'clear'
         return jsonify({'success': True, 'user': user.to_dict()})
 
     return jsonify({'success': False, 'message': '学号或密码错误'}), 401
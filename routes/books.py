@@ -1,38 +1,144 @@
+import io
+from datetime import datetime, timedelta
+
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from models import Book, db
+from services.pagination import keyset_paginate, order_clauses, parse_limit, InvalidCursor
+from services.serializers import serialize_books, parse_fields
+from services.search_service import ranked_matches
+from services.tag_service import filter_by_tag, tagged_book_ids
+from services.facet_service import catalog_facets, parse_facets
+from services import stats_service, import_service, wishlist_service, isbn_service
 
 bp = Blueprint('books', __name__, url_prefix='/api/books')
 
 
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+
 @bp.route('', methods=['GET'])
 def get_books():
     query = Book.query
+    order_by = [(Book.created_at, 'desc'), (Book.id, 'desc')]
 
-    # 搜索过滤
+    # 搜索过滤：优先走全文索引并按相关度排序，索引不可用时退回 LIKE
     keyword = request.args.get('keyword')
-    if keyword:
+    matches = ranked_matches(keyword) if keyword else None
+    if matches is not None:
+        query = query.join(matches, matches.c.rowid == Book.id)
+        order_by = [(matches.c.rank, 'asc'), (Book.id, 'asc')]
+    elif keyword:
         query = query.filter(
             db.or_(
                 Book.title.contains(keyword),
                 Book.author.contains(keyword),
-                Book.tags.contains(keyword)
+                Book.id.in_(tagged_book_ids(keyword))
             )
         )
 
-    # 状态过滤
+    # 标签精确过滤
+    tag = request.args.get('tag')
+    if tag:
+        query = filter_by_tag(query, tag)
+
+    # 状态、来源过滤
     status = request.args.get('status')
     if status:
         query = query.filter_by(status=status)
+    source = request.args.get('source')
+    if source:
+        query = query.filter_by(source=source)
+
+    # 录入日期过滤：created_from / created_to 为 YYYY-MM-DD，包含两端当天
+    try:
+        created_from = _parse_date(request.args.get('created_from'))
+        created_to = _parse_date(request.args.get('created_to'))
+    except ValueError:
+        return jsonify({'success': False, 'message': '无效的日期'}), 400
+    if created_from:
+        query = query.filter(Book.created_at >= created_from)
+    if created_to:
+        query = query.filter(Book.created_at < created_to + timedelta(days=1))
+
+    # 评分过滤与排序：使用图书上的评分汇总列和 (rating_avg, id) 索引
+    min_rating = request.args.get('min_rating')
+    if min_rating:
+        try:
+            query = query.filter(Book.rating_avg >= float(min_rating))
+        except ValueError:
+            return jsonify({'success': False, 'message': '无效的评分'}), 400
+    sort = request.args.get('sort')
+    if sort == 'rating':
+        order_by = [(Book.rating_avg, 'desc'), (Book.id, 'desc')]
+    elif sort:
+        return jsonify({'success': False, 'message': '无效的排序方式'}), 400
+
+    # summary 视图不返回借阅历史，适合列表页；fields 只返回指定字段
+    view = request.args.get('view', 'full')
+    fields = parse_fields(request.args.get('fields'))
+
+    total = query.order_by(None).count() if request.args.get('with_total') else None
+    facets = parse_facets(request.args.get('facets'))
+
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit or cursor:
+        try:
+            books, next_cursor = keyset_paginate(
+                query,
+                order_by,
+                cursor=cursor,
+                limit=parse_limit(limit)
+            )
+        except InvalidCursor:
+            return jsonify({'success': False, 'message': '无效的分页游标'}), 400
+        result = {
+            'success': True,
+            'books': serialize_books(books, fields, view),
+            'next_cursor': next_cursor
+        }
+    else:
+        books = query.order_by(*order_clauses(order_by)).all()
+        result = {'success': True, 'books': serialize_books(books, fields, view)}
+
+    # 分面统计与列表使用同一过滤条件
+    if facets:
+        result['facets'] = catalog_facets(query, facets)
+
+    response = jsonify(result)
+    if total is not None:
+        response.headers['X-Total-Count'] = str(total)
+    return response
+
+
+@bp.route('/isbn/<isbn>', methods=['GET'])
+@login_required
+def lookup_isbn(isbn):
+    """按 ISBN 查询书名、作者、出版社，用于入库和捐赠时自动补全"""
+    result = isbn_service.lookup([isbn])[0]
+    if not result['valid']:
+        return jsonify({'success': False, 'message': '无效的 ISBN'}), 400
+    return jsonify({'success': True, **result})
 
-    books = query.order_by(Book.created_at.desc()).all()
-    return jsonify({'success': True, 'books': [b.to_dict() for b in books]})
+
+@bp.route('/isbn', methods=['POST'])
+@login_required
+def lookup_isbns():
+    """批量查询 ISBN：{"isbns": [...]}，结果与输入顺序一致，无效或查不到的也会列出"""
+    isbns = (request.get_json(silent=True) or {}).get('isbns')
+    if not isinstance(isbns, list) or not all(isinstance(isbn, str) for isbn in isbns):
+        return jsonify({'success': False, 'message': '请提供 ISBN 列表'}), 400
+    if len(isbns) > isbn_service.MAX_BATCH:
+        return jsonify({'success': False, 'message': f'一次最多查询 {isbn_service.MAX_BATCH} 个 ISBN'}), 400
+    return jsonify({'success': True, 'results': isbn_service.lookup(isbns)})
 
 
 @bp.route('/<int:book_id>', methods=['GET'])
 def get_book(book_id):
     book = Book.query.get_or_404(book_id)
-    return jsonify({'success': True, 'book': book.to_dict()})
+    return jsonify({'success': True, 'book': serialize_books([book])[0]})
 
 
 @bp.route('', methods=['POST'])
@@ -55,9 +161,32 @@ def create_book():
     )
 
     db.session.add(book)
+    stats_service.book_added(book.status)
+    db.session.flush()
+    fulfilled = wishlist_service.fulfil_matching([book])
     db.session.commit()
 
-    return jsonify({'success': True, 'book': book.to_dict()}), 201
+    return jsonify({'success': True, 'book': book.to_dict(), 'fulfilled_wishes': fulfilled}), 201
+
+
+@bp.route('/import', methods=['POST'])
+@login_required
+def import_books():
+    """批量入库：上传 CSV 或 JSONL 文件，逐行校验，按 ISBN 去重后分块写入"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'success': False, 'message': '请上传文件'}), 400
+    fmt = import_service.detect_format(upload.filename, request.form.get('format'))
+    if fmt is None:
+        return jsonify({'success': False, 'message': '仅支持 CSV 或 JSONL 文件'}), 400
+
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    report = import_service.import_books(
+        stream, fmt, skip_duplicates=request.form.get('allow_duplicates') != '1')
+    return jsonify({'success': True, 'report': report})
 
 
 @bp.route('/<int:book_id>', methods=['PUT'])
@@ -88,7 +217,9 @@ def update_book_status(book_id):
     book = Book.query.get_or_404(book_id)
     data = request.get_json()
 
+    old_status = book.status
     book.status = data.get('status', book.status)
+    stats_service.book_status_changed(old_status, book.status)
     db.session.commit()
 
     return jsonify({'success': True, 'book': book.to_dict()})
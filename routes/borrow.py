@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import BorrowRecord, DonorConfirm, db
-from services.borrow_service import request_borrow
+from models import BorrowRecord, DonorConfirm
+from services import borrow_service
+from services.serializers import serialize_borrow_records
 
 bp = Blueprint('borrow', __name__, url_prefix='/api')
 
@@ -11,7 +12,7 @@ bp = Blueprint('borrow', __name__, url_prefix='/api')
 def get_my_borrows():
     records = BorrowRecord.query.filter_by(borrower_id=current_user.id)\
         .order_by(BorrowRecord.request_at.desc()).all()
-    return jsonify({'success': True, 'records': [r.to_dict() for r in records]})
+    return jsonify({'success': True, 'records': serialize_borrow_records(records)})
 
 
 @bp.route('/borrows', methods=['POST'])
@@ -20,7 +21,7 @@ def create_borrow():
     data = request.get_json()
     book_id = data.get('book_id')
 
-    result, status_code = request_borrow(book_id, current_user.id)
+    result, status_code = borrow_service.request_borrow(book_id, current_user.id)
     return jsonify(result), status_code
 
 
@@ -32,14 +33,8 @@ def request_return(record_id):
     if record.borrower_id != current_user.id:
         return jsonify({'success': False, 'message': '权限不足'}), 403
 
-    if record.status != 'approved':
-        return jsonify({'success': False, 'message': '当前状态不可归还'}), 400
-
-    record.status = 'return_pending'
-    record.book.status = 'pending_return'
-    db.session.commit()
-
-    return jsonify({'success': True, 'record': record.to_dict()})
+    result, status_code = borrow_service.transition(record, 'request_return')
+    return jsonify(result), status_code
 
 
 @bp.route('/donor/confirms', methods=['GET'])
@@ -70,14 +65,8 @@ def approve_donor_confirm(confirm_id):
     if confirm.donor_id != current_user.id:
         return jsonify({'success': False, 'message': '权限不足'}), 403
 
-    confirm.status = 'approved'
-    confirm.confirmed_at = db.func.now()
-
-    # 捐赠者同意后，借阅记录变为待管理员审核
-    confirm.borrow_record.status = 'pending'
-
-    db.session.commit()
-    return jsonify({'success': True})
+    result, status_code = borrow_service.resolve_donor_confirm(confirm, approve=True)
+    return jsonify(result), status_code
 
 
 @bp.route('/donor/confirms/<int:confirm_id>/reject', methods=['PUT'])
@@ -88,13 +77,5 @@ def reject_donor_confirm(confirm_id):
     if confirm.donor_id != current_user.id:
         return jsonify({'success': False, 'message': '权限不足'}), 403
 
-    confirm.status = 'rejected'
-    confirm.confirmed_at = db.func.now()
-
-    # 捐赠者拒绝后，借阅记录被拒绝，图书恢复可借
-    record = confirm.borrow_record
-    record.status = 'rejected'
-    record.book.status = 'available'
-
-    db.session.commit()
-    return jsonify({'success': True})
+    result, status_code = borrow_service.resolve_donor_confirm(confirm, approve=False)
+    return jsonify(result), status_code
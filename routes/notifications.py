@@ -0,0 +1,50 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from models import Notification
+from services import notification_service
+from services.pagination import keyset_paginate, parse_limit, InvalidCursor
+
+bp = Blueprint('notifications', __name__, url_prefix='/api/notifications')
+
+
+@bp.route('', methods=['GET'])
+@login_required
+def get_notifications():
+    """我的站内信，unread=1 时只返回未读，按时间倒序分页"""
+    query = notification_service.inbox_query(current_user.id, unread_only=request.args.get('unread') == '1')
+    try:
+        notifications, next_cursor = keyset_paginate(
+            query,
+            order_by=[(Notification.id, 'desc')],
+            cursor=request.args.get('cursor'),
+            limit=parse_limit(request.args.get('limit'))
+        )
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '无效的分页游标'}), 400
+
+    return jsonify({
+        'success': True,
+        'notifications': [n.to_dict() for n in notifications],
+        'next_cursor': next_cursor,
+        'unread_count': notification_service.unread_count(current_user.id)
+    })
+
+
+@bp.route('/unread-count', methods=['GET'])
+@login_required
+def get_unread_count():
+    return jsonify({'success': True, 'unread_count': notification_service.unread_count(current_user.id)})
+
+
+@bp.route('/<int:notification_id>/read', methods=['PUT'])
+@login_required
+def mark_read(notification_id):
+    notification_service.mark_read(current_user.id, notification_id)
+    return jsonify({'success': True})
+
+
+@bp.route('/read-all', methods=['PUT'])
+@login_required
+def mark_all_read():
+    updated = notification_service.mark_read(current_user.id)
+    return jsonify({'success': True, 'updated': updated})
@@ -0,0 +1,33 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from models import Book
+from services.pagination import parse_limit
+from services.serializers import serialize_books, parse_fields
+from services import recommendation_service
+
+bp = Blueprint('recommendations', __name__, url_prefix='/api')
+
+
+def _with_scores(rows, fields):
+    books = serialize_books([book for book, _ in rows], fields, view='summary')
+    for data, (_, score) in zip(books, rows):
+        data['score'] = round(score, 4) if score is not None else None
+    return books
+
+
+@bp.route('/books/<int:book_id>/similar', methods=['GET'])
+def get_similar_books(book_id):
+    """借过这本书的读者也借了：读取离线计算好的相似列表"""
+    Book.query.get_or_404(book_id)
+    limit = parse_limit(request.args.get('limit'), default=10, maximum=recommendation_service.TOP_K)
+    rows = recommendation_service.similar_books(book_id, limit)
+    return jsonify({'success': True, 'books': _with_scores(rows, parse_fields(request.args.get('fields')))})
+
+
+@bp.route('/recommendations', methods=['GET'])
+@login_required
+def get_recommendations():
+    """根据我的借阅历史推荐图书；没有历史时推荐评分最高的图书"""
+    limit = parse_limit(request.args.get('limit'), default=10, maximum=50)
+    rows = recommendation_service.recommend_for_user(current_user.id, limit)
+    return jsonify({'success': True, 'books': _with_scores(rows, parse_fields(request.args.get('fields')))})
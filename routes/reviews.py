@@ -1,17 +1,59 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import BookReview, WishList, DonationRequest, Book, DonorConfirm, BorrowRecord, db
+from models import BookReview, WishList, DonationRequest, Book, db
+from services.serializers import serialize_donations, serialize_reviews, parse_fields
+from services.borrow_service import compare_and_set, TransitionConflict, CONFLICT_RESULT
+from services import stats_service, donor_service, rating_service, wishlist_service
+from services.pagination import keyset_paginate, order_clauses, parse_limit, InvalidCursor
 
 bp = Blueprint('reviews', __name__, url_prefix='/api')
 
 
 # ==================== 书评相关 ====================
 
+# 书评按发布时间倒序，id 作为唯一键
+REVIEW_ORDER = [(BookReview.created_at, 'desc'), (BookReview.id, 'desc')]
+
+
+def _review_page(query, default_all=False):
+    """传 limit/cursor 时按 (created_at, id) 键集分页，返回 (reviews, next_cursor)。
+
+    default_all 为真且未传分页参数时返回全部（旧接口行为），next_cursor 为 None。
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if default_all and not (limit or cursor):
+        return query.order_by(*order_clauses(REVIEW_ORDER)).all(), None
+    return keyset_paginate(query, REVIEW_ORDER, cursor=cursor, limit=parse_limit(limit))
+
+
 @bp.route('/books/<int:book_id>/reviews', methods=['GET'])
 def get_book_reviews(book_id):
-    """获取图书的所有评价"""
-    reviews = BookReview.query.filter_by(book_id=book_id).order_by(BookReview.created_at.desc()).all()
-    return jsonify({'success': True, 'reviews': [r.to_dict() for r in reviews]})
+    """获取图书的评价，传 limit/cursor 时分页；评分汇总只在第一页返回"""
+    fields = parse_fields(request.args.get('fields'))
+    try:
+        reviews, next_cursor = _review_page(BookReview.query.filter_by(book_id=book_id), default_all=True)
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '无效的分页游标'}), 400
+
+    result = {'success': True, 'reviews': serialize_reviews(reviews, fields)}
+    if not request.args.get('cursor'):
+        book = db.session.get(Book, book_id)
+        result['summary'] = book.rating_summary() if book else None
+    if request.args.get('limit') or request.args.get('cursor'):
+        result['next_cursor'] = next_cursor
+    return jsonify(result)
+
+
+@bp.route('/reviews/latest', methods=['GET'])
+def get_latest_reviews():
+    """全站最新书评，按发布时间倒序分页"""
+    fields = parse_fields(request.args.get('fields'))
+    try:
+        reviews, next_cursor = _review_page(BookReview.query)
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '无效的分页游标'}), 400
+    return jsonify({'success': True, 'reviews': serialize_reviews(reviews, fields), 'next_cursor': next_cursor})
 
 
 @bp.route('/books/<int:book_id>/reviews', methods=['POST'])
@@ -22,8 +64,11 @@ def create_book_review(book_id):
     data = request.get_json()
 
     rating = data.get('rating', 5)
-    if rating < 1 or rating > 5:
+    if not isinstance(rating, int) or isinstance(rating, bool) or rating not in rating_service.RATINGS:
         return jsonify({'success': False, 'message': '评分范围为1-5'}), 400
+    review_type = data.get('review_type', 'neutral')
+    if review_type not in rating_service.REVIEW_TYPES:
+        return jsonify({'success': False, 'message': '无效的评价类型'}), 400
 
     # 检查用户是否已评价过该图书
     existing = BookReview.query.filter_by(book_id=book_id, user_id=current_user.id).first()
@@ -35,10 +80,11 @@ def create_book_review(book_id):
         user_id=current_user.id,
         rating=rating,
         content=data.get('content', ''),
-        review_type=data.get('review_type', 'neutral')
+        review_type=review_type
     )
 
     db.session.add(review)
+    rating_service.review_added(book_id, rating, review_type)
     db.session.commit()
 
     return jsonify({'success': True, 'review': review.to_dict()}), 201
@@ -107,6 +153,17 @@ def get_all_wishlists():
     return jsonify({'success': True, 'wishlists': [w.to_dict() for w in wishlists]})
 
 
+@bp.route('/admin/wishlists/most-wanted', methods=['GET'])
+@login_required
+def get_most_wanted():
+    """待满足心愿按同一本书聚合，想看的人数最多的排在前面（管理员）"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    limit = parse_limit(request.args.get('limit'))
+    return jsonify({'success': True, 'books': wishlist_service.most_wanted(limit)})
+
+
 @bp.route('/admin/wishlists/<int:wish_id>/fulfill', methods=['PUT'])
 @login_required
 def fulfill_wishlist(wish_id):
@@ -140,36 +197,34 @@ def reject_wishlist(wish_id):
 @bp.route('/donations', methods=['GET'])
 @login_required
 def get_my_donations():
-    """获取我的捐赠申请和已捐赠的图书"""
-    # 获取用户的捐赠申请（待审核、已通过、已拒绝）
-    donations = DonationRequest.query.filter_by(user_id=current_user.id).order_by(DonationRequest.created_at.desc()).all()
-
-    # 获取用户已捐赠的图书（捐赠申请通过后创建的图书）
-    donated_books = Book.query.filter_by(donor_id=current_user.id).order_by(Book.created_at.desc()).all()
-
-    # 为每本已捐赠的图书检查是否有待确认的借阅申请
-    books_with_confirms = []
-    for book in donated_books:
-        # 检查是否有待捐赠者确认的借阅申请
-        pending_confirm = DonorConfirm.query.filter_by(
-            donor_id=current_user.id,
-            status='pending'
-        ).join(BorrowRecord).filter(BorrowRecord.book_id == book.id).first()
-
-        book_dict = book.to_dict()
-        book_dict['has_pending_confirm'] = pending_confirm is not None
-        if pending_confirm:
-            book_dict['pending_confirm'] = {
-                'id': pending_confirm.id,
-                'borrow_record': pending_confirm.borrow_record.to_dict() if pending_confirm.borrow_record else None
-            }
-        books_with_confirms.append(book_dict)
-
-    return jsonify({
+    """获取我的捐赠申请和已捐赠的图书。
+
+    传 limit/cursor 时已捐赠图书按入库时间分页，捐赠申请只在第一页返回。
+    """
+    fields = parse_fields(request.args.get('fields'))
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+
+    try:
+        books, next_cursor = donor_service.donated_books(
+            current_user.id,
+            cursor=cursor,
+            limit=parse_limit(limit) if limit or cursor else None,
+            fields=fields
+        )
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '无效的分页游标'}), 400
+
+    result = {
         'success': True,
-        'donations': [d.to_dict() for d in donations],
-        'donated_books': books_with_confirms
-    })
+        'donated_books': books,
+        'pending_confirm_count': donor_service.pending_confirm_count(current_user.id)
+    }
+    if not cursor:
+        result['donations'] = donor_service.donation_requests(current_user.id)
+    if limit or cursor:
+        result['next_cursor'] = next_cursor
+    return jsonify(result)
 
 
 @bp.route('/donations', methods=['POST'])
@@ -189,6 +244,7 @@ def create_donation():
     )
 
     db.session.add(donation)
+    stats_service.donation_status_changed(None, 'pending')
     db.session.commit()
 
     return jsonify({'success': True, 'donation': donation.to_dict()}), 201
@@ -208,7 +264,8 @@ def get_all_donations():
         query = query.filter_by(status=status)
 
     donations = query.order_by(DonationRequest.created_at.desc()).all()
-    return jsonify({'success': True, 'donations': [d.to_dict() for d in donations]})
+    fields = parse_fields(request.args.get('fields'))
+    return jsonify({'success': True, 'donations': serialize_donations(donations, fields)})
 
 
 @bp.route('/admin/donations/<int:donation_id>/approve', methods=['PUT'])
@@ -223,6 +280,15 @@ def approve_donation(donation_id):
     if donation.status != 'pending':
         return jsonify({'success': False, 'message': '当前状态不可批准'}), 400
 
+    # 条件更新防止重复点击或多个管理员同时批准而重复入库
+    try:
+        compare_and_set(DonationRequest, [DonationRequest.id == donation_id, DonationRequest.status == 'pending'],
+                        {DonationRequest.status: 'approved'})
+    except TransitionConflict:
+        db.session.rollback()
+        return jsonify(CONFLICT_RESULT), 409
+    stats_service.donation_status_changed('pending', 'approved')
+
     # 创建图书
     book = Book(
         title=donation.title,
@@ -235,11 +301,13 @@ def approve_donation(donation_id):
         status='available'
     )
 
-    donation.status = 'approved'
     db.session.add(book)
+    stats_service.book_added(book.status)
+    db.session.flush()
+    fulfilled = wishlist_service.fulfil_matching([book])
     db.session.commit()
 
-    return jsonify({'success': True, 'book': book.to_dict()})
+    return jsonify({'success': True, 'book': book.to_dict(), 'fulfilled_wishes': fulfilled})
 
 
 @bp.route('/admin/donations/<int:donation_id>/reject', methods=['PUT'])
@@ -254,7 +322,13 @@ def reject_donation(donation_id):
     if donation.status != 'pending':
         return jsonify({'success': False, 'message': '当前状态不可拒绝'}), 400
 
-    donation.status = 'rejected'
+    try:
+        compare_and_set(DonationRequest, [DonationRequest.id == donation_id, DonationRequest.status == 'pending'],
+                        {DonationRequest.status: 'rejected'})
+    except TransitionConflict:
+        db.session.rollback()
+        return jsonify(CONFLICT_RESULT), 409
+    stats_service.donation_status_changed('pending', 'rejected')
     db.session.commit()
 
     return jsonify({'success': True})
@@ -0,0 +1,11 @@
+from flask import Blueprint, request, jsonify
+from services.tag_service import tag_counts
+
+bp = Blueprint('tags', __name__, url_prefix='/api/tags')
+
+
+@bp.route('', methods=['GET'])
+def get_tags():
+    """获取所有标签及对应图书数量"""
+    limit = request.args.get('limit', type=int)
+    return jsonify({'success': True, 'tags': tag_counts(limit)})
@@ -1,16 +1,184 @@
-from models import Book, BorrowRecord, DonorConfirm, Setting, db
+from datetime import datetime, timezone
 
+from sqlalchemy import case, func
+from sqlalchemy.orm.util import identity_key
+from models import Book, BorrowRecord, DonorConfirm, User, ACTIVE_BORROW_STATUSES, db
+from services import settings_service, stats_service, rollup_service, overdue_service, recommendation_service
 
-def get_max_books_per_user():
-    setting = Setting.query.filter_by(key='max_books_per_user').first()
-    return int(setting.value) if setting else 5
+
+# 借阅记录状态机：动作 -> (允许的当前状态, 目标状态)
+RECORD_TRANSITIONS = {
+    'approve': (('pending',), 'approved'),
+    'reject': (('pending', 'donor_pending'), 'rejected'),
+    'donor_approve': (('donor_pending',), 'pending'),
+    'donor_reject': (('donor_pending',), 'rejected'),
+    'request_return': (('approved',), 'return_pending'),
+    'confirm_return': (('return_pending',), 'completed'),
+}
+
+# 动作完成后图书的状态，None 表示不变
+BOOK_STATUS_AFTER = {
+    'approve': 'borrowed',
+    'reject': 'available',
+    'donor_approve': None,
+    'donor_reject': 'available',
+    'request_return': 'pending_return',
+    'confirm_return': 'available',
+}
+
+# 结束借阅、释放图书的动作
+RELEASING_ACTIONS = {'reject', 'donor_reject', 'confirm_return'}
+
+INVALID_STATE_MESSAGES = {
+    'approve': '当前状态不可通过',
+    'reject': '当前状态不可拒绝',
+    'donor_approve': '当前状态不可确认',
+    'donor_reject': '当前状态不可确认',
+    'request_return': '当前状态不可归还',
+    'confirm_return': '当前状态不可确认归还',
+}
+
+CONFLICT_RESULT = {'success': False, 'message': '状态已被其他操作修改，请刷新后重试'}
+
+
+class TransitionConflict(Exception):
+    """条件更新没有命中任何行：状态已被并发请求改变"""
 
 
 def get_current_borrow_count(user_id):
-    return BorrowRecord.query.filter(
-        BorrowRecord.borrower_id == user_id,
-        BorrowRecord.status.in_(['approved', 'pending', 'donor_pending', 'return_pending'])
-    ).count()
+    count = db.session.query(User.active_borrow_count).filter(User.id == user_id).scalar()
+    return count or 0
+
+
+def compare_and_set(model, conditions, values):
+    """单行条件 UPDATE，未命中时抛出 TransitionConflict"""
+    updated = model.query.filter(*conditions).update(values, synchronize_session=False)
+    if updated != 1:
+        raise TransitionConflict()
+
+
+def _adjust_active_count(user_id, delta):
+    User.query.filter(User.id == user_id).update(
+        {User.active_borrow_count: case(
+            (User.active_borrow_count + delta < 0, 0),
+            else_=User.active_borrow_count + delta
+        )},
+        synchronize_session=False
+    )
+
+
+def apply_transition(record, action):
+    """以条件 UPDATE 执行一次借阅状态流转，不提交事务。
+
+    借阅记录的更新带 WHERE status = 读取到的状态 条件，并发请求中只有一个能成功，
+    其余抛出 TransitionConflict，由调用方回滚。看板计数器在同一事务中更新。
+    """
+    allowed, target = RECORD_TRANSITIONS[action]
+    old_status = record.status
+    if old_status not in allowed:
+        raise TransitionConflict()
+    now = datetime.now(timezone.utc)
+
+    values = {BorrowRecord.status: target}
+    if action == 'approve':
+        values[BorrowRecord.approve_at] = now
+        values[BorrowRecord.due_at] = overdue_service.due_date(now, settings_service.get_max_borrow_days())
+    elif action == 'confirm_return':
+        values[BorrowRecord.return_at] = now
+    compare_and_set(BorrowRecord, [BorrowRecord.id == record.id, BorrowRecord.status == old_status], values)
+    stats_service.borrow_status_changed(old_status, target)
+    if action == 'approve':
+        rollup_service.record_borrow(record.book_id, record.borrower_id, now)
+    elif action == 'confirm_return':
+        rollup_service.record_return(now)
+        recommendation_service.mark_stale(record.book_id)
+
+    book_values = {}
+    if BOOK_STATUS_AFTER[action]:
+        book_values[Book.status] = BOOK_STATUS_AFTER[action]
+        # 本事务已持有写锁，此时读到的图书状态不会被并发修改
+        old_book_status = db.session.query(Book.status).filter(Book.id == record.book_id).scalar()
+        stats_service.book_status_changed(old_book_status, BOOK_STATUS_AFTER[action])
+    if action in RELEASING_ACTIONS:
+        book_values[Book.current_borrow_record_id] = None
+        _adjust_active_count(record.borrower_id, -1)
+    if book_values:
+        Book.query.filter(Book.id == record.book_id).update(book_values, synchronize_session=False)
+
+    # 条件更新绕过了 ORM，让会话里的对象在下次访问时重新加载
+    db.session.expire(record)
+    book = db.session.identity_map.get(identity_key(Book, record.book_id))
+    if book is not None:
+        db.session.expire(book)
+
+
+def transition(record, action):
+    """执行借阅状态流转并提交，返回 (result, status_code)"""
+    if record.status not in RECORD_TRANSITIONS[action][0]:
+        return {'success': False, 'message': INVALID_STATE_MESSAGES[action]}, 400
+
+    try:
+        apply_transition(record, action)
+    except TransitionConflict:
+        db.session.rollback()
+        return CONFLICT_RESULT, 409
+
+    db.session.commit()
+    return {'success': True, 'record': record.to_dict()}, 200
+
+
+def bulk_transition(record_ids, action):
+    """批量执行同一种状态流转，一次查询加载、整批在一个事务中一次提交。
+
+    apply_transition 的第一次写入就是借阅记录的条件更新，冲突时在任何写入之前抛出
+    TransitionConflict，所以只需跳过该条继续。不用 SAVEPOINT：pysqlite 默认的事务处理下
+    第一个 SAVEPOINT 会开启事务、RELEASE 时就提交，整批会变成逐条提交。
+    返回与 record_ids 顺序一致的结果列表。
+    """
+    record_ids = list(dict.fromkeys(record_ids))
+    records = {r.id: r for r in BorrowRecord.query.filter(BorrowRecord.id.in_(record_ids)).all()}
+    allowed = RECORD_TRANSITIONS[action][0]
+
+    results = []
+    for record_id in record_ids:
+        record = records.get(record_id)
+        if record is None:
+            results.append({'id': record_id, 'success': False, 'message': '借阅记录不存在'})
+            continue
+        if record.status not in allowed:
+            results.append({'id': record_id, 'success': False, 'message': INVALID_STATE_MESSAGES[action]})
+            continue
+        try:
+            apply_transition(record, action)
+        except TransitionConflict:
+            results.append({'id': record_id, 'success': False, 'message': CONFLICT_RESULT['message']})
+            continue
+        results.append({'id': record_id, 'success': True})
+
+    db.session.commit()
+    return results
+
+
+def resolve_donor_confirm(confirm, approve):
+    """捐赠者同意或拒绝借阅申请：同意后记录转入管理员审核，拒绝则借阅结束"""
+    action = 'donor_approve' if approve else 'donor_reject'
+    if confirm.status != 'pending' or confirm.borrow_record.status not in RECORD_TRANSITIONS[action][0]:
+        return {'success': False, 'message': INVALID_STATE_MESSAGES[action]}, 400
+
+    try:
+        compare_and_set(
+            DonorConfirm,
+            [DonorConfirm.id == confirm.id, DonorConfirm.status == 'pending'],
+            {DonorConfirm.status: 'approved' if approve else 'rejected',
+             DonorConfirm.confirmed_at: datetime.now(timezone.utc)}
+        )
+        apply_transition(confirm.borrow_record, action)
+    except TransitionConflict:
+        db.session.rollback()
+        return CONFLICT_RESULT, 409
+
+    db.session.commit()
+    return {'success': True}, 200
 
 
 def request_borrow(book_id, user_id):
@@ -21,10 +189,22 @@ def request_borrow(book_id, user_id):
     if book.status != 'available':
         return {'success': False, 'message': '图书不可借阅'}, 400
 
-    # 检查最大借阅数量
-    max_books = get_max_books_per_user()
-    current_count = get_current_borrow_count(user_id)
-    if current_count >= max_books:
+    max_books = settings_service.get_max_books_per_user()
+    try:
+        # 锁定图书：只有仍在库时才能改为审核中，抢到的请求唯一
+        compare_and_set(Book, [Book.id == book_id, Book.status == 'available'],
+                         {Book.status: 'pending_borrow'})
+        stats_service.book_status_changed('available', 'pending_borrow')
+    except TransitionConflict:
+        db.session.rollback()
+        return CONFLICT_RESULT, 409
+
+    # 检查最大借阅数量，计数与检查在同一条 UPDATE 中完成
+    try:
+        compare_and_set(User, [User.id == user_id, User.active_borrow_count < max_books],
+                         {User.active_borrow_count: User.active_borrow_count + 1})
+    except TransitionConflict:
+        db.session.rollback()
         return {'success': False, 'message': f'每人最多借阅{max_books}本书'}, 400
 
     # 创建借阅记录
@@ -37,20 +217,58 @@ def request_borrow(book_id, user_id):
     # 如果是捐赠图书，需要捐赠者确认
     if book.source == 'donated' and book.donor_id:
         record.status = 'donor_pending'
-        db.session.add(record)
-        db.session.flush()
+    db.session.add(record)
+    db.session.flush()
+    stats_service.borrow_status_changed(None, record.status)
 
+    if record.status == 'donor_pending':
         confirm = DonorConfirm(
             borrow_record_id=record.id,
             donor_id=book.donor_id,
             status='pending'
         )
         db.session.add(confirm)
-    else:
-        db.session.add(record)
 
-    # 锁定图书
-    book.status = 'pending_borrow'
+    Book.query.filter(Book.id == book_id).update(
+        {Book.current_borrow_record_id: record.id}, synchronize_session=False)
+    db.session.expire(book)
     db.session.commit()
 
     return {'success': True, 'record': record.to_dict()}, 201
+
+
+def check_borrow_counters(repair=False):
+    """核对持书量和当前借阅指针与借阅记录是否一致，repair=True 时修复。
+
+    返回不一致项列表，每项为 (类型, id, 当前值, 期望值)。
+    """
+    active = BorrowRecord.status.in_(ACTIVE_BORROW_STATUSES)
+    mismatches = []
+
+    expected_counts = dict(
+        db.session.query(BorrowRecord.borrower_id, func.count(BorrowRecord.id))
+        .filter(active).group_by(BorrowRecord.borrower_id).all()
+    )
+    for user_id, count in db.session.query(User.id, User.active_borrow_count).all():
+        expected = expected_counts.get(user_id, 0)
+        if count != expected:
+            mismatches.append(('user', user_id, count, expected))
+            if repair:
+                User.query.filter(User.id == user_id).update(
+                    {User.active_borrow_count: expected}, synchronize_session=False)
+
+    expected_pointers = dict(
+        db.session.query(BorrowRecord.book_id, func.max(BorrowRecord.id))
+        .filter(active).group_by(BorrowRecord.book_id).all()
+    )
+    for book_id, pointer in db.session.query(Book.id, Book.current_borrow_record_id).all():
+        expected = expected_pointers.get(book_id)
+        if pointer != expected:
+            mismatches.append(('book', book_id, pointer, expected))
+            if repair:
+                Book.query.filter(Book.id == book_id).update(
+                    {Book.current_borrow_record_id: expected}, synchronize_session=False)
+
+    if repair:
+        db.session.commit()
+    return mismatches
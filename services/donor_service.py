@@ -0,0 +1,80 @@
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager
+from models import User, Book, BorrowRecord, DonorConfirm, DonationRequest, db
+from services.pagination import keyset_paginate, order_clauses
+from services.serializers import preload, serialize_donations, project
+
+
+def _lend_counts(donor_id):
+    """捐赠图书被借出（审批通过）的次数，只统计该捐赠者的图书"""
+    donated = db.session.query(Book.id).filter(Book.donor_id == donor_id)
+    return db.session.query(
+        BorrowRecord.book_id.label('book_id'),
+        func.count(BorrowRecord.id).label('lend_count')
+    ).filter(
+        BorrowRecord.book_id.in_(donated),
+        BorrowRecord.approve_at.isnot(None)
+    ).group_by(BorrowRecord.book_id).subquery('lend_counts')
+
+
+def _pending_confirms(donor_id, book_ids=None):
+    """待捐赠者确认的借阅申请，每本书取最早的一条，返回 {book_id: DonorConfirm}"""
+    query = DonorConfirm.query.join(DonorConfirm.borrow_record) \
+        .options(contains_eager(DonorConfirm.borrow_record)) \
+        .filter(DonorConfirm.donor_id == donor_id, DonorConfirm.status == 'pending')
+    if book_ids is not None:
+        query = query.filter(BorrowRecord.book_id.in_(book_ids))
+
+    by_book = {}
+    for confirm in query.order_by(DonorConfirm.id).all():
+        by_book.setdefault(confirm.borrow_record.book_id, confirm)
+    return by_book
+
+
+def pending_confirm_count(donor_id):
+    """有待确认借阅申请的图书数量"""
+    return db.session.query(func.count(func.distinct(BorrowRecord.book_id))) \
+        .select_from(DonorConfirm).join(DonorConfirm.borrow_record) \
+        .filter(DonorConfirm.donor_id == donor_id, DonorConfirm.status == 'pending').scalar()
+
+
+def donated_books(donor_id, cursor=None, limit=None, fields=None):
+    """捐赠者的图书及当前状态、借出次数、待确认申请，查询次数固定。
+
+    limit 为 None 时返回全部，否则按入库时间倒序做键集分页。返回 (books, next_cursor)。
+    """
+    lends = _lend_counts(donor_id)
+    query = db.session.query(Book, func.coalesce(lends.c.lend_count, 0)) \
+        .outerjoin(lends, lends.c.book_id == Book.id) \
+        .filter(Book.donor_id == donor_id)
+    order_by = [(Book.created_at, 'desc'), (Book.id, 'desc')]
+
+    if limit is None:
+        rows, next_cursor = query.order_by(*order_clauses(order_by)).all(), None
+    else:
+        rows, next_cursor = keyset_paginate(query, order_by, cursor=cursor, limit=limit)
+
+    books = [book for book, _ in rows]
+    confirms = _pending_confirms(donor_id, [b.id for b in books]) if books else {}
+    # 捐赠者本人和申请人：一次 IN 查询
+    users = preload(User, [donor_id] + [c.borrow_record.borrower_id for c in confirms.values()])
+
+    result = []
+    for book, lend_count in rows:
+        data = book.to_summary_dict()
+        data['lend_count'] = lend_count
+        confirm = confirms.get(book.id)
+        data['has_pending_confirm'] = confirm is not None
+        if confirm:
+            data['pending_confirm'] = {
+                'id': confirm.id,
+                'borrow_record': confirm.borrow_record.to_dict()
+            }
+        result.append(project(data, fields))
+    return result, next_cursor
+
+
+def donation_requests(user_id):
+    donations = DonationRequest.query.filter_by(user_id=user_id) \
+        .order_by(DonationRequest.created_at.desc()).all()
+    return serialize_donations(donations)
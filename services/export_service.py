@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from sqlalchemy import select
+from models import User, Book, BorrowRecord, BookReview, db
+
+FORMATS = ('csv', 'ndjson')
+# 每次从游标取出的行数，导出过程中内存占用与总行数无关
+YIELD_PER = 1000
+
+
+def _borrows():
+    columns = [
+        BorrowRecord.id, BorrowRecord.book_id, Book.title.label('book_title'),
+        BorrowRecord.borrower_id, User.student_id.label('borrower_student_id'), User.name.label('borrower_name'),
+        BorrowRecord.status, BorrowRecord.request_at, BorrowRecord.approve_at,
+        BorrowRecord.due_at, BorrowRecord.return_at
+    ]
+    statement = select(*columns) \
+        .join(Book, Book.id == BorrowRecord.book_id) \
+        .join(User, User.id == BorrowRecord.borrower_id)
+    return statement, BorrowRecord.request_at, BorrowRecord.id
+
+
+def _books():
+    columns = [
+        Book.id, Book.title, Book.author, Book.publisher, Book.isbn, Book.tags,
+        Book.source, Book.donor_id, Book.status, Book.created_at
+    ]
+    return select(*columns), Book.created_at, Book.id
+
+
+def _reviews():
+    columns = [
+        BookReview.id, BookReview.book_id, Book.title.label('book_title'),
+        BookReview.user_id, User.name.label('user_name'),
+        BookReview.rating, BookReview.review_type, BookReview.content, BookReview.created_at
+    ]
+    statement = select(*columns) \
+        .join(Book, Book.id == BookReview.book_id) \
+        .join(User, User.id == BookReview.user_id)
+    return statement, BookReview.created_at, BookReview.id
+
+
+# 导出类型 -> 构造 (select, 日期过滤列, 排序列)
+EXPORTS = {
+    'borrows': _borrows,
+    'books': _books,
+    'reviews': _reviews,
+}
+
+
+def export_result(kind, start=None, end=None):
+    """按 id 顺序流式读取导出数据，start/end 为 [start, end) 日期区间"""
+    statement, date_column, order_column = EXPORTS[kind]()
+    if start:
+        statement = statement.where(date_column >= start)
+    if end:
+        statement = statement.where(date_column < end)
+    statement = statement.order_by(order_column).execution_options(yield_per=YIELD_PER)
+    return db.session.execute(statement)
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(result):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # 带 BOM，Excel 打开时能正确识别中文
+    buffer.write('\ufeff')
+    writer.writerow(result.keys())
+    for partition in result.partitions():
+        for row in partition:
+            writer.writerow(['' if v is None else _plain(v) for v in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(result):
+    keys = list(result.keys())
+    for partition in result.partitions():
+        yield ''.join(
+            json.dumps(dict(zip(keys, (_plain(v) for v in row))), ensure_ascii=False) + '\n'
+            for row in partition
+        )
@@ -0,0 +1,52 @@
+from sqlalchemy import func, literal, select, union_all
+from models import Book, Tag, book_tags, db
+
+FACETS = ('status', 'source', 'tag')
+
+
+def parse_facets(raw):
+    """?facets=1 表示全部分面，也可以用逗号指定 status,source,tag"""
+    if not raw:
+        return ()
+    if raw in ('1', 'true', 'all'):
+        return FACETS
+    return tuple(f for f in (s.strip() for s in raw.split(',')) if f in FACETS)
+
+
+def catalog_facets(query, facets=FACETS):
+    """在同一个过滤条件下统计各分面的图书数量，一条 SQL 完成。
+
+    query 为已应用过滤条件的 Book 查询；返回 {'status': {...}, 'source': {...}, 'tag': {...}}。
+    """
+    if not facets:
+        return {}
+
+    filtered = query.order_by(None).with_entities(Book.id, Book.status, Book.source) \
+        .cte('filtered_books')
+
+    selects = []
+    if 'status' in facets:
+        selects.append(
+            select(literal('status').label('facet'), filtered.c.status.label('value'), func.count().label('count'))
+            .group_by(filtered.c.status)
+        )
+    if 'source' in facets:
+        selects.append(
+            select(literal('source').label('facet'), filtered.c.source.label('value'), func.count().label('count'))
+            .group_by(filtered.c.source)
+        )
+    if 'tag' in facets:
+        selects.append(
+            select(literal('tag').label('facet'), Tag.name.label('value'), func.count().label('count'))
+            .select_from(filtered)
+            .join(book_tags, book_tags.c.book_id == filtered.c.id)
+            .join(Tag, Tag.id == book_tags.c.tag_id)
+            .group_by(Tag.name)
+        )
+
+    statement = selects[0] if len(selects) == 1 else union_all(*selects)
+    result = {facet: {} for facet in facets}
+    for facet, value, count in db.session.execute(statement):
+        if value is not None:
+            result[facet][value] = count
+    return result
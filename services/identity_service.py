@@ -0,0 +1,113 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy.orm import make_transient_to_detached
+from models import User, Setting, db
+
+# 缓存的身份字段，其他字段在访问时按需从数据库加载
+IDENTITY_FIELDS = ('id', 'student_id', 'name', 'is_admin')
+
+# 与设置缓存共用 settings 表；用户被创建、删除或修改时写入新的版本号，
+# 每个进程在命中缓存前核对版本号，变化时整体丢弃本进程的缓存
+VERSION_KEY = '_identity_version'
+
+
+class _IdentityCache:
+    """带过期时间和容量上限的 LRU 缓存"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id, version):
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            entry = self.entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[user_id]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, snapshot, ttl, max_size):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + ttl, snapshot)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id=None):
+        with self.lock:
+            if user_id is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(user_id, None)
+
+
+_cache = _IdentityCache()
+
+
+def _current_version():
+    return db.session.query(Setting.value).filter(Setting.key == VERSION_KEY).scalar()
+
+
+def load_user(user_id):
+    """Flask-Login 的 user_loader：命中缓存时只查询版本号，不查询用户表；IDENTITY_CACHE_TTL 为 0 时不缓存"""
+    snapshot = _cache.get(user_id, _current_version())
+    if snapshot is not None:
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        # load=False 直接挂到当前会话，未缓存的字段访问时再加载
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(User, user_id)
+    ttl = current_app.config.get('IDENTITY_CACHE_TTL', 30)
+    if user is not None and ttl > 0:
+        _cache.put(
+            user_id,
+            {field: getattr(user, field) for field in IDENTITY_FIELDS},
+            ttl,
+            current_app.config.get('IDENTITY_CACHE_SIZE', 1024)
+        )
+    return user
+
+
+def invalidate(user_id=None):
+    """用户被创建、删除或权限变化时调用，在调用方的事务中写入新版本号，提交后所有进程的缓存失效。
+
+    user_id 只决定本进程立即丢弃哪一条，不传时清空本进程的缓存。
+    """
+    version = Setting.query.filter_by(key=VERSION_KEY).first()
+    if version is None:
+        version = Setting(key=VERSION_KEY)
+        db.session.add(version)
+    version.value = uuid.uuid4().hex
+    _cache.invalidate(user_id)
+
+
+def forget(user_id):
+    """只丢弃本进程里的一条缓存，不写数据库，用于登录时刷新自己的身份"""
+    _cache.invalidate(user_id)
+
+
+def cache_stats():
+    return {
+        'size': len(_cache.entries),
+        'hits': _cache.hits,
+        'misses': _cache.misses,
+        'evictions': _cache.evictions,
+        'version': _cache.version
+    }
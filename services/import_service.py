@@ -0,0 +1,178 @@
+import csv
+import json
+
+from sqlalchemy import insert
+from models import Book, book_tags, split_tags, db
+from services import stats_service, wishlist_service
+from services.isbn_service import normalize_isbn, isbn_key
+from services.search_service import index_books
+from services.tag_service import get_or_create_tags
+
+CHUNK_SIZE = 500
+# 报告里最多列出的错误行数
+MAX_REPORTED_ERRORS = 200
+
+FORMATS = ('csv', 'jsonl')
+SOURCES = ('class', 'donated')
+
+# 字段名 -> (是否必填, 最大长度)，与 Book 的列定义一致
+FIELDS = {
+    'title': (True, 100),
+    'author': (True, 50),
+    'publisher': (True, 100),
+    'isbn': (False, 20),
+    'tags': (False, 200),
+}
+
+
+def detect_format(filename, fmt=None):
+    if fmt:
+        return fmt if fmt in FORMATS else None
+    ext = (filename or '').rsplit('.', 1)[-1].lower()
+    if ext == 'csv':
+        return 'csv'
+    if ext in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    return None
+
+
+def iter_rows(stream, fmt):
+    """逐行读取文本流，产出 (行号, dict)；无法解析的行产出 (行号, 错误信息)"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, 'JSON 格式错误'
+            continue
+        if not isinstance(row, dict):
+            yield line_no, '每行必须是一个 JSON 对象'
+            continue
+        yield line_no, row
+
+
+def validate_row(row):
+    """校验并清洗一行，返回 (values, error)"""
+    values = {}
+    for name, (required, max_length) in FIELDS.items():
+        value = row.get(name)
+        if isinstance(value, list) and name == 'tags':
+            value = ','.join(str(v) for v in value)
+        value = str(value).strip() if value is not None else ''
+        if required and not value:
+            return None, f'缺少{name}'
+        if len(value) > max_length:
+            return None, f'{name}超过{max_length}个字符'
+        values[name] = value
+
+    values['isbn'] = normalize_isbn(values['isbn'])
+    # Core 批量插入不触发 ORM 事件，这里直接算好去重键
+    values['isbn_key'] = isbn_key(values['isbn'])
+    values['tags'] = ','.join(split_tags(values['tags']))
+
+    source = str(row.get('source') or 'class').strip()
+    if source not in SOURCES:
+        return None, '来源只能是 class 或 donated'
+    values['source'] = source
+    values['status'] = 'available'
+    return values, None
+
+
+def _existing_isbns(keys):
+    """库里已有的 isbn_key，ISBN-10、ISBN-13 和带连字符的写法都视为同一本"""
+    if not keys:
+        return set()
+    rows = db.session.query(Book.isbn_key).filter(Book.isbn_key.in_(keys)).all()
+    return {key for key, in rows}
+
+
+def _insert_chunk(rows):
+    """批量插入一块图书并补上 ORM 事件里做的工作：全文索引、标签关联、看板计数"""
+    inserted = db.session.execute(
+        insert(Book).returning(Book.id, Book.title, Book.author, Book.publisher, Book.isbn, Book.tags,
+                               sort_by_parameter_order=True),
+        rows
+    ).all()
+
+    index_books(db.session.connection(), inserted)
+
+    names = sorted({name for book in inserted for name in split_tags(book.tags)})
+    tags = {tag.name: tag for tag in get_or_create_tags(db.session, names)}
+    db.session.flush()
+    links = [{'book_id': book.id, 'tag_id': tags[name].id}
+             for book in inserted for name in split_tags(book.tags)]
+    if links:
+        db.session.execute(book_tags.insert(), links)
+
+    stats_service.book_added('available', len(inserted))
+    wishlist_service.fulfil_matching(inserted)
+    db.session.commit()
+    return len(inserted)
+
+
+def import_books(stream, fmt, skip_duplicates=True, chunk_size=CHUNK_SIZE):
+    """流式导入图书，每块一个事务。
+
+    skip_duplicates 为 True 时跳过库里或文件中已出现过的 ISBN（按规范化后的 isbn_key 比较）。
+    文件中途出现非 UTF-8 内容时停止读取，已提交的块保留，报告里记一条错误。
+    返回 {'total', 'imported', 'skipped', 'failed', 'errors': [{'line', 'message'}]}。
+    """
+    report = {'total': 0, 'imported': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+    seen = set()
+    pending = []
+
+    def error(line_no, message):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line_no, 'message': message})
+
+    def flush():
+        if skip_duplicates:
+            existing = _existing_isbns([values['isbn_key'] for _, values in pending if values['isbn_key']])
+            rows = []
+            for line_no, values in pending:
+                if values['isbn_key'] in existing:
+                    report['skipped'] += 1
+                else:
+                    rows.append(values)
+        else:
+            rows = [values for _, values in pending]
+        if rows:
+            report['imported'] += _insert_chunk(rows)
+        pending.clear()
+
+    last_line = 0
+    try:
+        for line_no, row in iter_rows(stream, fmt):
+            last_line = line_no
+            report['total'] += 1
+            if isinstance(row, str):
+                error(line_no, row)
+                continue
+            values, message = validate_row(row)
+            if message:
+                error(line_no, message)
+                continue
+            if skip_duplicates and values['isbn_key']:
+                if values['isbn_key'] in seen:
+                    report['skipped'] += 1
+                    continue
+                seen.add(values['isbn_key'])
+            pending.append((line_no, values))
+            if len(pending) >= chunk_size:
+                flush()
+    except UnicodeDecodeError:
+        # 解码按缓冲块进行，只能确定出错位置在最后读到的一行之后
+        error(last_line + 1, '文件必须是 UTF-8 编码，此行及之后的内容未导入')
+
+    if pending:
+        flush()
+    return report
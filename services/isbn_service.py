@@ -0,0 +1,277 @@
+import csv
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from flask import current_app
+from sqlalchemy import event, func, update
+from sqlalchemy.dialects.sqlite import insert
+from models import Book, IsbnCache, split_tags, db
+
+
+def normalize_isbn(value):
+    """去掉连字符和空格，末位校验码 x 统一为大写"""
+    return re.sub(r'[\s-]', '', value or '').upper()
+
+
+def _isbn10_valid(isbn):
+    if not re.fullmatch(r'\d{9}[\dX]', isbn):
+        return False
+    total = sum((10 - i) * (10 if ch == 'X' else int(ch)) for i, ch in enumerate(isbn))
+    return total % 11 == 0
+
+
+def _isbn13_check_digit(first12):
+    total = sum(int(ch) * (1 if i % 2 == 0 else 3) for i, ch in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def _isbn13_valid(isbn):
+    return bool(re.fullmatch(r'\d{13}', isbn)) and _isbn13_check_digit(isbn[:12]) == isbn[12]
+
+
+def to_isbn13(value):
+    """规范化为 ISBN-13：ISBN-10 加 978 前缀并重算校验位，校验不通过时返回 None"""
+    isbn = normalize_isbn(value)
+    if len(isbn) == 10 and _isbn10_valid(isbn):
+        first12 = '978' + isbn[:9]
+        return first12 + _isbn13_check_digit(first12)
+    if len(isbn) == 13 and _isbn13_valid(isbn):
+        return isbn
+    return None
+
+
+def to_isbn10(value):
+    """978 开头的 ISBN 转为 ISBN-10，其余（979 段或无效）返回 None"""
+    isbn13 = to_isbn13(value)
+    if not isbn13 or not isbn13.startswith('978'):
+        return None
+    first9 = isbn13[3:12]
+    check = (11 - sum((10 - i) * int(ch) for i, ch in enumerate(first9)) % 11) % 11
+    return first9 + ('X' if check == 10 else str(check))
+
+
+def isbn_key(value):
+    """图书去重用的 ISBN：能校验通过时为 ISBN-13，否则为去掉连字符和空格后的原值，空值为 None"""
+    return to_isbn13(value) or normalize_isbn(value) or None
+
+
+@event.listens_for(Book, 'before_insert')
+@event.listens_for(Book, 'before_update')
+def _sync_isbn_key(mapper, connection, target):
+    """录入、编辑、捐赠入库都按原样保存 isbn，这里同步规范化的去重键"""
+    target.isbn_key = isbn_key(target.isbn)
+
+
+def rebuild_isbn_keys():
+    """为全部图书重新生成 isbn_key，返回处理的图书数量"""
+    count = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(Book.id, Book.isbn).filter(Book.id > last_id).order_by(Book.id).limit(500).all()
+        if not rows:
+            break
+        db.session.execute(update(Book), [{'id': book_id, 'isbn_key': isbn_key(isbn)} for book_id, isbn in rows])
+        count += len(rows)
+        last_id = rows[-1].id
+    db.session.commit()
+    return count
+
+
+# ==================== 元数据查询 ====================
+
+# 数据源名 -> 查询函数：接收一批 ISBN-13，返回 {isbn13: {title, author, publisher, tags}}，
+# 查不到的不返回，字段可缺省、tags 可以是列表；无法访问时抛出异常，这一批不写负缓存
+PROVIDERS = {}
+
+# 一次批量查询最多的 ISBN 数量
+MAX_BATCH = 500
+
+FIELD_LENGTHS = {'title': 100, 'author': 50, 'publisher': 100, 'tags': 200}
+
+
+def register_provider(name):
+    def decorator(lookup):
+        PROVIDERS[name] = lookup
+        return lookup
+    return decorator
+
+
+def _clean(record):
+    """统一为缓存表的字段，超长截断；没有书名视为查不到"""
+    tags = record.get('tags') or ''
+    if isinstance(tags, list):
+        tags = ','.join(str(t) for t in tags)
+    data = {'title': record.get('title'), 'author': record.get('author'),
+            'publisher': record.get('publisher'), 'tags': tags}
+    data = {k: (str(v).strip()[:FIELD_LENGTHS[k]] if v else '') for k, v in data.items()}
+    return data if data['title'] else None
+
+
+@lru_cache(maxsize=2)
+def _load_dataset(path, mtime):
+    """读取本地数据文件（CSV 或 JSONL，列为 isbn,title,author,publisher,tags），文件变化后重新读取"""
+    records = {}
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            isbn13 = to_isbn13(str(row.get('isbn') or ''))
+            data = _clean(row)
+            if isbn13 and data:
+                records[isbn13] = data
+    return records
+
+
+@register_provider('local')
+def _lookup_local(isbns):
+    path = current_app.config['ISBN_DATA_FILE']
+    if not path or not os.path.exists(path):
+        return {}
+    records = _load_dataset(path, os.path.getmtime(path))
+    return {isbn: records[isbn] for isbn in isbns if isbn in records}
+
+
+@register_provider('openlibrary')
+def _lookup_openlibrary(isbns):
+    results = {}
+    timeout = current_app.config['ISBN_LOOKUP_TIMEOUT']
+    for i in range(0, len(isbns), 50):
+        chunk = isbns[i:i + 50]
+        query = urlencode({'bibkeys': ','.join(f'ISBN:{isbn}' for isbn in chunk),
+                           'format': 'json', 'jscmd': 'data'})
+        with urlopen(f'https://openlibrary.org/api/books?{query}', timeout=timeout) as response:
+            payload = json.load(response)
+        for isbn in chunk:
+            entry = payload.get(f'ISBN:{isbn}')
+            if not entry:
+                continue
+            results[isbn] = {
+                'title': entry.get('title'),
+                'author': ', '.join(a['name'] for a in entry.get('authors', []) if a.get('name')),
+                'publisher': ', '.join(p['name'] for p in entry.get('publishers', []) if p.get('name')),
+                'tags': [s['name'] for s in entry.get('subjects', [])[:5] if s.get('name')],
+            }
+    return results
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _chunks(items, size=500):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _fresh_cache(isbns, now):
+    """缓存中未过期的条目，查到的和查不到的分别使用各自的有效期"""
+    config = current_app.config
+    found_after = now - timedelta(seconds=config['ISBN_CACHE_TTL'])
+    missing_after = now - timedelta(seconds=config['ISBN_NEGATIVE_TTL'])
+    fresh = {}
+    for chunk in _chunks(isbns):
+        for entry in IsbnCache.query.filter(IsbnCache.isbn13.in_(chunk)).all():
+            if entry.fetched_at >= (found_after if entry.found else missing_after):
+                fresh[entry.isbn13] = entry
+    return fresh
+
+
+def _fetch(isbns):
+    """依次询问各数据源，前一个查不到的交给下一个。
+
+    返回 ({isbn13: (数据源, 数据)}, 是否所有数据源都正常应答)。
+    """
+    found = {}
+    complete = True
+    remaining = list(isbns)
+    for name in current_app.config['ISBN_PROVIDERS']:
+        if not remaining:
+            break
+        try:
+            results = PROVIDERS[name](remaining)
+        except Exception:
+            current_app.logger.exception('ISBN 数据源 %s 查询失败', name)
+            complete = False
+            continue
+        for isbn, record in results.items():
+            data = _clean(record)
+            if data:
+                found[isbn] = (name, data)
+        remaining = [isbn for isbn in remaining if isbn not in found]
+    return found, complete
+
+
+def _store(found, not_found, now):
+    rows = [{'isbn13': isbn, 'found': True, 'provider': provider, **data}
+            for isbn, (provider, data) in found.items()]
+    rows += [{'isbn13': isbn, 'found': False, 'provider': None,
+              'title': None, 'author': None, 'publisher': None, 'tags': None} for isbn in not_found]
+    for row in rows:
+        row['fetched_at'] = row['last_used_at'] = now
+    if not rows:
+        return
+    statement = insert(IsbnCache)
+    statement = statement.on_conflict_do_update(
+        index_elements=[IsbnCache.isbn13],
+        set_={name: statement.excluded[name] for name in rows[0] if name != 'isbn13'}
+    )
+    db.session.execute(statement, rows)
+
+
+def _touch(isbns, now):
+    for chunk in _chunks(isbns):
+        IsbnCache.query.filter(IsbnCache.isbn13.in_(chunk)) \
+            .update({IsbnCache.last_used_at: now}, synchronize_session=False)
+
+
+def _evict():
+    """超出容量时删除最久未被查询的条目"""
+    excess = db.session.query(func.count(IsbnCache.isbn13)).scalar() - current_app.config['ISBN_CACHE_SIZE']
+    if excess > 0:
+        oldest = db.session.query(IsbnCache.isbn13).order_by(IsbnCache.last_used_at, IsbnCache.isbn13).limit(excess)
+        IsbnCache.query.filter(IsbnCache.isbn13.in_(oldest)).delete(synchronize_session=False)
+
+
+def lookup(values):
+    """批量查询 ISBN 对应的图书信息，先查缓存，未命中的交给数据源，结果写回缓存并提交。
+
+    返回与 values 顺序一致的列表，每项包含输入值、ISBN-13/ISBN-10、是否有效、是否查到和图书信息。
+    """
+    now = _utcnow()
+    canonical = [to_isbn13(value) for value in values]
+    wanted = sorted({isbn for isbn in canonical if isbn})
+
+    cached = _fresh_cache(wanted, now)
+    missing = [isbn for isbn in wanted if isbn not in cached]
+    fetched, complete = _fetch(missing) if missing else ({}, True)
+    # 有数据源出错时不能确定是真的查不到，不写负缓存
+    not_found = [isbn for isbn in missing if isbn not in fetched] if complete else []
+
+    # 提交会让缓存对象过期，先取出数据
+    books = {isbn: entry.to_dict() for isbn, entry in cached.items()}
+    books.update({isbn: dict(data, tags=split_tags(data['tags'])) for isbn, (_, data) in fetched.items()})
+
+    _store(fetched, not_found, now)
+    _touch(list(cached), now)
+    _evict()
+    db.session.commit()
+
+    results = []
+    for value, isbn13 in zip(values, canonical):
+        book = books.get(isbn13)
+        results.append({
+            'input': value,
+            'isbn13': isbn13,
+            'isbn10': to_isbn10(isbn13) if isbn13 else None,
+            'valid': isbn13 is not None,
+            'found': book is not None,
+            'book': book,
+        })
+    return results
@@ -0,0 +1,229 @@
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert
+from models import User, Book, BorrowRecord, Notification, db
+from services.overdue_service import OVERDUE_STATUSES
+from services.serializers import preload
+
+# 可被 worker 认领的状态：待投递，或租约已过期的投递中
+CLAIMABLE_STATUSES = ('pending', 'sending')
+
+# 渠道名 -> 投递函数，投递失败时抛出异常，由 worker 负责重试
+CHANNELS = {}
+
+
+def register_channel(name):
+    def decorator(sender):
+        CHANNELS[name] = sender
+        return sender
+    return decorator
+
+
+@register_channel('inbox')
+def _deliver_inbox(notification):
+    # 站内信就是通知表本身，标记为已发送后学生即可看到
+    pass
+
+
+@register_channel('email')
+def _deliver_email(notification):
+    config = current_app.config
+    user = db.session.get(User, notification.user_id)
+    message = EmailMessage()
+    message['Subject'] = notification.title
+    message['From'] = config['MAIL_SENDER']
+    message['To'] = config['MAIL_ADDRESS_FORMAT'].format(student_id=user.student_id)
+    message.set_content(notification.body or notification.title)
+    with smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=10) as smtp:
+        smtp.send_message(message)
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue(rows):
+    """批量写入发件箱，dedupe_key 已存在的通知会被跳过，不提交事务"""
+    if not rows:
+        return
+    statement = insert(Notification).on_conflict_do_nothing(index_elements=['dedupe_key'])
+    db.session.execute(statement, rows)
+
+
+def enqueue_overdue_reminders(record_ids=None):
+    """为逾期借阅生成提醒并入队。
+
+    指定 record_ids 时提醒其中仍在借的记录（管理员手动提醒），否则提醒全部逾期记录（定时任务）。
+    同一记录同一天每个渠道只入队一次。返回被提醒的记录列表。
+    """
+    now = _utcnow()
+    query = db.session.query(
+        BorrowRecord.id, BorrowRecord.borrower_id, BorrowRecord.due_at, User.name, Book.title
+    ).join(User, User.id == BorrowRecord.borrower_id).join(Book, Book.id == BorrowRecord.book_id)
+    if record_ids is not None:
+        query = query.filter(BorrowRecord.id.in_(record_ids), BorrowRecord.status == 'approved')
+    else:
+        query = query.filter(BorrowRecord.status.in_(OVERDUE_STATUSES), BorrowRecord.due_at < now)
+
+    channels = current_app.config['NOTIFICATION_CHANNELS']
+    today = now.date().isoformat()
+    reminded = []
+    rows = []
+    for record_id, user_id, due_at, name, title in query.all():
+        reminded.append({'record_id': record_id, 'borrower_name': name, 'book_title': title})
+        due = f'应于 {due_at:%Y-%m-%d} 归还，' if due_at else ''
+        for channel in channels:
+            rows.append({
+                'user_id': user_id,
+                'channel': channel,
+                'kind': 'overdue_reminder',
+                'title': f'《{title}》已逾期，请尽快归还',
+                'body': f'{name}同学，你借阅的《{title}》{due}请尽快归还到图书角。',
+                'dedupe_key': f'overdue:{record_id}:{today}:{channel}',
+                'next_attempt_at': now
+            })
+
+    enqueue(rows)
+    db.session.commit()
+    return reminded
+
+
+def _retry_delay(attempts):
+    base = current_app.config['NOTIFICATION_RETRY_BASE']
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def _claim(ids, now, lease_until):
+    """用一条条件 UPDATE 认领一批待投递的通知，返回认领成功的 id。
+
+    认领把状态改为 sending、next_attempt_at 推到租约到期时间，多个进程的 worker 同时取到
+    同一条时只有一个能命中；进程中途退出留下的 sending 通知在租约到期后可被重新认领。
+    RETURNING 直接给出本次命中的行，写事务只有这一条语句。
+    """
+    if not ids:
+        return []
+    claimed = db.session.execute(
+        update(Notification).where(
+            Notification.id.in_(ids),
+            Notification.status.in_(CLAIMABLE_STATUSES),
+            Notification.next_attempt_at <= now
+        ).values(status='sending', next_attempt_at=lease_until).returning(Notification.id),
+        execution_options={'synchronize_session': False}
+    ).scalars().all()
+    # 先提交认领，其他进程才能看到
+    db.session.commit()
+    return sorted(claimed)
+
+
+def deliver_batch(limit=None):
+    """认领并投递一批到期的通知，失败的按指数退避重试，返回本批处理的数量"""
+    config = current_app.config
+    limit = limit or config['NOTIFICATION_BATCH_SIZE']
+    now = _utcnow()
+
+    due = db.session.query(Notification.id).filter(
+        Notification.status.in_(CLAIMABLE_STATUSES),
+        Notification.next_attempt_at <= now
+    ).order_by(Notification.next_attempt_at, Notification.id).limit(limit)
+    lease_until = now + timedelta(seconds=config['NOTIFICATION_CLAIM_TIMEOUT'])
+    claimed = _claim([notification_id for (notification_id,) in due], now, lease_until)
+    if not claimed:
+        return 0
+
+    batch = Notification.query.filter(Notification.id.in_(claimed)) \
+        .order_by(Notification.id).all()
+    users = preload(User, (n.user_id for n in batch))
+
+    for notification in batch:
+        sender = CHANNELS.get(notification.channel)
+        try:
+            if sender is None:
+                raise LookupError(f'未知的通知渠道 {notification.channel}')
+            sender(notification)
+        except Exception as e:
+            notification.attempts += 1
+            notification.last_error = str(e)[:500]
+            if notification.attempts >= config['NOTIFICATION_MAX_ATTEMPTS']:
+                notification.status = 'failed'
+            else:
+                notification.status = 'pending'
+                notification.next_attempt_at = now + _retry_delay(notification.attempts)
+            continue
+        notification.status = 'sent'
+        notification.sent_at = now
+
+    db.session.commit()
+    return len(batch)
+
+
+def inbox_query(user_id, unread_only=False):
+    """学生可见的站内信：已投递的 inbox 渠道通知"""
+    query = Notification.query.filter(
+        Notification.user_id == user_id,
+        Notification.channel == 'inbox',
+        Notification.status == 'sent'
+    )
+    if unread_only:
+        query = query.filter(Notification.read_at.is_(None))
+    return query
+
+
+def unread_count(user_id):
+    return inbox_query(user_id, unread_only=True).count()
+
+
+def mark_read(user_id, notification_id=None):
+    """标记站内信为已读，不指定 notification_id 时全部标记，返回更新的条数"""
+    query = inbox_query(user_id, unread_only=True)
+    if notification_id is not None:
+        query = query.filter(Notification.id == notification_id)
+    updated = query.update({Notification.read_at: _utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return updated
+
+
+class NotificationWorker(threading.Thread):
+    """后台投递线程：循环清空发件箱，并按 OVERDUE_REMINDER_INTERVAL 定时生成逾期提醒"""
+
+    def __init__(self, app):
+        super().__init__(name='notification-worker', daemon=True)
+        self.app = app
+        self.stop_event = threading.Event()
+        self.last_scheduled = None
+
+    def run_once(self):
+        with self.app.app_context():
+            interval = current_app.config['OVERDUE_REMINDER_INTERVAL']
+            now = time.monotonic()
+            if interval and (self.last_scheduled is None or now - self.last_scheduled >= interval):
+                enqueue_overdue_reminders()
+                self.last_scheduled = now
+            return deliver_batch()
+
+    def run(self):
+        batch_size = self.app.config['NOTIFICATION_BATCH_SIZE']
+        poll_interval = self.app.config['NOTIFICATION_POLL_INTERVAL']
+        while not self.stop_event.is_set():
+            try:
+                delivered = self.run_once()
+            except Exception:
+                self.app.logger.exception('通知投递失败')
+                delivered = 0
+            # 一批没取满说明发件箱已空，等待下一轮
+            if delivered < batch_size:
+                self.stop_event.wait(poll_interval)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def start_worker(app):
+    worker = NotificationWorker(app)
+    worker.start()
+    return worker
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, func, update
+from models import BorrowRecord, db
+from services.pagination import keyset_paginate
+from services.serializers import serialize_borrow_records
+
+# 逾期天数分段：(名称, 最少天数, 最多天数)，None 表示不设上限
+BUCKETS = (
+    ('1-7', 1, 7),
+    ('8-14', 8, 14),
+    ('15-30', 15, 30),
+    ('30+', 31, None),
+)
+
+# 仍在借出、会产生逾期的记录状态
+OVERDUE_STATUSES = ('approved',)
+
+
+def _utcnow():
+    # SQLite 中的时间按无时区的 UTC 存储
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def due_date(approve_at, max_days):
+    return approve_at + timedelta(days=max_days)
+
+
+def recompute_due_dates(max_days):
+    """最大借阅天数修改后，按批准时间重算所有在借记录的应还日期，不提交事务。
+
+    在 Python 中计算再按主键批量更新：SQLite 的 datetime() 会丢掉微秒，存成的文本格式与
+    ORM 写入的不一致，due_at 的字符串比较就不可靠了。
+    """
+    rows = db.session.query(BorrowRecord.id, BorrowRecord.approve_at).filter(
+        BorrowRecord.status.in_(('approved', 'return_pending')),
+        BorrowRecord.approve_at.isnot(None)
+    ).all()
+    if rows:
+        db.session.execute(
+            update(BorrowRecord),
+            [{'id': record_id, 'due_at': due_date(approve_at, max_days)} for record_id, approve_at in rows]
+        )
+    return len(rows)
+
+
+def days_overdue(due_at, now=None):
+    """应还日期之后的第一天算逾期 1 天"""
+    return ((now or _utcnow()) - due_at).days + 1
+
+
+def bucket_of(days):
+    for name, low, high in BUCKETS:
+        if days >= low and (high is None or days <= high):
+            return name
+    return None
+
+
+def _bucket_bounds(name, now):
+    """分段对应的 due_at 区间 (lower, upper]，lower 为 None 表示不设下限"""
+    for bucket, low, high in BUCKETS:
+        if bucket == name:
+            upper = now - timedelta(days=low - 1)
+            lower = now - timedelta(days=high) if high is not None else None
+            return lower, upper
+    return None
+
+
+def overdue_query(bucket=None, now=None):
+    """逾期记录查询，走 (status, due_at) 索引；bucket 不合法时返回 None"""
+    now = now or _utcnow()
+    query = BorrowRecord.query.filter(
+        BorrowRecord.status.in_(OVERDUE_STATUSES),
+        BorrowRecord.due_at < now
+    )
+    if bucket is None:
+        return query
+
+    bounds = _bucket_bounds(bucket, now)
+    if bounds is None:
+        return None
+    lower, upper = bounds
+    query = query.filter(BorrowRecord.due_at <= upper)
+    if lower is not None:
+        query = query.filter(BorrowRecord.due_at > lower)
+    return query
+
+
+def bucket_counts(now=None):
+    """各逾期分段的记录数，一条 GROUP BY 查询完成"""
+    now = now or _utcnow()
+    whens = []
+    for name, _, high in BUCKETS:
+        if high is not None:
+            whens.append((BorrowRecord.due_at > now - timedelta(days=high), name))
+    label = case(*whens, else_=BUCKETS[-1][0])
+
+    rows = db.session.query(label, func.count(BorrowRecord.id)).filter(
+        BorrowRecord.status.in_(OVERDUE_STATUSES),
+        BorrowRecord.due_at < now
+    ).group_by(label).all()
+
+    counts = {name: 0 for name, _, _ in BUCKETS}
+    counts.update(dict(rows))
+    return counts
+
+
+def overdue_page(bucket=None, cursor=None, limit=20):
+    """按应还日期从早到晚分页返回逾期记录，返回 (records, next_cursor)，bucket 不合法时返回 None"""
+    now = _utcnow()
+    query = overdue_query(bucket, now)
+    if query is None:
+        return None
+
+    records, next_cursor = keyset_paginate(
+        query,
+        order_by=[(BorrowRecord.due_at, 'asc'), (BorrowRecord.id, 'asc')],
+        cursor=cursor,
+        limit=limit
+    )
+    result = serialize_borrow_records(records)
+    for record, data in zip(records, result):
+        days = days_overdue(record.due_at, now)
+        data['days_overdue'] = days
+        data['bucket'] = bucket_of(days)
+    return result, next_cursor
@@ -0,0 +1,107 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from models import db
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_limit(raw, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """解析分页大小，非法值回退为默认值"""
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(values):
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, order_by):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+    if not isinstance(values, list) or len(values) != len(order_by):
+        raise InvalidCursor(cursor)
+
+    decoded = []
+    for (expr, _), value in zip(order_by, values):
+        if value is not None and isinstance(expr.type, db.DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise InvalidCursor(cursor)
+        elif not _matches_type(expr.type, value):
+            raise InvalidCursor(cursor)
+        decoded.append(value)
+    return decoded
+
+
+def _matches_type(column_type, value):
+    """游标里的值必须是与排序列类型相符的标量，否则会原样进入 SQL 绑定参数"""
+    if value is None:
+        return True
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return False
+    if isinstance(column_type, db.Integer):
+        return isinstance(value, int)
+    if isinstance(column_type, (db.Float, db.Numeric)):
+        return isinstance(value, (int, float))
+    if isinstance(column_type, db.String):
+        return isinstance(value, str)
+    return True
+
+
+def _after(order_by, values):
+    """构造 (k1, k2, ...) 严格位于游标之后的条件"""
+    clauses = []
+    for i, (expr, direction) in enumerate(order_by):
+        prefix = [order_by[j][0] == values[j] for j in range(i)]
+        step = expr < values[i] if direction == 'desc' else expr > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+
+def order_clauses(order_by):
+    return [expr.desc() if direction == 'desc' else expr.asc() for expr, direction in order_by]
+
+
+def keyset_paginate(query, order_by, cursor=None, limit=DEFAULT_LIMIT):
+    """按 order_by 做键集分页。
+
+    order_by 为 [(列表达式, 'asc'|'desc'), ...]，最后一列必须唯一（通常是主键）。
+    返回 (items, next_cursor)，没有下一页时 next_cursor 为 None。
+    query 只有一个实体时 items 是对象列表，有多列（如对象 + 聚合值）时是元组列表。
+    """
+    width = len(query.column_descriptions)
+    if cursor:
+        query = query.filter(_after(order_by, decode_cursor(cursor, order_by)))
+
+    rows = query.add_columns(*[expr for expr, _ in order_by]) \
+        .order_by(*order_clauses(order_by)).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if width == 1:
+        items = [row[0] for row in rows]
+    else:
+        items = [tuple(row[:width]) for row in rows]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(list(rows[-1][width:]))
+    return items, next_cursor
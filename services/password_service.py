@@ -0,0 +1,58 @@
+import time
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+def current_method():
+    return current_app.config['PASSWORD_HASH_METHOD']
+
+
+@lru_cache(maxsize=16)
+def _method_prefix(method):
+    """哈希值 $ 之前的部分，包含算法和完整的成本参数（如 scrypt:32768:8:1）。
+
+    配置里可以只写算法名，由 werkzeug 补上默认参数，所以这里实际算一次来确定前缀。
+    """
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def hash_password(password, method=None):
+    return generate_password_hash(password, method=method or current_method())
+
+
+def needs_rehash(password_hash, method=None):
+    """已有哈希的算法或成本参数与当前策略不一致时需要重新计算"""
+    prefix = (password_hash or '').split('$', 1)[0]
+    return prefix != _method_prefix(method or current_method())
+
+
+def verify_and_update(user, password):
+    """校验密码；通过且哈希策略已变化时，用明文密码按新策略重新计算。
+
+    返回 (是否通过, 是否重新计算了哈希)，只有重新计算时调用方才需要提交。
+    """
+    if not user.password_hash or not check_password_hash(user.password_hash, password):
+        return False, False
+    if needs_rehash(user.password_hash):
+        user.password_hash = hash_password(password)
+        return True, True
+    return True, False
+
+
+# bench-login 默认对比的策略
+BENCHMARK_METHODS = ('scrypt:32768:8:1', 'scrypt:16384:8:1', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:260000')
+
+
+def benchmark(methods, rounds=10):
+    """测量每种策略下单进程每秒能完成多少次密码校验，返回 [(method, 每秒次数)]"""
+    results = []
+    for method in methods:
+        password_hash = generate_password_hash('benchmark-password', method=method)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            check_password_hash(password_hash, 'benchmark-password')
+        elapsed = time.perf_counter() - started
+        results.append((method, rounds / elapsed))
+    return results
@@ -0,0 +1,58 @@
+from sqlalchemy import func, case, update
+from models import Book, BookReview, db
+from services import recommendation_service
+
+RATINGS = (1, 2, 3, 4, 5)
+REVIEW_TYPES = ('recommend', 'warn', 'neutral')
+
+
+def _histogram_column(rating):
+    return getattr(Book, f'rating_{rating}')
+
+
+def _type_column(review_type):
+    return getattr(Book, f'{review_type}_count')
+
+
+def review_added(book_id, rating, review_type):
+    """把一条新书评累加到图书的汇总列，一条 UPDATE 完成，在调用方的事务中执行"""
+    histogram = _histogram_column(rating)
+    values = {
+        Book.rating_count: Book.rating_count + 1,
+        Book.rating_sum: Book.rating_sum + rating,
+        # SET 中引用的是更新前的值
+        Book.rating_avg: (Book.rating_sum + rating) * 1.0 / (Book.rating_count + 1),
+        histogram: histogram + 1,
+    }
+    if review_type in REVIEW_TYPES:
+        column = _type_column(review_type)
+        values[column] = column + 1
+    Book.query.filter(Book.id == book_id).update(values, synchronize_session=False)
+    # 评分是共同借阅相似度的权重
+    recommendation_service.mark_stale(book_id)
+
+
+def rebuild_ratings():
+    """从书评表重新计算全部图书的汇总列，返回有书评的图书数量"""
+    columns = [
+        BookReview.book_id.label('id'),
+        func.count(BookReview.id).label('rating_count'),
+        func.coalesce(func.sum(BookReview.rating), 0).label('rating_sum'),
+    ]
+    columns += [func.sum(case((BookReview.rating == n, 1), else_=0)).label(f'rating_{n}') for n in RATINGS]
+    columns += [func.sum(case((BookReview.review_type == t, 1), else_=0)).label(f'{t}_count')
+                for t in REVIEW_TYPES]
+    query = db.session.query(*columns).join(Book, Book.id == BookReview.book_id).group_by(BookReview.book_id)
+    rows = [dict(row._mapping) for row in query.all()]
+    for row in rows:
+        row['rating_avg'] = row['rating_sum'] / row['rating_count']
+
+    reset = {'rating_count': 0, 'rating_sum': 0, 'rating_avg': 0}
+    reset.update({f'rating_{n}': 0 for n in RATINGS})
+    reset.update({f'{t}_count': 0 for t in REVIEW_TYPES})
+    db.session.execute(update(Book).values(**reset))
+    if rows:
+        # 按主键批量更新
+        db.session.execute(update(Book), rows)
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,186 @@
+import heapq
+import math
+
+from sqlalchemy import and_, func
+from sqlalchemy.dialects.sqlite import insert
+from models import Book, BorrowRecord, BookReview, BookSimilarity, StaleSimilarity, db
+
+# 每本书保留的相似图书数量
+TOP_K = 20
+# 借阅完成但没有评价时按中等评分计权
+IMPLICIT_RATING = 3
+# 个性化推荐以最近完成的这么多次借阅为种子
+SEED_BORROWS = 20
+
+
+def mark_stale(book_id):
+    """图书的借阅或评分数据有变化，在调用方的事务中登记，由 refresh_stale 增量重算"""
+    statement = insert(StaleSimilarity).values(book_id=book_id).on_conflict_do_nothing()
+    db.session.execute(statement)
+
+
+def _interactions():
+    """已完成借阅的 (用户, 图书, 评分)，同一本书借过多次只算一次"""
+    return db.session.query(BorrowRecord.borrower_id, BorrowRecord.book_id, BookReview.rating) \
+        .outerjoin(BookReview, and_(BookReview.book_id == BorrowRecord.book_id,
+                                    BookReview.user_id == BorrowRecord.borrower_id)) \
+        .filter(BorrowRecord.status == 'completed') \
+        .distinct()
+
+
+def _weight(rating):
+    return (rating or IMPLICIT_RATING) / 5
+
+
+def _load_matrix(readers_of=None):
+    """读取 用户 × 图书 的稀疏矩阵，返回 (按用户的 {book_id: 权重}, 按图书的读者集合)。
+
+    权重为该用户对这本书的评分 / 5，未评价时按 IMPLICIT_RATING 计。
+    readers_of 为图书 id 子查询时，只读取借过这些书的用户的借阅。
+    """
+    rows = _interactions()
+    if readers_of is not None:
+        rows = rows.filter(BorrowRecord.borrower_id.in_(_completed_borrowers(readers_of)))
+
+    by_user = {}
+    readers = {}
+    for user_id, book_id, rating in rows.yield_per(1000):
+        by_user.setdefault(user_id, {})[book_id] = _weight(rating)
+        readers.setdefault(book_id, set()).add(user_id)
+    return by_user, readers
+
+
+def _completed_borrowers(book_ids):
+    return db.session.query(BorrowRecord.borrower_id) \
+        .filter(BorrowRecord.status == 'completed', BorrowRecord.book_id.in_(book_ids))
+
+
+def _completed_books(user_ids):
+    return db.session.query(BorrowRecord.book_id) \
+        .filter(BorrowRecord.status == 'completed', BorrowRecord.borrower_id.in_(user_ids))
+
+
+def _norms(by_user):
+    squares = {}
+    for items in by_user.values():
+        for book_id, weight in items.items():
+            squares[book_id] = squares.get(book_id, 0.0) + weight * weight
+    return {book_id: math.sqrt(total) for book_id, total in squares.items()}
+
+
+def _norms_for(book_ids):
+    """在 SQL 里按图书汇总向量长度，不把这些书的全部读者读进内存"""
+    pairs = _interactions().filter(BorrowRecord.book_id.in_(book_ids)).subquery()
+    weight = func.coalesce(pairs.c.rating, IMPLICIT_RATING) / 5.0
+    rows = db.session.query(pairs.c.book_id, func.sum(weight * weight)).group_by(pairs.c.book_id)
+    return {book_id: math.sqrt(total) for book_id, total in rows}
+
+
+def _top_similar(book_id, by_user, readers, norms, k):
+    """一本书与所有共同借阅过的图书的余弦相似度，返回得分最高的 k 个 (similar_book_id, score)"""
+    dots = {}
+    for user_id in readers.get(book_id, ()):
+        items = by_user[user_id]
+        weight = items[book_id]
+        for other, other_weight in items.items():
+            if other != book_id:
+                dots[other] = dots.get(other, 0.0) + weight * other_weight
+
+    norm = norms[book_id]
+    scores = ((other, dot / (norm * norms[other])) for other, dot in dots.items())
+    return heapq.nlargest(k, scores, key=lambda item: (item[1], -item[0]))
+
+
+def _store(book_ids, by_user, readers, norms, k):
+    rows = []
+    for book_id in book_ids:
+        if book_id not in readers:
+            continue
+        rows.extend({'book_id': book_id, 'similar_book_id': other, 'score': score}
+                    for other, score in _top_similar(book_id, by_user, readers, norms, k))
+    if rows:
+        db.session.execute(insert(BookSimilarity), rows)
+    return len(rows)
+
+
+def rebuild_similarities(k=TOP_K):
+    """全量重算所有图书的相似列表，返回写入的行数"""
+    by_user, readers = _load_matrix()
+    norms = _norms(by_user)
+
+    BookSimilarity.query.delete()
+    StaleSimilarity.query.delete()
+    count = _store(readers.keys(), by_user, readers, norms, k)
+    db.session.commit()
+    return count
+
+
+def refresh_stale(k=TOP_K):
+    """只重算受影响图书的相似列表，返回重算的图书数量。
+
+    一本书新增借阅后，它自己的向量长度和它与同一批读者借过的其他书的点积都会变化，
+    所以需要重算的是：待更新的书，以及借过它的读者借过的所有书（affected）。
+    计算 affected 的列表需要它们的读者的全部借阅和相关图书的向量长度，
+    读取量只和这部分借阅有关，与全部借阅历史的规模无关。
+    """
+    stale = [book_id for (book_id,) in db.session.query(StaleSimilarity.book_id)]
+    if not stale:
+        return 0
+
+    affected_query = _completed_books(_completed_borrowers(stale))
+    affected = sorted({book_id for (book_id,) in affected_query.distinct()} | set(stale))
+    # affected 的读者的全部借阅：足够算出 affected 与任何图书的点积
+    by_user, readers = _load_matrix(readers_of=affected_query)
+    norms = _norms_for(_completed_books(_completed_borrowers(affected_query)))
+
+    for i in range(0, len(affected), 500):
+        chunk = affected[i:i + 500]
+        BookSimilarity.query.filter(BookSimilarity.book_id.in_(chunk)).delete(synchronize_session=False)
+    _store(affected, by_user, readers, norms, k)
+    StaleSimilarity.query.filter(StaleSimilarity.book_id.in_(stale)).delete(synchronize_session=False)
+    db.session.commit()
+    return len(affected)
+
+
+def ensure_similarities():
+    """旧数据库首次启动时生成相似列表"""
+    if BookSimilarity.query.first() is not None:
+        return
+    if BorrowRecord.query.filter_by(status='completed').first() is None:
+        return
+    rebuild_similarities()
+
+
+def similar_books(book_id, limit=10):
+    """一本书的相似图书，按 (book_id, score) 索引一次查询，返回 [(Book, score)]"""
+    return db.session.query(Book, BookSimilarity.score) \
+        .join(BookSimilarity, BookSimilarity.similar_book_id == Book.id) \
+        .filter(BookSimilarity.book_id == book_id) \
+        .order_by(BookSimilarity.score.desc(), BookSimilarity.similar_book_id) \
+        .limit(limit).all()
+
+
+def recommend_for_user(user_id, limit=10):
+    """以用户最近完成的借阅为种子，汇总各自的相似列表，排除借过的书，返回 [(Book, score)]。
+
+    没有借阅历史或相似列表为空时，退回评分最高的未借过图书，score 为 None。
+    """
+    seeds = [book_id for (book_id,) in db.session.query(BorrowRecord.book_id)
+             .filter(BorrowRecord.borrower_id == user_id, BorrowRecord.status == 'completed')
+             .order_by(BorrowRecord.return_at.desc()).limit(SEED_BORROWS)]
+    borrowed = db.session.query(BorrowRecord.book_id).filter(BorrowRecord.borrower_id == user_id)
+
+    if seeds:
+        score = func.sum(BookSimilarity.score).label('score')
+        rows = db.session.query(Book, score) \
+            .join(BookSimilarity, BookSimilarity.similar_book_id == Book.id) \
+            .filter(BookSimilarity.book_id.in_(seeds), Book.id.notin_(borrowed)) \
+            .group_by(Book.id) \
+            .order_by(score.desc(), Book.id) \
+            .limit(limit).all()
+        if rows:
+            return rows
+
+    books = Book.query.filter(Book.id.notin_(borrowed), Book.rating_count > 0) \
+        .order_by(Book.rating_avg.desc(), Book.id.desc()).limit(limit).all()
+    return [(book, None) for book in books]
@@ -0,0 +1,165 @@
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from models import User, Book, BorrowRecord, BorrowDailyBook, BorrowDailyUser, BorrowDailyTrend, db
+
+WINDOWS = (7, 30, 90)
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+def _upsert(model, keys, counts):
+    statement = insert(model).values(**keys, **counts)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={name: getattr(model, name) + value for name, value in counts.items()}
+    )
+    db.session.execute(statement)
+
+
+def record_borrow(book_id, user_id, when=None):
+    """借阅审批通过时累加当天的汇总，在调用方的事务中执行"""
+    day = (when or datetime.now(timezone.utc)).date()
+    _upsert(BorrowDailyBook, {'day': day, 'book_id': book_id}, {'borrow_count': 1})
+    _upsert(BorrowDailyUser, {'day': day, 'user_id': user_id}, {'borrow_count': 1})
+    _upsert(BorrowDailyTrend, {'day': day}, {'borrows': 1, 'returns': 0})
+
+
+def record_return(when=None):
+    day = (when or datetime.now(timezone.utc)).date()
+    _upsert(BorrowDailyTrend, {'day': day}, {'borrows': 0, 'returns': 1})
+
+
+def term_range(term):
+    """学期编号转日期区间：2026-spring 为 2 月至 7 月，2026-autumn 为 8 月至次年 1 月"""
+    try:
+        year, season = term.split('-')
+        year = int(year)
+    except (AttributeError, ValueError):
+        return None
+    # 秋季学期延续到次年，年份超出 date 能表示的范围时视为无效
+    if not date.min.year <= year < date.max.year:
+        return None
+    if season == 'spring':
+        return date(year, 2, 1), date(year, 8, 1)
+    if season == 'autumn':
+        return date(year, 8, 1), date(year + 1, 2, 1)
+    return None
+
+
+def resolve_range(window=None, term=None, start=None, end=None):
+    """把 window（最近 N 天）、term 或 start/end 转成 [start, end) 日期区间。
+
+    都未指定时返回 (None, None) 表示全部时间；参数不合法时返回 None。
+    """
+    if term:
+        return term_range(term)
+    if window:
+        try:
+            days = int(window)
+        except (TypeError, ValueError):
+            return None
+        if days not in WINDOWS:
+            return None
+        today = _today()
+        return today - timedelta(days=days - 1), today + timedelta(days=1)
+    try:
+        start = date.fromisoformat(start) if start else None
+        end = date.fromisoformat(end) + timedelta(days=1) if end else None
+    except (ValueError, OverflowError):
+        return None
+    return start, end
+
+
+def _in_range(query, column, start, end):
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column < end)
+    return query
+
+
+def leaderboards(start=None, end=None, limit=10):
+    """热门图书榜和阅读排行榜，只读取日汇总表"""
+    book_total = func.sum(BorrowDailyBook.borrow_count)
+    books = db.session.query(BorrowDailyBook.book_id, book_total.label('count')) \
+        .group_by(BorrowDailyBook.book_id)
+    books = _in_range(books, BorrowDailyBook.day, start, end).subquery()
+    popular_books = db.session.query(Book.id, Book.title, books.c.count) \
+        .join(books, books.c.book_id == Book.id) \
+        .order_by(books.c.count.desc(), Book.id).limit(limit).all()
+
+    user_total = func.sum(BorrowDailyUser.borrow_count)
+    users = db.session.query(BorrowDailyUser.user_id, user_total.label('count')) \
+        .group_by(BorrowDailyUser.user_id)
+    users = _in_range(users, BorrowDailyUser.day, start, end).subquery()
+    top_readers = db.session.query(User.id, User.name, users.c.count) \
+        .join(users, users.c.user_id == User.id) \
+        .filter(User.is_admin == False) \
+        .order_by(users.c.count.desc(), User.id).limit(limit).all()
+
+    return {
+        'popular_books': [{'book_id': i, 'title': t, 'count': c} for i, t, c in popular_books],
+        'top_readers': [{'user_id': i, 'name': n, 'count': c} for i, n, c in top_readers]
+    }
+
+
+def trend(start, end):
+    """[start, end) 内每天的借出和归还数量，没有记录的日期补 0"""
+    rows = _in_range(BorrowDailyTrend.query, BorrowDailyTrend.day, start, end).all()
+    by_day = {r.day: r for r in rows}
+
+    result = []
+    day = start
+    while day < end:
+        row = by_day.get(day)
+        result.append({
+            'day': day.isoformat(),
+            'borrows': row.borrows if row else 0,
+            'returns': row.returns if row else 0
+        })
+        day += timedelta(days=1)
+    return result
+
+
+def rebuild_rollups():
+    """从借阅记录重新生成全部日汇总，返回统计的借出次数"""
+    BorrowDailyBook.query.delete()
+    BorrowDailyUser.query.delete()
+    BorrowDailyTrend.query.delete()
+
+    borrows = {}
+    returns = {}
+    per_book = {}
+    per_user = {}
+    approved = BorrowRecord.query.filter(BorrowRecord.approve_at.isnot(None)) \
+        .with_entities(BorrowRecord.book_id, BorrowRecord.borrower_id, BorrowRecord.approve_at,
+                       BorrowRecord.return_at, BorrowRecord.status)
+    for book_id, user_id, approve_at, return_at, status in approved.yield_per(1000):
+        day = approve_at.date()
+        borrows[day] = borrows.get(day, 0) + 1
+        per_book[(day, book_id)] = per_book.get((day, book_id), 0) + 1
+        per_user[(day, user_id)] = per_user.get((day, user_id), 0) + 1
+        if status == 'completed' and return_at:
+            returns[return_at.date()] = returns.get(return_at.date(), 0) + 1
+
+    db.session.add_all([BorrowDailyBook(day=d, book_id=b, borrow_count=c) for (d, b), c in per_book.items()])
+    db.session.add_all([BorrowDailyUser(day=d, user_id=u, borrow_count=c) for (d, u), c in per_user.items()])
+    db.session.add_all([
+        BorrowDailyTrend(day=d, borrows=borrows.get(d, 0), returns=returns.get(d, 0))
+        for d in set(borrows) | set(returns)
+    ])
+    db.session.commit()
+    return sum(borrows.values())
+
+
+def ensure_rollups():
+    """旧数据库首次启动时回填日汇总"""
+    if BorrowDailyTrend.query.first() is not None:
+        return
+    if BorrowRecord.query.filter(BorrowRecord.approve_at.isnot(None)).first() is None:
+        return
+    rebuild_rollups()
@@ -0,0 +1,100 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from flask import current_app
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from models import User, db
+from services import stats_service, identity_service
+from services.import_service import iter_rows, MAX_REPORTED_ERRORS
+
+# 与 admin.create_user 一致的初始密码
+DEFAULT_PASSWORD = '123456'
+
+# 少于这个数量时直接在当前进程计算，不值得启动进程池
+MIN_POOL_SIZE = 8
+
+
+def validate_row(row):
+    """校验花名册的一行，返回 ((student_id, name, password), error)"""
+    student_id = str(row.get('student_id') or '').strip()
+    name = str(row.get('name') or '').strip()
+    password = str(row.get('password') or '').strip() or DEFAULT_PASSWORD
+    if not student_id:
+        return None, '缺少学号'
+    if not name:
+        return None, '缺少姓名'
+    if len(student_id) > 20:
+        return None, '学号超过20个字符'
+    if len(name) > 50:
+        return None, '姓名超过50个字符'
+    return (student_id, name, password), None
+
+
+def hash_passwords(passwords, method, workers=None):
+    """并行计算密码哈希。scrypt 刻意设计得很慢，逐个计算时几百名学生要等几分钟"""
+    hasher = partial(generate_password_hash, method=method)
+    if len(passwords) < MIN_POOL_SIZE:
+        return [hasher(p) for p in passwords]
+    # 不能 fork：请求线程所在的进程里还有通知 worker 线程和打开的 SQLite 连接，
+    # fork 出的子进程会继承这些状态（包括被其他线程持有的锁）。spawn 启动干净的解释器
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return list(executor.map(hasher, passwords, chunksize=16))
+
+
+def import_roster(stream, fmt='csv'):
+    """导入学生花名册（student_id, name, password），全部在一个事务中写入。
+
+    已存在的学号和文件内重复的学号会被跳过，和校验失败的行一起列在 errors 里。
+    返回 {'total', 'imported', 'skipped', 'failed', 'errors': [{'line', 'message'}]}。
+    """
+    report = {'total': 0, 'imported': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+
+    def error(line_no, message, skipped=False):
+        report['skipped' if skipped else 'failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line_no, 'message': message})
+
+    candidates = {}
+    for line_no, row in iter_rows(stream, fmt):
+        report['total'] += 1
+        if isinstance(row, str):
+            error(line_no, row)
+            continue
+        values, message = validate_row(row)
+        if message:
+            error(line_no, message)
+            continue
+        if values[0] in candidates:
+            error(line_no, f'学号 {values[0]} 在文件中重复', skipped=True)
+            continue
+        candidates[values[0]] = (line_no, values)
+
+    # 一次查询找出已存在的学号
+    existing = set()
+    if candidates:
+        found = db.session.query(User.student_id).filter(User.student_id.in_(list(candidates))).all()
+        existing = {student_id for student_id, in found}
+
+    rows = []
+    for student_id, (line_no, (_, name, password)) in candidates.items():
+        if student_id in existing:
+            error(line_no, f'学号 {student_id} 已存在', skipped=True)
+            continue
+        rows.append({'student_id': student_id, 'name': name, 'password': password})
+
+    if rows:
+        config = current_app.config
+        hashes = hash_passwords([r.pop('password') for r in rows],
+                                config['PASSWORD_HASH_METHOD'], config['ROSTER_HASH_WORKERS'])
+        for row, password_hash in zip(rows, hashes):
+            row['password_hash'] = password_hash
+            row['is_admin'] = False
+        db.session.execute(insert(User), rows)
+        stats_service.students_added(len(rows))
+        # 新用户可能复用已删除用户的 id
+        identity_service.invalidate()
+        db.session.commit()
+        report['imported'] = len(rows)
+    return report
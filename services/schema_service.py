@@ -0,0 +1,88 @@
+from sqlalchemy import inspect, text
+from models import db
+from services.search_service import ensure_index
+from services.tag_service import ensure_tags
+from services.borrow_service import check_borrow_counters
+from services.stats_service import ensure_stats
+from services.rollup_service import ensure_rollups
+from services.overdue_service import recompute_due_dates
+from services.settings_service import get_max_borrow_days
+from services.rating_service import rebuild_ratings
+from services.recommendation_service import ensure_similarities
+from services.wishlist_service import rebuild_wish_keys
+from services.isbn_service import rebuild_isbn_keys
+
+
+def _repair_borrow_counters():
+    check_borrow_counters(repair=True)
+
+
+def _backfill_due_dates():
+    recompute_due_dates(get_max_borrow_days())
+    db.session.commit()
+
+
+# 新增后需要从历史数据回填的列
+BACKFILLED_COLUMNS = {
+    ('users', 'active_borrow_count'): _repair_borrow_counters,
+    ('books', 'current_borrow_record_id'): _repair_borrow_counters,
+    ('borrow_records', 'due_at'): _backfill_due_dates,
+    ('books', 'rating_count'): rebuild_ratings,
+    ('wish_lists', 'demand_key'): rebuild_wish_keys,
+    ('books', 'isbn_key'): rebuild_isbn_keys,
+}
+
+
+# 已不再使用、升级时删除的索引
+DROPPED_INDEXES = (
+    'ix_books_isbn',  # 导入去重改查 ix_books_isbn_key
+)
+
+
+def _column_ddl(column, dialect):
+    ddl = f'{column.name} {column.type.compile(dialect=dialect)}'
+    default = column.default
+    if default is not None and default.is_scalar:
+        value = default.arg
+        if isinstance(value, bool):
+            value = int(value)
+        ddl += f" DEFAULT {value!r}" if isinstance(value, str) else f' DEFAULT {value}'
+    return ddl
+
+
+def upgrade_schema():
+    """为已有数据库补齐新增的表、列和索引（create_all 只会创建缺失的表）"""
+    db.create_all()
+
+    engine = db.engine
+    inspector = inspect(engine)
+    added = []
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {_column_ddl(column, engine.dialect)}'))
+                added.append((table.name, column.name))
+
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        for name in DROPPED_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+
+    backfills = []
+    for key in added:
+        backfill = BACKFILLED_COLUMNS.get(key)
+        if backfill and backfill not in backfills:
+            backfills.append(backfill)
+    for backfill in backfills:
+        backfill()
+
+    ensure_index()
+    ensure_tags()
+    ensure_stats()
+    ensure_rollups()
+    ensure_similarities()
@@ -0,0 +1,157 @@
+import re
+
+from sqlalchemy import DDL, event, inspect, text
+from models import Book, split_tags, db
+
+FTS_TABLE = 'books_fts'
+FTS_COLUMNS = ['title', 'author', 'publisher', 'tags', 'isbn']
+# bm25 列权重，顺序与 FTS_COLUMNS 一致：书名最重要
+FTS_WEIGHTS = (10.0, 5.0, 2.0, 3.0, 1.0)
+
+CREATE_FTS = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    f"USING fts5({', '.join(FTS_COLUMNS)}, tokenize='unicode61')"
+)
+
+# 中日韩文字按字切分，其余按单词处理
+_CJK_RUN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_WORD = re.compile(r'\w+')
+
+event.listen(Book.__table__, 'after_create', DDL(CREATE_FTS).execute_if(dialect='sqlite'))
+event.listen(Book.__table__, 'before_drop', DDL(f'DROP TABLE IF EXISTS {FTS_TABLE}').execute_if(dialect='sqlite'))
+
+
+def _ngrams(run):
+    """单字 + 相邻二元组，保证单字和多字查询都能命中"""
+    grams = list(run)
+    grams.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return grams
+
+
+def tokenize(value):
+    """把文本转换成写入 FTS 表的词序列（中文 n-gram，其他原样交给 unicode61）"""
+    if not value:
+        return ''
+    tokens = []
+    pos = 0
+    for match in _CJK_RUN.finditer(value):
+        tokens.append(value[pos:match.start()])
+        tokens.extend(_ngrams(match.group()))
+        pos = match.end()
+    tokens.append(value[pos:])
+    return ' '.join(t.strip() for t in tokens if t.strip())
+
+
+def build_match_query(keyword):
+    """把用户输入的关键词转换成 FTS5 MATCH 表达式，无可用词时返回 None"""
+    terms = []
+    pos = 0
+    for match in _CJK_RUN.finditer(keyword or ''):
+        terms.extend(f'"{w}"*' for w in _WORD.findall(keyword[pos:match.start()]))
+        run = match.group()
+        if len(run) == 1:
+            terms.append(f'"{run}"')
+        else:
+            terms.extend(f'"{run[i:i + 2]}"' for i in range(len(run) - 1))
+        pos = match.end()
+    terms.extend(f'"{w}"*' for w in _WORD.findall((keyword or '')[pos:]))
+    return ' AND '.join(terms) if terms else None
+
+
+def _document(book):
+    isbn = book.isbn or ''
+    digits = re.sub(r'[^0-9Xx]', '', isbn)
+    return {
+        'rowid': book.id,
+        'title': tokenize(book.title),
+        'author': tokenize(book.author),
+        'publisher': tokenize(book.publisher),
+        'tags': tokenize(' '.join(split_tags(book.tags))),
+        'isbn': f'{isbn} {digits}' if digits != isbn else isbn
+    }
+
+
+def fts_ready(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': FTS_TABLE}
+    ).first() is not None
+
+
+_INSERT = text(
+    f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+    f"VALUES (:rowid, {', '.join(':' + c for c in FTS_COLUMNS)})"
+)
+_DELETE = text(f'DELETE FROM {FTS_TABLE} WHERE rowid = :rowid')
+
+
+def index_books(connection, books):
+    """写入/覆盖若干图书的索引，批量入库等绕过 ORM 事件的路径需要显式调用"""
+    documents = [_document(b) for b in books]
+    if not documents or not fts_ready(connection):
+        return
+    connection.execute(_DELETE, [{'rowid': d['rowid']} for d in documents])
+    connection.execute(_INSERT, documents)
+
+
+@event.listens_for(Book, 'after_insert')
+def _index_inserted(mapper, connection, target):
+    index_books(connection, [target])
+
+
+@event.listens_for(Book, 'after_update')
+def _index_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[c].history.has_changes() for c in FTS_COLUMNS):
+        index_books(connection, [target])
+
+
+@event.listens_for(Book, 'after_delete')
+def _unindex_deleted(mapper, connection, target):
+    if fts_ready(connection):
+        connection.execute(_DELETE, {'rowid': target.id})
+
+
+def rebuild_index():
+    """重建全文索引，返回索引的图书数量"""
+    connection = db.session.connection()
+    connection.execute(text(CREATE_FTS))
+    connection.execute(text(f'DELETE FROM {FTS_TABLE}'))
+
+    count = 0
+    last_id = 0
+    while True:
+        books = Book.query.filter(Book.id > last_id).order_by(Book.id).limit(500).all()
+        if not books:
+            break
+        index_books(connection, books)
+        count += len(books)
+        last_id = books[-1].id
+
+    db.session.commit()
+    return count
+
+
+def ensure_index():
+    """旧数据库首次启动时创建并填充全文索引"""
+    if db.engine.dialect.name != 'sqlite':
+        return
+    with db.engine.connect() as connection:
+        if fts_ready(connection):
+            return
+    rebuild_index()
+
+
+def ranked_matches(keyword):
+    """返回 (rowid, rank) 子查询，rank 越小越相关；不能使用全文索引时返回 None"""
+    match = build_match_query(keyword)
+    if not match or not fts_ready(db.session.connection()):
+        return None
+
+    weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+    return text(
+        f'SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank '
+        f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match'
+    ).bindparams(match=match).columns(rowid=db.Integer, rank=db.Float).subquery('fts_match')
@@ -0,0 +1,109 @@
+from sqlalchemy.orm.util import identity_key
+from models import User, Book, BorrowRecord, db
+
+CHUNK_SIZE = 500
+
+
+def parse_fields(raw):
+    """解析 ?fields=a,b,c，未指定时返回 None 表示全部字段"""
+    if not raw:
+        return None
+    fields = {f.strip() for f in raw.split(',') if f.strip()}
+    return fields or None
+
+
+def _wants(fields, *names):
+    return fields is None or any(name in fields for name in names)
+
+
+def project(data, fields):
+    if fields is None:
+        return data
+    return {k: v for k, v in data.items() if k in fields or k == 'id'}
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), CHUNK_SIZE):
+        yield ids[i:i + CHUNK_SIZE]
+
+
+def preload(model, ids):
+    """用 IN 查询批量加载对象到会话的 identity map。
+
+    之后按外键访问多对一关系（如 record.book）会直接命中 identity map，不再发 SELECT。
+    identity map 是弱引用，调用方需要持有返回的字典直到序列化结束。
+    """
+    loaded = {}
+    missing = set()
+    for i in {i for i in ids if i is not None}:
+        obj = db.session.identity_map.get(identity_key(model, i))
+        if obj is not None:
+            loaded[i] = obj
+        else:
+            missing.add(i)
+
+    for chunk in _chunks(missing):
+        for obj in model.query.filter(model.id.in_(chunk)).all():
+            loaded[obj.id] = obj
+    return loaded
+
+
+def serialize_borrow_records(records, fields=None):
+    records = list(records)
+    books = preload(Book, (r.book_id for r in records))
+    users = preload(User, (r.borrower_id for r in records))
+    return [project(r.to_dict(), fields) for r in records]
+
+
+def serialize_books(books, fields=None, view='full'):
+    """批量序列化图书，查询次数与图书数量无关"""
+    books = list(books)
+    if not books:
+        return []
+
+    donors = preload(User, (b.donor_id for b in books))
+
+    want_history = view == 'full' and _wants(fields, 'borrow_history')
+    want_current = view == 'full' and _wants(fields, 'current_borrow')
+
+    holding = {'borrowed', 'pending_borrow', 'pending_return'}
+
+    records = []
+    if want_history:
+        for chunk in _chunks([b.id for b in books]):
+            records.extend(BorrowRecord.query.filter(BorrowRecord.book_id.in_(chunk))
+                           .order_by(BorrowRecord.id).all())
+    elif want_current:
+        current_ids = [b.current_borrow_record_id for b in books if b.status in holding]
+        records = sorted(preload(BorrowRecord, current_ids).values(), key=lambda r: r.id)
+
+    serialized = {r.id: d for r, d in zip(records, serialize_borrow_records(records))}
+    history_by_book = {}
+    for record in records:
+        history_by_book.setdefault(record.book_id, []).append(serialized[record.id])
+
+    result = []
+    for book in books:
+        data = book.to_summary_dict()
+        if want_history:
+            data['borrow_history'] = history_by_book.get(book.id, [])
+        if want_current:
+            data['current_borrow'] = None
+            if book.status in holding and book.current_borrow_record_id:
+                data['current_borrow'] = serialized.get(book.current_borrow_record_id)
+        result.append(project(data, fields))
+    return result
+
+
+def serialize_reviews(reviews, fields=None):
+    reviews = list(reviews)
+    books = preload(Book, (r.book_id for r in reviews))
+    users = preload(User, (r.user_id for r in reviews))
+    return [project(r.to_dict(), fields) for r in reviews]
+
+
+def serialize_donations(donations, fields=None):
+    donations = list(donations)
+    users = preload(User, (d.user_id for d in donations))
+    return [project(d.to_dict(), fields) for d in donations]
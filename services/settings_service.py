@@ -0,0 +1,142 @@
+import threading
+import time
+import uuid
+
+from flask import current_app
+from models import Setting, db
+from services import overdue_service
+
+# 可配置项及其类型，默认值统一来自 config.Config
+SETTING_TYPES = {
+    'max_borrow_days': int,
+    'max_books_per_user': int,
+}
+
+DEFAULT_CONFIG_KEYS = {
+    'max_borrow_days': 'MAX_BORROW_DAYS',
+    'max_books_per_user': 'MAX_BOOKS_PER_USER',
+}
+
+# 每次修改设置都会写入新的版本号，其他进程据此发现变化
+VERSION_KEY = '_version'
+
+
+class _SettingsCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = None
+        self.version = None
+        self.checked_at = 0.0
+        self.hits = 0
+        self.reloads = 0
+
+    def invalidate(self):
+        with self.lock:
+            self.values = None
+            self.checked_at = 0.0
+
+
+_cache = _SettingsCache()
+
+
+def get_defaults():
+    return {key: current_app.config[name] for key, name in DEFAULT_CONFIG_KEYS.items()}
+
+
+def _convert(key, value):
+    convert = SETTING_TYPES.get(key, str)
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        return get_defaults().get(key)
+
+
+def _current_version():
+    return db.session.query(Setting.value).filter(Setting.key == VERSION_KEY).scalar()
+
+
+def _load():
+    values = dict(get_defaults())
+    version = None
+    for setting in Setting.query.all():
+        if setting.key == VERSION_KEY:
+            version = setting.value
+        elif not setting.key.startswith('_'):
+            values[setting.key] = _convert(setting.key, setting.value)
+    return values, version
+
+
+def get_all():
+    """返回全部设置（已转换类型）。
+
+    缓存在 SETTINGS_CACHE_TTL 秒内直接命中，不查询数据库；过期后只查询版本号，
+    版本变化时才重新加载。
+    """
+    ttl = current_app.config.get('SETTINGS_CACHE_TTL', 5)
+    now = time.monotonic()
+    cache = _cache
+
+    if cache.values is not None and now - cache.checked_at < ttl:
+        cache.hits += 1
+        return cache.values
+
+    with cache.lock:
+        if cache.values is not None and _current_version() == cache.version:
+            cache.checked_at = now
+            cache.hits += 1
+            return cache.values
+
+        cache.values, cache.version = _load()
+        cache.checked_at = now
+        cache.reloads += 1
+        return cache.values
+
+
+def get(key):
+    return get_all().get(key)
+
+
+def get_max_borrow_days():
+    return get('max_borrow_days')
+
+
+def get_max_books_per_user():
+    return get('max_books_per_user')
+
+
+def update(data):
+    """写入设置并更新版本号，最大借阅天数变化时同步重算在借记录的应还日期"""
+    old_max_days = get_max_borrow_days()
+    for key, value in data.items():
+        if key.startswith('_'):
+            continue
+        setting = Setting.query.filter_by(key=key).first()
+        if setting:
+            setting.value = str(value)
+        else:
+            db.session.add(Setting(key=key, value=str(value)))
+
+    version = Setting.query.filter_by(key=VERSION_KEY).first()
+    if version is None:
+        version = Setting(key=VERSION_KEY)
+        db.session.add(version)
+    version.value = uuid.uuid4().hex
+
+    if 'max_borrow_days' in data:
+        new_max_days = _convert('max_borrow_days', data['max_borrow_days'])
+        if new_max_days != old_max_days:
+            overdue_service.recompute_due_dates(new_max_days)
+    db.session.commit()
+    _cache.invalidate()
+
+
+def invalidate_cache():
+    _cache.invalidate()
+
+
+def cache_stats():
+    return {
+        'hits': _cache.hits,
+        'reloads': _cache.reloads,
+        'version': _cache.version
+    }
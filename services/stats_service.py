@@ -0,0 +1,78 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from models import User, Book, BorrowRecord, DonationRequest, DashboardStat, db
+
+# 计数器键：books.total、books.status.<状态>、borrows.status.<状态>、
+# donations.status.<状态>、users.students
+
+
+def bump(key, delta=1):
+    """原子地增减计数器，在调用方的事务中执行"""
+    if not delta:
+        return
+    statement = insert(DashboardStat).values(key=key, value=delta)
+    statement = statement.on_conflict_do_update(
+        index_elements=[DashboardStat.key],
+        set_={'value': DashboardStat.value + delta}
+    )
+    db.session.execute(statement)
+
+
+def _status_changed(prefix, old, new, count=1):
+    if old == new:
+        return
+    if old is not None:
+        bump(f'{prefix}.status.{old}', -count)
+    if new is not None:
+        bump(f'{prefix}.status.{new}', count)
+
+
+def book_added(status='available', count=1):
+    bump('books.total', count)
+    _status_changed('books', None, status, count)
+
+
+def book_status_changed(old, new):
+    _status_changed('books', old, new)
+
+
+def borrow_status_changed(old, new):
+    _status_changed('borrows', old, new)
+
+
+def donation_status_changed(old, new):
+    _status_changed('donations', old, new)
+
+
+def students_added(count=1):
+    bump('users.students', count)
+
+
+def get_stats():
+    """读取全部计数器，一次查询"""
+    return {key: value for key, value in db.session.query(DashboardStat.key, DashboardStat.value).all()}
+
+
+def _group_counts(prefix, model):
+    rows = db.session.query(model.status, func.count(model.id)).group_by(model.status).all()
+    return {f'{prefix}.status.{status}': count for status, count in rows if status is not None}
+
+
+def rebuild_stats():
+    """从业务表重新计算全部计数器，返回计数器字典"""
+    stats = {'books.total': Book.query.count()}
+    stats.update(_group_counts('books', Book))
+    stats.update(_group_counts('borrows', BorrowRecord))
+    stats.update(_group_counts('donations', DonationRequest))
+    stats['users.students'] = User.query.filter_by(is_admin=False).count()
+
+    DashboardStat.query.delete()
+    db.session.add_all([DashboardStat(key=key, value=value) for key, value in stats.items()])
+    db.session.commit()
+    return stats
+
+
+def ensure_stats():
+    """旧数据库首次启动时初始化计数器"""
+    if DashboardStat.query.first() is None:
+        rebuild_stats()
@@ -0,0 +1,82 @@
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from models import Book, Tag, book_tags, split_tags, db
+
+
+def get_or_create_tags(session, names):
+    """按名称取标签，不存在的新建；返回与 names 顺序一致的 Tag 列表"""
+    if not names:
+        return []
+    # 同一次 flush 里其他图书刚新建、尚未写库的标签
+    existing = {t.name: t for t in session.new if isinstance(t, Tag) and t.name in names}
+    with session.no_autoflush:
+        for tag in session.query(Tag).filter(Tag.name.in_(names)).all():
+            existing.setdefault(tag.name, tag)
+    for name in names:
+        if name not in existing:
+            existing[name] = Tag(name=name)
+            session.add(existing[name])
+    return [existing[name] for name in names]
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_book_tags(session, flush_context, instances):
+    """Book.tags 字段变化时同步 book_tags 关联表"""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Book):
+            continue
+        if obj in session.dirty and not inspect(obj).attrs.tags.history.has_changes():
+            continue
+        obj.tag_items = get_or_create_tags(session, split_tags(obj.tags))
+
+
+def tagged_book_ids(name):
+    """带有指定标签的图书 id 子查询，走 book_tags(tag_id, book_id) 索引"""
+    return db.session.query(book_tags.c.book_id) \
+        .join(Tag, Tag.id == book_tags.c.tag_id) \
+        .filter(Tag.name == name)
+
+
+def filter_by_tag(query, name):
+    return query.filter(Book.id.in_(tagged_book_ids(name)))
+
+
+def tag_counts(limit=None):
+    """每个标签的图书数量，一次 GROUP BY 完成"""
+    count = func.count(book_tags.c.book_id)
+    query = db.session.query(Tag.name, count.label('count')) \
+        .join(book_tags, book_tags.c.tag_id == Tag.id) \
+        .group_by(Tag.id) \
+        .order_by(count.desc(), Tag.name)
+    if limit:
+        query = query.limit(limit)
+    return [{'name': name, 'count': n} for name, n in query.all()]
+
+
+def rebuild_tags():
+    """根据 Book.tags 字段重建标签关联，返回处理的图书数量"""
+    db.session.execute(book_tags.delete())
+    count = 0
+    last_id = 0
+    while True:
+        books = Book.query.filter(Book.id > last_id).order_by(Book.id).limit(500).all()
+        if not books:
+            break
+        for book in books:
+            book.tag_items = get_or_create_tags(db.session, split_tags(book.tags))
+        db.session.flush()
+        count += len(books)
+        last_id = books[-1].id
+
+    Tag.query.filter(~Tag.id.in_(db.session.query(book_tags.c.tag_id))).delete(synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def ensure_tags():
+    """旧数据库首次启动时从 tags 字段回填标签表"""
+    if db.session.query(book_tags).first() is not None:
+        return
+    if Book.query.filter(Book.tags.isnot(None), Book.tags != '').first() is None:
+        return
+    rebuild_tags()
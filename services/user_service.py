@@ -0,0 +1,59 @@
+import sys
+
+from sqlalchemy import func, or_
+from models import User, BorrowRecord, db
+
+# 排序参数 -> 排序列，均以 User.id 作为最后的唯一键
+SORTS = ('student_id', 'name', 'created_at', 'active_borrows', 'total_borrows')
+
+
+def prefix_range(column, prefix):
+    """前缀匹配写成 column >= prefix AND column < 下一个前缀，可以走普通 B 树索引。
+
+    SQLite 的 LIKE 'x%' 默认不区分大小写，无法使用按二进制排序的索引。
+    """
+    # 末尾的 U+10FFFF 没有下一个字符，进位到前一个字符；全部是 U+10FFFF 时没有上界
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return column >= prefix
+    upper = stem[:-1] + chr(ord(stem[-1]) + 1)
+    return (column >= prefix) & (column < upper)
+
+
+def _total_borrows():
+    return db.session.query(
+        BorrowRecord.borrower_id.label('user_id'),
+        func.count(BorrowRecord.id).label('total_borrows')
+    ).group_by(BorrowRecord.borrower_id).subquery('borrow_totals')
+
+
+def directory_query(keyword=None, sort='student_id'):
+    """用户目录查询，返回 (query, sort_column)。
+
+    query 的每行是 (User, total_borrows)，累计借阅数通过一次分组子查询左连接得到。
+    """
+    totals = _total_borrows()
+    total_borrows = func.coalesce(totals.c.total_borrows, 0)
+    query = db.session.query(User, total_borrows.label('total_borrows')) \
+        .outerjoin(totals, totals.c.user_id == User.id)
+
+    keyword = (keyword or '').strip()
+    if keyword:
+        query = query.filter(or_(prefix_range(User.student_id, keyword), prefix_range(User.name, keyword)))
+
+    columns = {
+        'student_id': User.student_id,
+        'name': User.name,
+        'created_at': User.created_at,
+        'active_borrows': User.active_borrow_count,
+        'total_borrows': total_borrows,
+    }
+    return query, columns[sort]
+
+
+def directory_entry(user, total_borrows):
+    data = user.to_dict()
+    data['active_borrows'] = user.active_borrow_count
+    data['total_borrows'] = total_borrows
+    data['created_at'] = user.created_at.isoformat() if user.created_at else None
+    return data
@@ -0,0 +1,147 @@
+import unicodedata
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import event, func, or_
+from sqlalchemy.orm import Session
+from models import WishList, db
+from services import notification_service
+from services.isbn_service import to_isbn13
+from services.serializers import preload
+
+
+def normalize_text(value):
+    """NFKC 规范化（全角转半角）并忽略大小写，只保留文字和数字，去掉空格、标点和书名号"""
+    value = unicodedata.normalize('NFKC', value or '').casefold()
+    return ''.join(ch for ch in value if ch.isalnum())
+
+
+def match_keys(title, author, isbn):
+    """返回 (isbn13, title_key, author_key, demand_key)"""
+    isbn13 = to_isbn13(isbn)
+    title_key = normalize_text(title)[:100]
+    author_key = normalize_text(author)[:50]
+    demand_key = f'isbn:{isbn13}' if isbn13 else f'title:{title_key}|{author_key}'
+    return isbn13, title_key, author_key, demand_key
+
+
+def _apply_keys(wish):
+    wish.isbn13, wish.title_key, wish.author_key, wish.demand_key = \
+        match_keys(wish.book_title, wish.author, wish.isbn)
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_wish_keys(session, flush_context, instances):
+    """心愿的书名、作者、ISBN 变化时重新生成匹配键"""
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, WishList):
+            _apply_keys(obj)
+
+
+def rebuild_wish_keys():
+    """为全部心愿重新生成匹配键，返回处理的数量"""
+    count = 0
+    last_id = 0
+    while True:
+        wishes = WishList.query.filter(WishList.id > last_id).order_by(WishList.id).limit(500).all()
+        if not wishes:
+            break
+        for wish in wishes:
+            _apply_keys(wish)
+        db.session.flush()
+        count += len(wishes)
+        last_id = wishes[-1].id
+    db.session.commit()
+    return count
+
+
+def most_wanted(limit=20):
+    """待满足心愿按同一本书聚合，按想看的学生人数倒序，一次 GROUP BY 完成"""
+    wishers = func.count(func.distinct(WishList.user_id)).label('wishers')
+    rows = db.session.query(WishList.demand_key, wishers, func.min(WishList.id).label('sample_id')) \
+        .filter(WishList.status == 'pending') \
+        .group_by(WishList.demand_key) \
+        .order_by(wishers.desc(), WishList.demand_key) \
+        .limit(limit).all()
+
+    # 每组取最早的一条心愿作为书名、作者的展示
+    samples = preload(WishList, [row.sample_id for row in rows])
+    result = []
+    for demand_key, count, sample_id in rows:
+        sample = samples[sample_id]
+        result.append({
+            'demand_key': demand_key,
+            'wishers': count,
+            'book_title': sample.book_title,
+            'author': sample.author,
+            'isbn': sample.isbn13 or sample.isbn,
+        })
+    return result
+
+
+def _matching_book(wish, by_isbn, by_title):
+    if wish.isbn13 and wish.isbn13 in by_isbn:
+        return by_isbn[wish.isbn13]
+    for book_isbn13, author_key, book in by_title.get(wish.title_key, ()):
+        # 心愿和图书都有 ISBN 但不同，视为不同版本
+        if wish.isbn13 and book_isbn13 and wish.isbn13 != book_isbn13:
+            continue
+        if not wish.author_key or wish.author_key == author_key:
+            return book
+    return None
+
+
+def fulfil_matching(books):
+    """新书入库后满足匹配的待处理心愿，并给心愿人发入库通知。不提交事务。
+
+    books 是带 id、title、author、isbn 的对象（Book 或查询结果行）。
+    ISBN 相同直接匹配；书名相同且心愿没写作者或作者一致时也匹配。返回被满足的心愿数量。
+    """
+    by_isbn = {}
+    by_title = {}
+    for book in books:
+        isbn13, title_key, author_key, _ = match_keys(book.title, book.author, book.isbn)
+        if isbn13:
+            by_isbn.setdefault(isbn13, book)
+        if title_key:
+            by_title.setdefault(title_key, []).append((isbn13, author_key, book))
+    if not by_isbn and not by_title:
+        return 0
+
+    conditions = []
+    if by_isbn:
+        conditions.append(WishList.isbn13.in_(list(by_isbn)))
+    if by_title:
+        conditions.append(WishList.title_key.in_(list(by_title)))
+    candidates = db.session.query(
+        WishList.id, WishList.user_id, WishList.isbn13, WishList.title_key, WishList.author_key
+    ).filter(WishList.status == 'pending', or_(*conditions)).all()
+
+    matched = {}
+    for wish in candidates:
+        book = _matching_book(wish, by_isbn, by_title)
+        if book is not None:
+            matched.setdefault(book.id, (book, []))[1].append(wish)
+    if not matched:
+        return 0
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    channels = current_app.config['NOTIFICATION_CHANNELS']
+    rows = []
+    count = 0
+    for book_id, (book, wishes) in matched.items():
+        count += WishList.query.filter(WishList.id.in_([w.id for w in wishes]), WishList.status == 'pending') \
+            .update({WishList.status: 'fulfilled', WishList.fulfilled_book_id: book_id}, synchronize_session=False)
+        for wish in wishes:
+            for channel in channels:
+                rows.append({
+                    'user_id': wish.user_id,
+                    'channel': channel,
+                    'kind': 'wish_fulfilled',
+                    'title': f'你想看的《{book.title}》已入库',
+                    'body': f'心愿单里的《{book.title}》已经上架，可以去图书角借阅了。',
+                    'dedupe_key': f'wish:{wish.id}:{channel}',
+                    'next_attempt_at': now
+                })
+    notification_service.enqueue(rows)
+    return count
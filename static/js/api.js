@@ -19,10 +19,26 @@ async function request(url, options = {}) {
     return data;
 }
 
+// 上传文件不能走 request() 的 JSON 请求头
+async function upload(url, file) {
+    const form = new FormData();
+    form.append('file', file);
+    const response = await fetch(`${API_BASE}${url}`, {
+        method: 'POST',
+        body: form,
+        credentials: 'same-origin'
+    });
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.message || '请求失败');
+    }
+    return data;
+}
+
 export const authApi = {
-    login: (student_id, password) => request('/auth/login', {
+    login: (student_id, password, remember = false) => request('/auth/login', {
         method: 'POST',
-        body: JSON.stringify({ student_id, password })
+        body: JSON.stringify({ student_id, password, remember })
     }),
     logout: () => request('/auth/logout', { method: 'POST' }),
     me: () => request('/auth/me')
@@ -35,6 +51,9 @@ export const bookApi = {
     },
     get: (id) => request(`/books/${id}`),
     create: (data) => request('/books', { method: 'POST', body: JSON.stringify(data) }),
+    importFile: (file) => upload('/books/import', file),
+    lookupIsbn: (isbn) => request(`/books/isbn/${encodeURIComponent(isbn)}`),
+    lookupIsbns: (isbns) => request('/books/isbn', { method: 'POST', body: JSON.stringify({ isbns }) }),
     update: (id, data) => request(`/books/${id}`, { method: 'PUT', body: JSON.stringify(data) }),
     updateStatus: (id, status) => request(`/books/${id}/status`, {
         method: 'PUT',
@@ -53,10 +72,27 @@ export const adminApi = {
     approveBorrow: (id) => request(`/admin/borrows/${id}/approve`, { method: 'PUT' }),
     rejectBorrow: (id) => request(`/admin/borrows/${id}/reject`, { method: 'PUT' }),
     confirmReturn: (id) => request(`/admin/borrows/${id}/confirm-return`, { method: 'PUT' }),
+    bulkApproveBorrows: (recordIds) => request('/admin/borrows/bulk-approve', {
+        method: 'PUT',
+        body: JSON.stringify({ record_ids: recordIds })
+    }),
+    bulkRejectBorrows: (recordIds) => request('/admin/borrows/bulk-reject', {
+        method: 'PUT',
+        body: JSON.stringify({ record_ids: recordIds })
+    }),
+    bulkConfirmReturns: (recordIds) => request('/admin/borrows/bulk-confirm-return', {
+        method: 'PUT',
+        body: JSON.stringify({ record_ids: recordIds })
+    }),
     getUsers: () => request('/admin/users'),
+    listUsers: (params = {}) => request(`/admin/users?${new URLSearchParams(params)}`),
     createUser: (data) => request('/admin/users', { method: 'POST', body: JSON.stringify(data) }),
+    importUsers: (file) => upload('/admin/users/import', file),
     deleteUser: (id) => request(`/admin/users/${id}`, { method: 'DELETE' }),
     getDashboard: () => request('/admin/dashboard'),
+    // 导出是文件下载，返回地址交给浏览器直接打开
+    exportUrl: (kind, params = {}) => `${API_BASE}/admin/export/${kind}?${new URLSearchParams(params)}`,
+    getOverdue: (params = {}) => request(`/admin/overdue?${new URLSearchParams(params)}`),
     getSettings: () => request('/admin/settings'),
     updateSettings: (data) => request('/admin/settings', { method: 'PUT', body: JSON.stringify(data) }),
     sendReminder: (recordIds) => request('/admin/overdue/send-reminder', {
@@ -65,6 +101,13 @@ export const adminApi = {
     })
 };
 
+export const notificationApi = {
+    list: (params = {}) => request(`/notifications?${new URLSearchParams(params)}`),
+    unreadCount: () => request('/notifications/unread-count'),
+    markRead: (id) => request(`/notifications/${id}/read`, { method: 'PUT' }),
+    markAllRead: () => request('/notifications/read-all', { method: 'PUT' })
+};
+
 export const donorApi = {
     getConfirms: () => request('/donor/confirms'),
     approve: (id) => request(`/donor/confirms/${id}/approve`, { method: 'PUT' }),
@@ -72,18 +115,31 @@ export const donorApi = {
 };
 
 export const reviewApi = {
-    getBookReviews: (bookId) => request(`/books/${bookId}/reviews`),
+    getBookReviews: (bookId, params = {}) => {
+        const query = new URLSearchParams(params).toString();
+        return request(`/books/${bookId}/reviews?${query}`);
+    },
+    latest: (params = {}) => {
+        const query = new URLSearchParams(params).toString();
+        return request(`/reviews/latest?${query}`);
+    },
     createReview: (bookId, data) => request(`/books/${bookId}/reviews`, {
         method: 'POST',
         body: JSON.stringify(data)
     })
 };
 
+export const recommendationApi = {
+    similar: (bookId, limit = 5) => request(`/books/${bookId}/similar?limit=${limit}`),
+    forMe: (limit = 5) => request(`/recommendations?limit=${limit}`)
+};
+
 export const wishlistApi = {
     list: () => request('/wishlists'),
     add: (data) => request('/wishlists', { method: 'POST', body: JSON.stringify(data) }),
     delete: (id) => request(`/wishlists/${id}`, { method: 'DELETE' }),
     adminList: (status) => request(`/admin/wishlists${status ? `?status=${status}` : ''}`),
+    mostWanted: (limit = 20) => request(`/admin/wishlists/most-wanted?limit=${limit}`),
     fulfill: (id) => request(`/admin/wishlists/${id}/fulfill`, { method: 'PUT' }),
     reject: (id) => request(`/admin/wishlists/${id}/reject`, { method: 'PUT' })
 };
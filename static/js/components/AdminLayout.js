@@ -1,6 +1,6 @@
 const { ref, computed, onMounted } = Vue;
 const { ElBadge } = ElementPlus;
-import { adminApi, wishlistApi } from '../api.js';
+import { adminApi, wishlistApi, authApi } from '../api.js';
 
 export default {
     name: 'AdminLayout',
@@ -37,9 +37,13 @@ export default {
             return route.path;
         });
 
-        const logout = () => {
-            localStorage.removeItem('user');
-            window.location.href = '/#/login';
+        const logout = async () => {
+            try {
+                await authApi.logout();
+            } finally {
+                localStorage.removeItem('user');
+                window.location.href = '/#/login';
+            }
         };
 
         // 定时刷新待审核数量
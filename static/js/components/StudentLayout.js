@@ -1,4 +1,5 @@
 const { ref, onMounted } = Vue;
+import { notificationApi, authApi } from '../api.js';
 
 export default {
     name: 'StudentLayout',
@@ -12,6 +13,8 @@ export default {
         const user = ref(JSON.parse(localStorage.getItem('user') || 'null'));
         const isAdmin = ref(user.value?.is_admin || false);
         const pendingDonationCount = ref(0);
+        const notifications = ref([]);
+        const unreadCount = ref(0);
 
         const menuItems = [
             { path: '/', label: '图书列表', icon: 'book' },
@@ -23,31 +26,52 @@ export default {
         // 获取待确认的捐赠借阅数量
         const loadPendingDonationCount = async () => {
             try {
-                const res = await fetch('/api/donations', {
+                const res = await fetch('/api/donations?limit=1&fields=id', {
                     credentials: 'same-origin'
                 });
                 const data = await res.json();
                 if (data.success) {
-                    // 统计有待确认借阅的图书数量
-                    pendingDonationCount.value = (data.donated_books || []).filter(b => b.has_pending_confirm).length;
+                    // 有待确认借阅的图书数量，由服务端统计
+                    pendingDonationCount.value = data.pending_confirm_count || 0;
                 }
             } catch (e) {
                 console.error('Failed to load pending donation count:', e);
             }
         };
 
-        const logout = () => {
-            localStorage.removeItem('user');
-            window.location.href = '/#/login';
+        // 未读站内信（逾期提醒等）
+        const loadNotifications = async () => {
+            try {
+                const res = await notificationApi.list({ unread: 1, limit: 20 });
+                notifications.value = res.notifications || [];
+                unreadCount.value = res.unread_count || 0;
+            } catch (e) {
+                console.error('Failed to load notifications:', e);
+            }
+        };
+
+        const markAllRead = async () => {
+            await notificationApi.markAllRead();
+            loadNotifications();
+        };
+
+        const logout = async () => {
+            try {
+                await authApi.logout();
+            } finally {
+                localStorage.removeItem('user');
+                window.location.href = '/#/login';
+            }
         };
 
         onMounted(() => {
             loadPendingDonationCount();
+            loadNotifications();
             // 监听借阅审批变化事件
             window.addEventListener('donation-count-update', loadPendingDonationCount);
         });
 
-        return { user, isAdmin, menuItems, logout, pendingDonationCount };
+        return { user, isAdmin, menuItems, logout, pendingDonationCount, notifications, unreadCount, markAllRead };
     },
     template: `
         <div style="display: flex; min-height: 100vh; background: #F5F5F7;">
@@ -122,6 +146,30 @@ export default {
                 <header style="background: #FFFFFF; border-bottom: 1px solid #F0F0F0; display: flex; align-items: center; justify-content: space-between; padding: 0 24px; height: 64px; flex-shrink: 0;">
                     <div style="font-size: 14px; color: #8E8E93;"></div>
                     <div style="display: flex; align-items: center; gap: 16px;">
+                        <el-popover placement="bottom-end" :width="320" trigger="click">
+                            <template #reference>
+                                <div style="cursor: pointer; position: relative; padding: 6px;">
+                                    <svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#6B7280" stroke-width="2">
+                                        <path d="M18 8A6 6 0 0 0 6 8c0 7-3 9-3 9h18s-3-2-3-9"></path>
+                                        <path d="M13.73 21a2 2 0 0 1-3.46 0"></path>
+                                    </svg>
+                                    <span
+                                        v-if="unreadCount > 0"
+                                        style="position: absolute; top: 0; right: -4px; background: #EF4444; color: white; font-size: 11px; font-weight: 600; padding: 0 5px; border-radius: 10px;"
+                                    >
+                                        {{ unreadCount }}
+                                    </span>
+                                </div>
+                            </template>
+                            <div v-if="notifications.length === 0" style="text-align: center; color: #8E8E93; padding: 16px 0;">暂无未读通知</div>
+                            <div v-else>
+                                <div v-for="item in notifications" :key="item.id" style="padding: 8px 0; border-bottom: 1px solid #F0F0F0;">
+                                    <div style="font-size: 13px; font-weight: 600; color: #1D1D1F;">{{ item.title }}</div>
+                                    <div style="font-size: 12px; color: #6B7280;">{{ item.body }}</div>
+                                </div>
+                                <el-button link type="primary" size="small" @click="markAllRead" style="margin-top: 8px;">全部标为已读</el-button>
+                            </div>
+                        </el-popover>
                         <div
                             v-if="isAdmin"
                             @click="$router.push('/admin')"
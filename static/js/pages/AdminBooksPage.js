@@ -1,4 +1,4 @@
-const { ref, onMounted, watch, computed } = Vue;
+const { ref, onMounted } = Vue;
 const { ElMessage, ElMessageBox } = ElementPlus;
 import { bookApi, adminApi } from '../api.js';
 
@@ -22,100 +22,80 @@ export default {
             donor_id: null
         });
 
-        // 搜索筛选
-        const searchTitle = ref('');
-        const searchAuthor = ref('');
+        // 搜索筛选：条件都交给服务端，关键字同时匹配书名、作者和标签
+        const searchKeyword = ref('');
         const searchStatus = ref('');
         const searchSource = ref('');
         const searchDateRange = ref([]);
 
-        // 筛选后的图书列表
-        const filteredBooks = computed(() => {
-            let result = books.value;
+        // 服务端游标分页：pageCursors[n] 是第 n + 1 页的游标，只能逐页前后翻
+        const currentPage = ref(1);
+        const pageSize = ref(10);
+        const total = ref(0);
+        const pageCursors = ref([null]);
 
-            // 按书名搜索
-            if (searchTitle.value) {
-                const keyword = searchTitle.value.toLowerCase();
-                result = result.filter(book =>
-                    book.title.toLowerCase().includes(keyword)
-                );
-            }
+        // 分面计数由服务端按同一过滤条件统计，随第一页一起返回，总数取状态分面之和
+        const facets = ref({ status: {}, source: {} });
 
-            // 按作者搜索
-            if (searchAuthor.value) {
-                const keyword = searchAuthor.value.toLowerCase();
-                result = result.filter(book =>
-                    book.author.toLowerCase().includes(keyword)
-                );
-            }
+        const facetLabel = (text, facet, value) => `${text} (${facets.value[facet][value] || 0})`;
 
-            // 按状态筛选
-            if (searchStatus.value) {
-                result = result.filter(book => book.status === searchStatus.value);
-            }
+        // 列表只需要当前借阅人，不取借阅历史
+        const LIST_FIELDS = 'id,title,author,publisher,isbn,tags,source,status,current_borrow,created_at';
 
-            // 按来源筛选
-            if (searchSource.value) {
-                result = result.filter(book => book.source === searchSource.value);
+        const buildParams = () => {
+            const params = { fields: LIST_FIELDS, limit: pageSize.value };
+            if (searchKeyword.value.trim()) params.keyword = searchKeyword.value.trim();
+            if (searchStatus.value) params.status = searchStatus.value;
+            if (searchSource.value) params.source = searchSource.value;
+            if (searchDateRange.value && searchDateRange.value.length === 2) {
+                params.created_from = searchDateRange.value[0];
+                params.created_to = searchDateRange.value[1];
             }
+            return params;
+        };
 
-            // 按录入时间筛选
-            if (searchDateRange.value && searchDateRange.value.length === 2) {
-                const [startDate, endDate] = searchDateRange.value;
-                if (startDate && endDate) {
-                    result = result.filter(book => {
-                        if (!book.created_at) return false;
-                        const bookDate = new Date(book.created_at);
-                        const start = new Date(startDate);
-                        const end = new Date(endDate);
-                        end.setHours(23, 59, 59, 999);
-                        return bookDate >= start && bookDate <= end;
-                    });
+        const loadBooks = async (page = 1, withFacets = page === 1) => {
+            loading.value = true;
+            try {
+                const params = buildParams();
+                if (withFacets) params.facets = 'status,source';
+                if (page === 1) {
+                    pageCursors.value = [null];
+                } else {
+                    params.cursor = pageCursors.value[page - 1];
+                }
+                const res = await bookApi.list(params);
+                books.value = res.books || [];
+                pageCursors.value[page] = res.next_cursor;
+                if (res.facets) {
+                    facets.value = res.facets;
+                    total.value = Object.values(res.facets.status).reduce((sum, n) => sum + n, 0);
                 }
+                currentPage.value = page;
+            } catch (error) {
+                ElMessage.error('加载图书列表失败');
+            } finally {
+                loading.value = false;
             }
+        };
 
-            return result;
-        });
-
-        // 分页
-        const currentPage = ref(1);
-        const pageSize = ref(10);
-
-        const paginatedBooks = computed(() => {
-            const start = (currentPage.value - 1) * pageSize.value;
-            const end = start + pageSize.value;
-            return filteredBooks.value.slice(start, end);
-        });
+        const handleSearch = () => loadBooks(1);
 
         const handlePageChange = (page) => {
-            currentPage.value = page;
+            loadBooks(page);
         };
 
         const handleSizeChange = (size) => {
             pageSize.value = size;
-            currentPage.value = 1;
+            loadBooks(1);
         };
 
         const resetSearch = () => {
-            searchTitle.value = '';
-            searchAuthor.value = '';
+            searchKeyword.value = '';
             searchStatus.value = '';
             searchSource.value = '';
             searchDateRange.value = [];
-            currentPage.value = 1;
-        };
-
-        const loadBooks = async () => {
-            loading.value = true;
-            try {
-                const res = await bookApi.list();
-                // 按ID从小到大排序
-                books.value = (res.books || []).sort((a, b) => a.id - b.id);
-            } catch (error) {
-                ElMessage.error('加载图书列表失败');
-            } finally {
-                loading.value = false;
-            }
+            loadBooks(1);
         };
 
         const loadUsers = async () => {
@@ -161,6 +141,51 @@ export default {
             }
         };
 
+        // ISBN 自动查询补全：只填写还空着的字段
+        const isbnLoading = ref(false);
+
+        const handleIsbnLookup = async () => {
+            if (!newBook.value.isbn) {
+                ElMessage.warning('请先输入ISBN');
+                return;
+            }
+            isbnLoading.value = true;
+            try {
+                const res = await bookApi.lookupIsbn(newBook.value.isbn.trim());
+                if (!res.found) {
+                    ElMessage.info('未查到该ISBN的图书信息，请手动录入');
+                    return;
+                }
+                newBook.value.isbn = res.isbn13;
+                for (const field of ['title', 'author', 'publisher']) {
+                    if (!newBook.value[field]) newBook.value[field] = res.book[field] || '';
+                }
+                if (!newBook.value.tags) newBook.value.tags = res.book.tags.join(',');
+            } catch (error) {
+                ElMessage.error(error.message || '查询失败');
+            } finally {
+                isbnLoading.value = false;
+            }
+        };
+
+        // 批量入库：上传 CSV/JSONL 文件
+        const handleImport = async (uploadFile) => {
+            try {
+                const res = await bookApi.importFile(uploadFile.raw);
+                const report = res.report;
+                const summary = `导入 ${report.imported} 本，跳过重复 ${report.skipped} 本，失败 ${report.failed} 行`;
+                if (report.failed > 0) {
+                    const details = report.errors.map(e => `第 ${e.line} 行：${e.message}`).join('<br>');
+                    ElMessageBox.alert(`${summary}<br>${details}`, '导入结果', { dangerouslyUseHTMLString: true });
+                } else {
+                    ElMessage.success(summary);
+                }
+                loadBooks();
+            } catch (error) {
+                ElMessage.error(error.message || '导入失败');
+            }
+        };
+
         const showEditDialog = (book) => {
             editingBook.value = {
                 ...book,
@@ -185,7 +210,7 @@ export default {
                 });
                 ElMessage.success('图书更新成功');
                 editDialogVisible.value = false;
-                loadBooks();
+                loadBooks(currentPage.value, true);
             } catch (error) {
                 ElMessage.error(error.message || '更新失败');
             }
@@ -210,7 +235,7 @@ export default {
 
                 await bookApi.updateStatus(book.id, 'unavailable');
                 ElMessage.success('图书已报废');
-                loadBooks();
+                loadBooks(currentPage.value, true);
             } catch (error) {
                 if (error !== 'cancel') {
                     ElMessage.error(error.message || '操作失败');
@@ -266,8 +291,6 @@ export default {
 
         return {
             books,
-            filteredBooks,
-            paginatedBooks,
             users,
             loading,
             dialogVisible,
@@ -275,15 +298,20 @@ export default {
             user,
             editingBook,
             newBook,
-            searchTitle,
-            searchAuthor,
+            searchKeyword,
             searchStatus,
             searchSource,
             searchDateRange,
             currentPage,
             pageSize,
+            total,
+            facets,
+            facetLabel,
             showAddDialog,
             handleAddBook,
+            isbnLoading,
+            handleIsbnLookup,
+            handleImport,
             showEditDialog,
             handleEditBook,
             handleScrapBook,
@@ -293,6 +321,7 @@ export default {
             formatDate,
             logout,
             resetSearch,
+            handleSearch,
             handlePageChange,
             handleSizeChange
         };
@@ -308,18 +337,17 @@ export default {
             <div style="background: #FFFFFF; border-radius: 12px; padding: 16px; margin-bottom: 20px; box-shadow: 0 1px 3px rgba(0,0,0,0.04);">
                 <div style="display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; gap: 12px;">
                     <div style="display: flex; gap: 12px; flex-wrap: wrap; align-items: center;">
-                        <el-input v-model="searchTitle" placeholder="搜索书名" clearable style="width: 140px;" />
-                        <el-input v-model="searchAuthor" placeholder="搜索作者" clearable style="width: 120px;" />
-                        <el-select v-model="searchStatus" placeholder="状态" clearable style="width: 130px;">
-                            <el-option label="在库" value="available" />
-                            <el-option label="借阅审核中" value="pending_borrow" />
-                            <el-option label="已借出" value="borrowed" />
-                            <el-option label="归还审核中" value="pending_return" />
-                            <el-option label="不可用" value="unavailable" />
+                        <el-input v-model="searchKeyword" placeholder="搜索书名/作者/标签" clearable style="width: 180px;" @change="handleSearch" />
+                        <el-select v-model="searchStatus" placeholder="状态" clearable style="width: 130px;" @change="handleSearch">
+                            <el-option :label="facetLabel('在库', 'status', 'available')" value="available" />
+                            <el-option :label="facetLabel('借阅审核中', 'status', 'pending_borrow')" value="pending_borrow" />
+                            <el-option :label="facetLabel('已借出', 'status', 'borrowed')" value="borrowed" />
+                            <el-option :label="facetLabel('归还审核中', 'status', 'pending_return')" value="pending_return" />
+                            <el-option :label="facetLabel('不可用', 'status', 'unavailable')" value="unavailable" />
                         </el-select>
-                        <el-select v-model="searchSource" placeholder="来源" clearable style="width: 120px;">
-                            <el-option label="班级购买" value="class" />
-                            <el-option label="个人捐赠" value="donated" />
+                        <el-select v-model="searchSource" placeholder="来源" clearable style="width: 120px;" @change="handleSearch">
+                            <el-option :label="facetLabel('班级购买', 'source', 'class')" value="class" />
+                            <el-option :label="facetLabel('个人捐赠', 'source', 'donated')" value="donated" />
                         </el-select>
                         <el-date-picker
                             v-model="searchDateRange"
@@ -330,6 +358,7 @@ export default {
                             value-format="YYYY-MM-DD"
                             clearable
                             style="width: 240px;"
+                            @change="handleSearch"
                         />
                         <el-button @click="resetSearch">重置</el-button>
                     </div>
@@ -341,14 +370,22 @@ export default {
                             </svg>
                             录入图书
                         </el-button>
-                        <el-button @click="loadBooks">刷新</el-button>
+                        <el-upload
+                            :show-file-list="false"
+                            :auto-upload="false"
+                            accept=".csv,.jsonl,.ndjson"
+                            :on-change="handleImport"
+                        >
+                            <el-button>批量入库</el-button>
+                        </el-upload>
+                        <el-button @click="loadBooks(1)">刷新</el-button>
                     </div>
                 </div>
             </div>
 
             <!-- 图书列表 -->
             <div style="background: #FFFFFF; border-radius: 12px; box-shadow: 0 1px 3px rgba(0,0,0,0.04);">
-                <el-table :data="paginatedBooks" style="width: 100%">
+                <el-table :data="books" style="width: 100%">
                         <el-table-column prop="id" label="ID" width="60" />
                         <el-table-column prop="title" label="书名" min-width="150" />
                         <el-table-column prop="author" label="作者" width="100" />
@@ -399,8 +436,8 @@ export default {
                         v-model:current-page="currentPage"
                         v-model:page-size="pageSize"
                         :page-sizes="[10, 20, 50, 100]"
-                        :total="filteredBooks.length"
-                        layout="total, sizes, prev, pager, next, jumper"
+                        :total="total"
+                        layout="total, sizes, prev, next"
                         @current-change="handlePageChange"
                         @size-change="handleSizeChange"
                     />
@@ -419,7 +456,11 @@ export default {
                         <el-input v-model="newBook.publisher" placeholder="请输入出版社" />
                     </el-form-item>
                     <el-form-item label="ISBN">
-                        <el-input v-model="newBook.isbn" placeholder="请输入ISBN" />
+                        <el-input v-model="newBook.isbn" placeholder="请输入ISBN" @keyup.enter="handleIsbnLookup">
+                            <template #append>
+                                <el-button :loading="isbnLoading" @click="handleIsbnLookup">查询</el-button>
+                            </template>
+                        </el-input>
                     </el-form-item>
                     <el-form-item label="标签">
                         <el-input v-model="newBook.tags" placeholder="多个标签用逗号分隔" />
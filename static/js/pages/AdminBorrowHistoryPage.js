@@ -131,6 +131,16 @@ export default {
             return date.toLocaleString('zh-CN');
         };
 
+        // 按当前日期范围导出，由服务端流式生成文件
+        const exportRecords = (format) => {
+            const params = { format };
+            if (searchDateRange.value && searchDateRange.value.length === 2) {
+                params.start = searchDateRange.value[0];
+                params.end = searchDateRange.value[1];
+            }
+            window.location.href = adminApi.exportUrl('borrows', params);
+        };
+
         onMounted(() => {
             loadRecords();
         });
@@ -152,7 +162,8 @@ export default {
             resetSearch,
             handlePageChange,
             handleSizeChange,
-            loadRecords
+            loadRecords,
+            exportRecords
         };
     },
     template: `
@@ -188,7 +199,11 @@ export default {
                         />
                         <el-button @click="resetSearch">重置</el-button>
                     </div>
-                    <el-button @click="loadRecords">刷新</el-button>
+                    <div style="display: flex; gap: 12px;">
+                        <el-button @click="exportRecords('csv')">导出 CSV</el-button>
+                        <el-button @click="exportRecords('ndjson')">导出 NDJSON</el-button>
+                        <el-button @click="loadRecords">刷新</el-button>
+                    </div>
                 </div>
             </div>
 
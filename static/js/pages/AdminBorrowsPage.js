@@ -9,6 +9,8 @@ const AdminBorrowsPage = {
         const borrowRecords = ref([]);
         const returnRecords = ref([]);
         const loading = ref(false);
+        const selectedBorrows = ref([]);
+        const selectedReturns = ref([]);
 
         // 检查是否是管理员
         const isAdmin = computed(() => user.value?.is_admin || false);
@@ -91,6 +93,29 @@ const AdminBorrowsPage = {
             }
         };
 
+        // 批量处理选中的记录，一次请求完成
+        const runBulk = async (action, records, label, reload) => {
+            if (records.length === 0) {
+                ElMessage.warning('请先选择记录');
+                return;
+            }
+            try {
+                const res = await action(records.map(r => r.id));
+                if (res.failed > 0) {
+                    ElMessage.warning(`${label}成功 ${res.succeeded} 条，失败 ${res.failed} 条`);
+                } else {
+                    ElMessage.success(`已${label} ${res.succeeded} 条`);
+                }
+                reload();
+            } catch (error) {
+                ElMessage.error('操作失败: ' + error.message);
+            }
+        };
+
+        const bulkApprove = () => runBulk(adminApi.bulkApproveBorrows, selectedBorrows.value, '通过', fetchBorrowRecords);
+        const bulkReject = () => runBulk(adminApi.bulkRejectBorrows, selectedBorrows.value, '拒绝', fetchBorrowRecords);
+        const bulkConfirmReturn = () => runBulk(adminApi.bulkConfirmReturns, selectedReturns.value, '确认收书', fetchReturnRecords);
+
         // 切换标签页时加载数据
         const handleTabChange = (tab) => {
             if (tab === 'borrow') {
@@ -127,11 +152,16 @@ const AdminBorrowsPage = {
             borrowRecords,
             returnRecords,
             loading,
+            selectedBorrows,
+            selectedReturns,
             statusMap,
             formatDate,
             approveBorrow,
             rejectBorrow,
             confirmReturn,
+            bulkApprove,
+            bulkReject,
+            bulkConfirmReturn,
             handleTabChange,
             logout
         };
@@ -146,7 +176,16 @@ const AdminBorrowsPage = {
                 <el-tabs v-model="activeTab" @tab-change="handleTabChange" style="padding: 16px;">
                     <!-- 待处理借阅标签 -->
                     <el-tab-pane label="待处理借阅" name="borrow">
-                        <el-table :data="borrowRecords" style="width: 100%">
+                        <div style="margin-bottom: 12px;">
+                            <el-button type="success" size="small" @click="bulkApprove" :disabled="selectedBorrows.length === 0">
+                                批量通过
+                            </el-button>
+                            <el-button type="danger" size="small" @click="bulkReject" :disabled="selectedBorrows.length === 0">
+                                批量拒绝
+                            </el-button>
+                        </div>
+                        <el-table :data="borrowRecords" style="width: 100%" @selection-change="rows => selectedBorrows = rows">
+                            <el-table-column type="selection" width="48" />
                             <el-table-column prop="book_title" label="书名" min-width="200">
                                 <template #default="scope">
                                     <strong>{{ scope.row.book_title }}</strong>
@@ -197,7 +236,13 @@ const AdminBorrowsPage = {
 
                     <!-- 待处理归还标签 -->
                     <el-tab-pane label="待处理归还" name="return">
-                        <el-table :data="returnRecords" v-loading="loading" style="width: 100%">
+                        <div style="margin-bottom: 12px;">
+                            <el-button type="primary" size="small" @click="bulkConfirmReturn" :disabled="selectedReturns.length === 0">
+                                批量确认收书
+                            </el-button>
+                        </div>
+                        <el-table :data="returnRecords" v-loading="loading" style="width: 100%" @selection-change="rows => selectedReturns = rows">
+                            <el-table-column type="selection" width="48" />
                             <el-table-column prop="book_title" label="书名" min-width="200">
                                 <template #default="scope">
                                     <strong>{{ scope.row.book_title }}</strong>
@@ -26,7 +26,8 @@ export default {
                 stats.value = res.stats;
                 popularBooks.value = res.popular_books || [];
                 topReaders.value = res.top_readers || [];
-                overdueRecords.value = res.overdue || [];
+                const overdue = await adminApi.getOverdue({ limit: 100 });
+                overdueRecords.value = overdue.records || [];
             } catch (error) {
                 ElMessage.error('加载数据失败');
             } finally {
@@ -214,6 +215,7 @@ export default {
                         <div style="font-size: 14px; font-weight: 600; color: #1D1D1F; margin-bottom: 8px;">{{ record.book_title }}</div>
                         <div style="font-size: 13px; color: #6B7280;">借阅人：{{ record.borrower_name }}</div>
                         <div style="font-size: 13px; color: #EF4444;">借阅日期：{{ formatDate(record.approve_at) }}</div>
+                        <div style="font-size: 13px; color: #EF4444;">已逾期 {{ record.days_overdue }} 天</div>
                     </div>
                 </div>
             </div>
@@ -16,11 +16,20 @@ export default {
             is_admin: false
         });
 
-        const loadUsers = async () => {
+        // 服务端分页：按学号/姓名前缀搜索，滚动到底部时继续加载
+        const keyword = ref('');
+        const sort = ref('student_id');
+        const nextCursor = ref(null);
+
+        const loadUsers = async (more = false) => {
             loading.value = true;
             try {
-                const res = await adminApi.getUsers();
-                users.value = res.users || [];
+                const params = { limit: 50, sort: sort.value };
+                if (keyword.value) params.q = keyword.value.trim();
+                if (more && nextCursor.value) params.cursor = nextCursor.value;
+                const res = await adminApi.listUsers(params);
+                users.value = more ? users.value.concat(res.users || []) : (res.users || []);
+                nextCursor.value = res.next_cursor;
             } catch (error) {
                 ElMessage.error('加载用户列表失败');
             } finally {
@@ -54,6 +63,27 @@ export default {
             }
         };
 
+        // 导入花名册：CSV/JSONL，列为 student_id, name, password
+        const handleImport = async (uploadFile) => {
+            loading.value = true;
+            try {
+                const res = await adminApi.importUsers(uploadFile.raw);
+                const report = res.report;
+                const summary = `导入 ${report.imported} 人，跳过 ${report.skipped} 人，失败 ${report.failed} 行`;
+                if (report.errors.length > 0) {
+                    const details = report.errors.map(e => `第 ${e.line} 行：${e.message}`).join('\n');
+                    ElMessageBox.alert(`${summary}\n${details}`, '导入结果', { customStyle: { whiteSpace: 'pre-line' } });
+                } else {
+                    ElMessage.success(summary);
+                }
+                loadUsers();
+            } catch (error) {
+                ElMessage.error(error.message || '导入失败');
+            } finally {
+                loading.value = false;
+            }
+        };
+
         const handleDeleteUser = async (userToDelete) => {
             if (userToDelete.id === user.value.id) {
                 ElMessage.warning('不能删除自己');
@@ -92,16 +122,21 @@ export default {
             window.location.href = '/#/login';
         };
 
-        onMounted(loadUsers);
+        onMounted(() => loadUsers());
 
         return {
             users,
+            keyword,
+            sort,
+            nextCursor,
+            loadUsers,
             loading,
             dialogVisible,
             user,
             newUser,
             showAddDialog,
             handleAddUser,
+            handleImport,
             handleDeleteUser,
             formatDate,
             logout
@@ -114,7 +149,33 @@ export default {
             </div>
 
             <div style="background: #FFFFFF; border-radius: 12px; padding: 16px; margin-bottom: 20px; box-shadow: 0 1px 3px rgba(0,0,0,0.04);">
-                <el-button type="primary" @click="showAddDialog">新增用户</el-button>
+                <div style="display: flex; gap: 12px;">
+                    <el-button type="primary" @click="showAddDialog">新增用户</el-button>
+                    <el-upload
+                        :show-file-list="false"
+                        :auto-upload="false"
+                        accept=".csv,.jsonl,.ndjson"
+                        :on-change="handleImport"
+                    >
+                        <el-button>导入花名册</el-button>
+                    </el-upload>
+                    <el-input
+                        v-model="keyword"
+                        placeholder="学号或姓名开头"
+                        clearable
+                        style="width: 200px; margin-left: auto;"
+                        @keyup.enter="loadUsers()"
+                        @clear="loadUsers()"
+                    />
+                    <el-select v-model="sort" style="width: 140px;" @change="loadUsers()">
+                        <el-option label="按学号" value="student_id" />
+                        <el-option label="按姓名" value="name" />
+                        <el-option label="按注册时间" value="created_at" />
+                        <el-option label="按在借数量" value="active_borrows" />
+                        <el-option label="按累计借阅" value="total_borrows" />
+                    </el-select>
+                    <el-button @click="loadUsers()">搜索</el-button>
+                </div>
             </div>
 
             <div style="background: #FFFFFF; border-radius: 12px; box-shadow: 0 1px 3px rgba(0,0,0,0.04);">
@@ -122,6 +183,8 @@ export default {
                     <el-table-column prop="id" label="ID" width="60" />
                         <el-table-column prop="student_id" label="学号" width="120" />
                         <el-table-column prop="name" label="姓名" width="120" />
+                        <el-table-column prop="active_borrows" label="在借" width="80" />
+                        <el-table-column prop="total_borrows" label="累计借阅" width="100" />
                         <el-table-column prop="is_admin" label="角色" width="100">
                             <template #default="scope">
                                 <el-tag v-if="scope.row.is_admin" type="danger">管理员</el-tag>
@@ -141,6 +204,9 @@ export default {
                             </template>
                         </el-table-column>
                     </el-table>
+                    <div v-if="nextCursor" style="text-align: center; padding: 12px;">
+                        <el-button @click="loadUsers(true)">加载更多</el-button>
+                    </div>
 
             <!-- 新增用户弹窗 -->
             <el-dialog v-model="dialogVisible" title="新增用户" width="500px">
@@ -7,6 +7,7 @@ export default {
     setup() {
         const loading = ref(false);
         const wishlists = ref([]);
+        const mostWanted = ref([]);
         const activeTab = ref('pending');
         const user = ref(JSON.parse(localStorage.getItem('user') || 'null'));
 
@@ -34,8 +35,23 @@ export default {
             }
         };
 
+        // 最受期待：同一本书的心愿按人数聚合
+        const loadMostWanted = async () => {
+            loading.value = true;
+            try {
+                const res = await wishlistApi.mostWanted();
+                mostWanted.value = res.books || [];
+            } catch (error) {
+                ElMessage.error('加载失败');
+            } finally {
+                loading.value = false;
+            }
+        };
+
         const handleTabChange = (tab) => {
-            if (tab === 'pending') {
+            if (tab === 'most_wanted') {
+                loadMostWanted();
+            } else if (tab === 'pending') {
                 loadWishlists('pending');
             } else if (tab === 'fulfilled') {
                 loadWishlists('fulfilled');
@@ -92,6 +108,7 @@ export default {
         return {
             loading,
             wishlists,
+            mostWanted,
             activeTab,
             user,
             statusMap,
@@ -135,6 +152,16 @@ export default {
                         <el-empty v-if="!loading && wishlists.length === 0" description="暂无待处理的心愿单" />
                     </el-tab-pane>
 
+                    <el-tab-pane label="最受期待" name="most_wanted">
+                        <el-table :data="mostWanted" style="width: 100%">
+                            <el-table-column prop="book_title" label="书名" min-width="150" />
+                            <el-table-column prop="author" label="作者" width="120" />
+                            <el-table-column prop="isbn" label="ISBN" width="150" />
+                            <el-table-column prop="wishers" label="想看人数" width="100" />
+                        </el-table>
+                        <el-empty v-if="!loading && mostWanted.length === 0" description="暂无待处理的心愿单" />
+                    </el-tab-pane>
+
                     <el-tab-pane label="已满足" name="fulfilled">
                         <el-table :data="wishlists" style="width: 100%">
                             <el-table-column prop="book_title" label="书名" min-width="150" />
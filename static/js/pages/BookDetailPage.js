@@ -1,10 +1,11 @@
-const { ref, onMounted } = Vue;
+const { ref, onMounted, watch } = Vue;
 const { ElMessage } = ElementPlus;
-import { bookApi, borrowApi, reviewApi } from '../api.js';
+import { bookApi, borrowApi, reviewApi, recommendationApi } from '../api.js';
 
 export default {
     name: 'BookDetailPage',
     setup() {
+        const route = VueRouter.useRoute();
         const book = ref(null);
         const loading = ref(false);
         const borrowLoading = ref(false);
@@ -20,7 +21,7 @@ export default {
         const isAdmin = ref(user.value?.is_admin || false);
 
         const loadBookDetail = async () => {
-            const bookId = VueRouter.useRoute().params.id;
+            const bookId = route.params.id;
             if (!bookId) {
                 ElMessage.error('图书ID不存在');
                 return;
@@ -31,6 +32,7 @@ export default {
                 const res = await bookApi.get(bookId);
                 book.value = res.book;
                 loadReviews(bookId);
+                loadSimilar(bookId);
             } catch (error) {
                 ElMessage.error('加载图书详情失败');
             } finally {
@@ -38,11 +40,30 @@ export default {
             }
         };
 
-        const loadReviews = async (bookId) => {
+        // 借过这本书的人也借了
+        const similarBooks = ref([]);
+
+        const loadSimilar = async (bookId) => {
+            try {
+                const res = await recommendationApi.similar(bookId);
+                similarBooks.value = res.books || [];
+            } catch (error) {
+                console.error('加载相似图书失败', error);
+            }
+        };
+
+        // 评价分页加载，第一页同时带回评分汇总
+        const reviewCursor = ref(null);
+
+        const loadReviews = async (bookId, more = false) => {
             reviewLoading.value = true;
             try {
-                const res = await reviewApi.getBookReviews(bookId);
-                reviews.value = res.reviews || [];
+                const params = { limit: 20 };
+                if (more && reviewCursor.value) params.cursor = reviewCursor.value;
+                const res = await reviewApi.getBookReviews(bookId, params);
+                reviews.value = more ? reviews.value.concat(res.reviews || []) : (res.reviews || []);
+                reviewCursor.value = res.next_cursor;
+                if (res.summary && book.value) book.value.rating = res.summary;
             } catch (error) {
                 console.error('加载评价失败', error);
             } finally {
@@ -143,6 +164,8 @@ export default {
         };
 
         onMounted(loadBookDetail);
+        // 从相似图书跳转时复用同一组件，需要按新的 id 重新加载
+        watch(() => route.params.id, (id) => id && loadBookDetail());
 
         return {
             book,
@@ -150,6 +173,9 @@ export default {
             borrowLoading,
             reviews,
             reviewLoading,
+            reviewCursor,
+            similarBooks,
+            loadReviews,
             showReviewDialog,
             newReview,
             user,
@@ -295,6 +321,17 @@ export default {
                         <p v-if="book.current_borrow.return_date"><strong>归还日期：</strong>{{ formatDate(book.current_borrow.return_date) }}</p>
                     </el-card>
 
+                    <!-- 相似图书 -->
+                    <el-card v-if="similarBooks.length" style="margin-top: 20px;">
+                        <template #header>
+                            <h3 style="margin: 0;">借过这本书的人也借了</h3>
+                        </template>
+                        <div v-for="item in similarBooks" :key="item.id" style="padding: 6px 0;">
+                            <router-link :to="'/books/' + item.id">{{ item.title }}</router-link>
+                            <span style="margin-left: 8px; color: #999;">{{ item.author }}</span>
+                        </div>
+                    </el-card>
+
                     <!-- 图书评价 -->
                     <el-card style="margin-top: 20px;">
                         <template #header>
@@ -311,6 +348,10 @@ export default {
                                 暂无评价，快来抢先评价吧！
                             </div>
                             <div v-else>
+                                <div v-if="book.rating && book.rating.count" style="padding: 0 15px 10px; color: #666;">
+                                    平均 {{ book.rating.average }} 分 · {{ book.rating.count }} 条评价 ·
+                                    推荐 {{ book.rating.review_types.recommend }} · 防雷 {{ book.rating.review_types.warn }}
+                                </div>
                                 <div v-for="review in reviews" :key="review.id" style="padding: 15px; border-bottom: 1px solid #eee;">
                                     <div style="display: flex; justify-content: space-between; align-items: center;">
                                         <div>
@@ -324,6 +365,9 @@ export default {
                                     <p style="margin-top: 10px; color: #666;">{{ review.content || '无评价内容' }}</p>
                                     <p style="font-size: 12px; color: #999;">{{ formatDate(review.created_at) }}</p>
                                 </div>
+                                <div v-if="reviewCursor" style="text-align: center; padding: 12px;">
+                                    <el-button size="small" @click="loadReviews(book.id, true)">加载更多评价</el-button>
+                                </div>
                             </div>
                         </div>
                     </el-card>
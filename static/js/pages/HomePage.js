@@ -1,6 +1,6 @@
-const { ref, onMounted, computed } = Vue;
+const { ref, onMounted } = Vue;
 const { ElMessage, ElMessageBox } = ElementPlus;
-import { bookApi, borrowApi } from '../api.js';
+import { bookApi, borrowApi, reviewApi, recommendationApi } from '../api.js';
 import StudentLayout from '../components/StudentLayout.js';
 
 export default {
@@ -12,103 +12,101 @@ export default {
         const user = ref(JSON.parse(localStorage.getItem('user') || 'null'));
         const isAdmin = ref(user.value?.is_admin || false);
 
-        // 搜索筛选
-        const searchTitle = ref('');
-        const searchAuthor = ref('');
-        const searchTags = ref('');
+        // 搜索筛选：条件都交给服务端，关键字同时匹配书名、作者和标签
+        const searchKeyword = ref('');
+        const searchTag = ref('');
         const searchStatus = ref('');
         const searchSource = ref('');
+        const sortBy = ref('');
 
-        // 筛选后的图书列表
-        const filteredBooks = computed(() => {
-            let result = books.value;
+        // 服务端游标分页：pageCursors[n] 是第 n + 1 页的游标，只能逐页前后翻
+        const currentPage = ref(1);
+        const pageSize = ref(10);
+        const total = ref(0);
+        const pageCursors = ref([null]);
 
-            // 按书名搜索
-            if (searchTitle.value) {
-                const keyword = searchTitle.value.toLowerCase();
-                result = result.filter(book =>
-                    book.title.toLowerCase().includes(keyword)
-                );
-            }
+        // 分面计数由服务端按同一过滤条件统计，随第一页一起返回，总数取状态分面之和
+        const facets = ref({ status: {}, source: {}, tag: {} });
 
-            // 按作者搜索
-            if (searchAuthor.value) {
-                const keyword = searchAuthor.value.toLowerCase();
-                result = result.filter(book =>
-                    (book.author || '').toLowerCase().includes(keyword)
-                );
-            }
+        const facetLabel = (text, facet, value) => `${text} (${facets.value[facet][value] || 0})`;
 
-            // 按标签搜索
-            if (searchTags.value) {
-                const keyword = searchTags.value.toLowerCase();
-                result = result.filter(book => {
-                    const tags = book.tags || [];
-                    return tags.some(tag => tag.toLowerCase().includes(keyword));
-                });
-            }
-
-            // 按状态筛选
-            if (searchStatus.value) {
-                result = result.filter(book => book.status === searchStatus.value);
-            }
-
-            // 按来源筛选
-            if (searchSource.value) {
-                result = result.filter(book => book.source === searchSource.value);
-            }
+        const buildParams = () => {
+            const params = { view: 'summary', limit: pageSize.value };
+            if (searchKeyword.value.trim()) params.keyword = searchKeyword.value.trim();
+            if (searchTag.value) params.tag = searchTag.value;
+            if (searchStatus.value) params.status = searchStatus.value;
+            if (searchSource.value) params.source = searchSource.value;
+            if (sortBy.value) params.sort = sortBy.value;
+            return params;
+        };
 
-            // 排序：ID 从小到大，状态优先在库
-            result = [...result].sort((a, b) => {
-                // 先按 ID 升序
-                if (a.id !== b.id) {
-                    return a.id - b.id;
+        const loadBooks = async (page = 1, withFacets = page === 1) => {
+            loading.value = true;
+            try {
+                const params = buildParams();
+                if (withFacets) params.facets = 'status,source,tag';
+                if (page === 1) {
+                    pageCursors.value = [null];
+                } else {
+                    params.cursor = pageCursors.value[page - 1];
                 }
-                // ID 相同按状态排序（available 排在前面）
-                const statusOrder = { 'available': 0, 'pending_borrow': 1, 'borrowed': 2, 'pending_return': 3, 'unavailable': 4 };
-                return (statusOrder[a.status] ?? 5) - (statusOrder[b.status] ?? 5);
-            });
-
-            return result;
-        });
-
-        // 分页
-        const currentPage = ref(1);
-        const pageSize = ref(10);
+                const res = await bookApi.list(params);
+                books.value = res.books || [];
+                pageCursors.value[page] = res.next_cursor;
+                if (res.facets) {
+                    facets.value = res.facets;
+                    total.value = Object.values(res.facets.status).reduce((sum, n) => sum + n, 0);
+                }
+                currentPage.value = page;
+            } catch (error) {
+                ElMessage.error('加载图书失败');
+            } finally {
+                loading.value = false;
+            }
+        };
 
-        const paginatedBooks = computed(() => {
-            const start = (currentPage.value - 1) * pageSize.value;
-            const end = start + pageSize.value;
-            return filteredBooks.value.slice(start, end);
-        });
+        const handleSearch = () => loadBooks(1);
 
         const handlePageChange = (page) => {
-            currentPage.value = page;
+            loadBooks(page);
         };
 
         const handleSizeChange = (size) => {
             pageSize.value = size;
-            currentPage.value = 1;
+            loadBooks(1);
         };
 
         const resetSearch = () => {
-            searchTitle.value = '';
-            searchAuthor.value = '';
-            searchTags.value = '';
+            searchKeyword.value = '';
+            searchTag.value = '';
             searchStatus.value = '';
             searchSource.value = '';
-            currentPage.value = 1;
+            sortBy.value = '';
+            loadBooks(1);
         };
 
-        const loadBooks = async () => {
-            loading.value = true;
+        // 最新书评
+        const latestReviews = ref([]);
+
+        const loadLatestReviews = async () => {
             try {
-                const res = await bookApi.list();
-                books.value = res.books || [];
+                const res = await reviewApi.latest({ limit: 5 });
+                latestReviews.value = res.reviews || [];
             } catch (error) {
-                ElMessage.error('加载图书失败');
-            } finally {
-                loading.value = false;
+                console.error('加载最新书评失败', error);
+            }
+        };
+
+        // 为你推荐（管理员不显示）
+        const recommendations = ref([]);
+
+        const loadRecommendations = async () => {
+            if (!user.value || isAdmin.value) return;
+            try {
+                const res = await recommendationApi.forMe();
+                recommendations.value = res.books || [];
+            } catch (error) {
+                console.error('加载推荐失败', error);
             }
         };
 
@@ -116,7 +114,7 @@ export default {
             try {
                 await borrowApi.create(book.id);
                 ElMessage.success('借阅申请已提交');
-                loadBooks();
+                loadBooks(currentPage.value, true);
             } catch (error) {
                 ElMessage.error(error.message);
             }
@@ -158,25 +156,33 @@ export default {
             return date.toLocaleDateString('zh-CN');
         };
 
-        onMounted(loadBooks);
+        onMounted(() => {
+            loadBooks();
+            loadLatestReviews();
+            loadRecommendations();
+        });
 
         return {
             books,
             loading,
-            searchTitle,
-            searchAuthor,
-            searchTags,
+            searchKeyword,
+            searchTag,
             searchStatus,
             searchSource,
-            filteredBooks,
-            paginatedBooks,
+            sortBy,
+            latestReviews,
+            recommendations,
             currentPage,
             pageSize,
+            total,
+            facets,
+            facetLabel,
             user,
             isAdmin,
             handlePageChange,
             handleSizeChange,
             resetSearch,
+            handleSearch,
             loadBooks,
             handleBorrow,
             getStatusText,
@@ -197,31 +203,35 @@ export default {
                 <div style="background: #FFFFFF; border-radius: 12px; padding: 16px; margin-bottom: 20px; box-shadow: 0 1px 3px rgba(0,0,0,0.04);">
                     <div style="display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; gap: 12px;">
                         <div style="display: flex; gap: 12px; flex-wrap: wrap; align-items: center;">
-                            <el-input v-model="searchTitle" placeholder="搜索书名" clearable style="width: 140px;" />
-                            <el-input v-model="searchAuthor" placeholder="搜索作者" clearable style="width: 120px;" />
-                            <el-input v-model="searchTags" placeholder="搜索标签" clearable style="width: 120px;" />
-                            <el-select v-model="searchStatus" placeholder="状态" clearable style="width: 130px;">
-                                <el-option label="在库" value="available" />
-                                <el-option label="借阅审核中" value="pending_borrow" />
-                                <el-option label="已借出" value="borrowed" />
-                                <el-option label="归还审核中" value="pending_return" />
-                                <el-option label="不可用" value="unavailable" />
+                            <el-input v-model="searchKeyword" placeholder="搜索书名/作者/标签" clearable style="width: 180px;" @change="handleSearch" />
+                            <el-select v-model="searchTag" placeholder="标签" clearable filterable style="width: 140px;" @change="handleSearch">
+                                <el-option v-for="(count, name) in facets.tag" :key="name" :label="name + ' (' + count + ')'" :value="name" />
+                            </el-select>
+                            <el-select v-model="searchStatus" placeholder="状态" clearable style="width: 130px;" @change="handleSearch">
+                                <el-option :label="facetLabel('在库', 'status', 'available')" value="available" />
+                                <el-option :label="facetLabel('借阅审核中', 'status', 'pending_borrow')" value="pending_borrow" />
+                                <el-option :label="facetLabel('已借出', 'status', 'borrowed')" value="borrowed" />
+                                <el-option :label="facetLabel('归还审核中', 'status', 'pending_return')" value="pending_return" />
+                                <el-option :label="facetLabel('不可用', 'status', 'unavailable')" value="unavailable" />
+                            </el-select>
+                            <el-select v-model="searchSource" placeholder="来源" clearable style="width: 120px;" @change="handleSearch">
+                                <el-option :label="facetLabel('班级购买', 'source', 'class')" value="class" />
+                                <el-option :label="facetLabel('个人捐赠', 'source', 'donated')" value="donated" />
                             </el-select>
-                            <el-select v-model="searchSource" placeholder="来源" clearable style="width: 120px;">
-                                <el-option label="班级购买" value="class" />
-                                <el-option label="个人捐赠" value="donated" />
+                            <el-select v-model="sortBy" placeholder="排序" clearable style="width: 120px;" @change="handleSearch">
+                                <el-option label="按评分" value="rating" />
                             </el-select>
                             <el-button @click="resetSearch">重置</el-button>
                         </div>
                         <div style="display: flex; gap: 12px;">
-                            <el-button @click="loadBooks">刷新</el-button>
+                            <el-button @click="loadBooks(1)">刷新</el-button>
                         </div>
                     </div>
                 </div>
 
                 <!-- 图书列表 -->
                 <div style="background: #FFFFFF; border-radius: 12px; box-shadow: 0 1px 3px rgba(0,0,0,0.04);">
-                    <el-table :data="paginatedBooks" style="width: 100%" :header-cell-style="{padding: '8px'}" :cell-style="{padding: '8px 12px'}">
+                    <el-table :data="books" style="width: 100%" :header-cell-style="{padding: '8px'}" :cell-style="{padding: '8px 12px'}">
                         <el-table-column prop="id" label="ID" width="80" />
                         <el-table-column prop="title" label="书名" width="200" />
                         <el-table-column prop="author" label="作者" width="100" />
@@ -240,6 +250,11 @@ export default {
                                 {{ getSourceText(scope.row.source) }}
                             </template>
                         </el-table-column>
+                        <el-table-column label="评分" width="90">
+                            <template #default="scope">
+                                {{ scope.row.rating && scope.row.rating.count ? scope.row.rating.average : '-' }}
+                            </template>
+                        </el-table-column>
                         <el-table-column prop="status" label="状态" width="130">
                             <template #default="scope">
                                 <el-tag :type="getStatusType(scope.row.status)" size="small">
@@ -270,13 +285,33 @@ export default {
                             v-model:current-page="currentPage"
                             v-model:page-size="pageSize"
                             :page-sizes="[10, 20, 50, 100]"
-                            :total="filteredBooks.length"
-                            layout="total, sizes, prev, pager, next, jumper"
+                            :total="total"
+                            layout="total, sizes, prev, next"
                             @current-change="handlePageChange"
                             @size-change="handleSizeChange"
                         />
                     </div>
                 </div>
+
+                <!-- 为你推荐 -->
+                <div v-if="recommendations.length" style="background: #FFFFFF; border-radius: 12px; padding: 16px; margin-top: 20px; box-shadow: 0 1px 3px rgba(0,0,0,0.04);">
+                    <h3 style="margin: 0 0 12px; font-size: 16px; font-weight: 600; color: #1D1D1F;">为你推荐</h3>
+                    <div style="display: flex; gap: 12px; flex-wrap: wrap;">
+                        <router-link v-for="item in recommendations" :key="item.id" :to="'/books/' + item.id">
+                            <el-tag>{{ item.title }}</el-tag>
+                        </router-link>
+                    </div>
+                </div>
+
+                <!-- 最新书评 -->
+                <div v-if="latestReviews.length" style="background: #FFFFFF; border-radius: 12px; padding: 16px; margin-top: 20px; box-shadow: 0 1px 3px rgba(0,0,0,0.04);">
+                    <h3 style="margin: 0 0 12px; font-size: 16px; font-weight: 600; color: #1D1D1F;">最新书评</h3>
+                    <div v-for="review in latestReviews" :key="review.id" style="padding: 8px 0; border-bottom: 1px solid #F0F0F0;">
+                        <router-link :to="'/books/' + review.book_id" style="font-weight: 500;">{{ review.book_title }}</router-link>
+                        <span style="margin-left: 8px; color: #86868B;">{{ review.user_name }} · {{ review.rating }} 分</span>
+                        <p style="margin: 4px 0 0; color: #666;">{{ review.content || '无评价内容' }}</p>
+                    </div>
+                </div>
             </div>
         </StudentLayout>
     `
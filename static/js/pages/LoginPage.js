@@ -7,7 +7,9 @@ export default {
     setup() {
         const form = ref({
             student_id: '',
-            password: ''
+            password: '',
+            // 班级公用电脑上默认不记住登录，由学生自己勾选
+            remember: false
         });
         const loading = ref(false);
         const loginType = ref('student');
@@ -20,7 +22,7 @@ export default {
 
             loading.value = true;
             try {
-                const res = await authApi.login(form.value.student_id, form.value.password);
+                const res = await authApi.login(form.value.student_id, form.value.password, form.value.remember);
                 localStorage.setItem('user', JSON.stringify(res.user));
                 ElMessage.success('登录成功');
 
@@ -108,7 +110,7 @@ export default {
                             </template>
                         </el-input>
                     </el-form-item>
-                    <el-form-item label="密码" style="margin-bottom: 24px;">
+                    <el-form-item label="密码" style="margin-bottom: 12px;">
                         <el-input
                             v-model="form.password"
                             type="password"
@@ -125,6 +127,9 @@ export default {
                             </template>
                         </el-input>
                     </el-form-item>
+                    <el-form-item style="margin-bottom: 12px;">
+                        <el-checkbox v-model="form.remember">30 天内免登录（公用电脑请勿勾选）</el-checkbox>
+                    </el-form-item>
                     <el-form-item style="margin-bottom: 0;">
                         <el-button
                             type="primary"
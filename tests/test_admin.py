@@ -43,3 +43,66 @@ def test_admin_approve_borrow(client):
     record = BorrowRecord.query.get(record.id)
     assert record.status == 'approved'
     assert record.book.status == 'borrowed'
+
+
+def test_admin_bulk_transitions(client):
+    admin = User(student_id='admin', name='Admin', is_admin=True)
+    admin.set_password('admin')
+    user = User(student_id='2024001', name='张三')
+    user.set_password('123')
+    books = [Book(title=f'Book {i}', author='A', publisher='P', status='pending_borrow') for i in range(3)]
+    db.session.add_all([admin, user, *books])
+    db.session.commit()
+
+    records = [BorrowRecord(book_id=b.id, borrower_id=user.id, status='pending') for b in books]
+    records[2].status = 'approved'
+    db.session.add_all(records)
+    db.session.commit()
+    ids = [r.id for r in records]
+
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+    response = client.put('/api/admin/borrows/bulk-approve', json={'record_ids': ids + [9999]})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['succeeded'] == 2 and data['failed'] == 2
+    assert [r['success'] for r in data['results']] == [True, True, False, False]
+
+    assert [db.session.get(BorrowRecord, i).status for i in ids] == ['approved'] * 3
+    assert db.session.get(Book, books[0].id).status == 'borrowed'
+
+    assert client.put('/api/admin/borrows/bulk-reject', json={'record_ids': []}).status_code == 400
+
+
+def test_admin_user_directory(client):
+    admin = User(student_id='admin', name='Admin', is_admin=True)
+    admin.set_password('admin')
+    users = [User(student_id=f'20240{i:02d}', name=name, password_hash='x')
+             for i, name in enumerate(['张三', '张四', '李四'])]
+    book = Book(title='Book', author='A', publisher='P')
+    db.session.add_all([admin, *users, book])
+    db.session.commit()
+    db.session.add_all([BorrowRecord(book_id=book.id, borrower_id=users[1].id, status='completed')
+                        for _ in range(2)])
+    db.session.commit()
+
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+
+    # 不带分页参数时保持原来的返回
+    assert len(client.get('/api/admin/users').get_json()['users']) == 4
+
+    response = client.get('/api/admin/users?q=张&limit=1&with_total=1')
+    data = response.get_json()
+    assert response.headers['X-Total-Count'] == '2'
+    assert [u['name'] for u in data['users']] == ['张三']
+    data = client.get(f"/api/admin/users?q=张&limit=1&cursor={data['next_cursor']}").get_json()
+    assert [u['name'] for u in data['users']] == ['张四'] and data['next_cursor'] is None
+
+    data = client.get('/api/admin/users?q=2024&sort=total_borrows&order=desc&limit=2').get_json()
+    assert data['users'][0]['name'] == '张四' and data['users'][0]['total_borrows'] == 2
+    data = client.get(f"/api/admin/users?q=2024&sort=total_borrows&order=desc&limit=2&cursor={data['next_cursor']}").get_json()
+    assert len(data['users']) == 1
+
+    assert client.get('/api/admin/users?sort=password_hash').status_code == 400
+    # 以最大码位结尾的前缀没有"下一个字符"
+    assert client.get('/api/admin/users?q=张\U0010ffff').get_json()['users'] == []
+    assert client.get('/api/admin/users?q=\U0010ffff').get_json()['users'] == []
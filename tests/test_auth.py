@@ -40,3 +40,122 @@ def test_login_fail(client):
     assert response.status_code == 401
     data = response.get_json()
     assert data['success'] is False
+
+
+def test_identity_cache_skips_user_query(client):
+    from sqlalchemy import event
+    from services import identity_service
+
+    user = User(student_id='2024001', name='张三')
+    user.set_password('123456')
+    db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+    identity_service.invalidate()
+    db.session.commit()
+    db.session.expunge_all()
+
+    assert identity_service.load_user(user_id).name == '张三'
+    db.session.expunge_all()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        before = identity_service.cache_stats()['hits']
+        cached = identity_service.load_user(user_id)
+        assert cached.to_dict() == {'id': user_id, 'student_id': '2024001', 'name': '张三', 'is_admin': False}
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert identity_service.cache_stats()['hits'] == before + 1
+    # 命中时只核对版本号
+    assert len(statements) == 1 and 'settings' in statements[0] and 'users' not in statements[0]
+    # 未缓存的字段按需加载
+    assert cached.check_password('123456')
+
+    identity_service.invalidate(user_id)
+    db.session.commit()
+    before = identity_service.cache_stats()['misses']
+    identity_service.load_user(user_id)
+    assert identity_service.cache_stats()['misses'] == before + 1
+
+
+def test_identity_cache_follows_other_processes(client):
+    from models import Setting
+    from services import identity_service
+
+    user = User(student_id='2024001', name='张三')
+    user.set_password('123456')
+    db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+    assert identity_service.load_user(user_id) is not None
+    db.session.expunge_all()
+
+    # 另一个 worker 删除了用户：本进程的缓存没有被清理，只有数据库里的版本号变了
+    db.session.execute(User.__table__.delete().where(User.id == user_id))
+    db.session.query(Setting).filter_by(key=identity_service.VERSION_KEY).delete()
+    db.session.add(Setting(key=identity_service.VERSION_KEY, value='other-worker'))
+    db.session.commit()
+
+    assert identity_service.load_user(user_id) is None
+
+
+def test_login_rehashes_with_new_policy(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    user = User(student_id='2024001', name='张三')
+    user.set_password('123456')
+    db.session.add(user)
+    db.session.commit()
+    assert user.password_hash.startswith('pbkdf2:sha256:1000$')
+
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+    assert client.post('/api/auth/login', json={'student_id': '2024001', 'password': 'wrong'}).status_code == 401
+    assert db.session.get(User, user.id).password_hash.startswith('pbkdf2:sha256:1000$')
+
+    commits = []
+    commit = db.session.commit
+    monkeypatch.setattr(db.session, 'commit', lambda: commits.append(1) or commit())
+    client.post('/api/auth/login', json={'student_id': '2024001', 'password': '123456'})
+    user = db.session.get(User, user.id)
+    assert user.password_hash.startswith('pbkdf2:sha256:2000$')
+    assert user.check_password('123456')
+    assert len(commits) == 1
+
+    # 哈希已是当前策略时登录不写库
+    client.post('/api/auth/logout')
+    client.post('/api/auth/login', json={'student_id': '2024001', 'password': '123456'})
+    assert len(commits) == 1
+
+
+def test_login_remember_sets_cookie(client):
+    user = User(student_id='2024001', name='张三')
+    user.set_password('123456')
+    db.session.add(user)
+    db.session.commit()
+
+    response = client.post('/api/auth/login', json={'student_id': '2024001', 'password': '123456'})
+    assert 'remember_token' not in response.headers.get('Set-Cookie', '')
+    client.post('/api/auth/logout')
+
+    response = client.post('/api/auth/login', json={
+        'student_id': '2024001', 'password': '123456', 'remember': True
+    })
+    cookies = response.headers.getlist('Set-Cookie')
+    assert any(c.startswith('remember_token=') and 'HttpOnly' in c for c in cookies)
+
+
+def test_login_without_remember_clears_previous_cookie(client):
+    for student_id in ('2024001', '2024002'):
+        user = User(student_id=student_id, name=student_id)
+        user.set_password('123456')
+        db.session.add(user)
+    db.session.commit()
+
+    # A 勾选记住我后直接关掉页面，B 在同一台电脑上不勾选登录
+    client.post('/api/auth/login', json={'student_id': '2024001', 'password': '123456', 'remember': True})
+    response = client.post('/api/auth/login', json={'student_id': '2024002', 'password': '123456'})
+    assert any(c.startswith('remember_token=;') for c in response.headers.getlist('Set-Cookie'))
+    # 浏览器重启丢掉会话 cookie 后，没有能恢复成 A 的 cookie
+    assert client.get_cookie('remember_token') is None
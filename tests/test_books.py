@@ -35,3 +35,90 @@ def test_get_book_detail(client):
     assert response.status_code == 200
     data = response.get_json()
     assert data['book']['title'] == 'Python'
+
+
+def test_get_books_keyset_pagination(client):
+    from datetime import datetime, timedelta
+    base = datetime(2026, 1, 1)
+    for i in range(5):
+        db.session.add(Book(title=f'书{i}', author='A', publisher='P',
+                            status='available', created_at=base + timedelta(days=i)))
+    db.session.commit()
+
+    response = client.get('/api/books?limit=2&view=summary&with_total=1')
+    data = response.get_json()
+    assert response.headers['X-Total-Count'] == '5'
+    assert [b['title'] for b in data['books']] == ['书4', '书3']
+    assert 'borrow_history' not in data['books'][0]
+
+    titles = [b['title'] for b in data['books']]
+    cursor = data['next_cursor']
+    while cursor:
+        data = client.get(f'/api/books?limit=2&cursor={cursor}').get_json()
+        titles.extend(b['title'] for b in data['books'])
+        cursor = data['next_cursor']
+    assert titles == ['书4', '书3', '书2', '书1', '书0']
+
+    response = client.get('/api/books?cursor=not-a-cursor')
+    assert response.status_code == 400
+    # 能解码但值不是排序列对应类型的标量
+    from services.pagination import encode_cursor
+    for values in (['2026-01-01', {'a': 1}], ['2026-01-01', '1'], ['2026-01-01', [1]]):
+        assert client.get(f'/api/books?cursor={encode_cursor(values)}').status_code == 400
+
+
+def test_get_books_facets(client):
+    db.session.add_all([
+        Book(title='三体', author='刘慈欣', publisher='P', status='available', source='class', tags='科幻'),
+        Book(title='三体II', author='刘慈欣', publisher='P', status='borrowed', source='donated', tags='科幻,经典'),
+        Book(title='活着', author='余华', publisher='P', status='available', source='class', tags='经典'),
+    ])
+    db.session.commit()
+
+    data = client.get('/api/books?tag=科幻&facets=1&limit=1').get_json()
+    assert len(data['books']) == 1
+    assert data['facets'] == {
+        'status': {'available': 1, 'borrowed': 1},
+        'source': {'class': 1, 'donated': 1},
+        'tag': {'科幻': 2, '经典': 1}
+    }
+
+    data = client.get('/api/books?facets=status').get_json()
+    assert data['facets'] == {'status': {'available': 2, 'borrowed': 1}}
+
+
+def test_get_books_source_and_date_filters(client):
+    from datetime import datetime
+    db.session.add_all([
+        Book(title='三体', author='刘慈欣', publisher='P', source='class', created_at=datetime(2026, 3, 1, 9)),
+        Book(title='活着', author='余华', publisher='P', source='donated', created_at=datetime(2026, 3, 2, 23, 30)),
+        Book(title='围城', author='钱钟书', publisher='P', source='donated', created_at=datetime(2026, 3, 3, 8)),
+    ])
+    db.session.commit()
+
+    data = client.get('/api/books?source=donated&view=summary').get_json()
+    assert sorted(b['title'] for b in data['books']) == ['围城', '活着']
+
+    response = client.get('/api/books?created_from=2026-03-01&created_to=2026-03-02&limit=10&with_total=1')
+    assert response.headers['X-Total-Count'] == '2'
+    assert [b['title'] for b in response.get_json()['books']] == ['活着', '三体']
+
+    assert client.get('/api/books?created_from=2026/03/01').status_code == 400
+
+
+def test_get_books_facets_follow_filters(client):
+    db.session.add_all([
+        Book(title='三体', author='刘慈欣', publisher='P', status='available', source='class', tags='科幻'),
+        Book(title='三体II', author='刘慈欣', publisher='P', status='borrowed', source='donated', tags='科幻'),
+        Book(title='活着', author='余华', publisher='P', status='available', source='donated', tags='经典'),
+    ])
+    db.session.commit()
+
+    # 列表页只取一条，分面仍统计全部匹配的图书
+    data = client.get('/api/books?source=donated&limit=1&view=summary&facets=status,source,tag').get_json()
+    assert len(data['books']) == 1 and data['next_cursor']
+    assert data['facets'] == {
+        'status': {'available': 1, 'borrowed': 1},
+        'source': {'donated': 2},
+        'tag': {'科幻': 1, '经典': 1}
+    }
@@ -33,3 +33,118 @@ def test_request_borrow(client):
     # 检查状态
     book = Book.query.get(book.id)
     assert book.status == 'pending_borrow'
+
+
+def test_borrow_counters_follow_transitions(client):
+    from services.borrow_service import check_borrow_counters
+
+    admin = User(student_id='admin', name='管理员', is_admin=True)
+    admin.set_password('admin')
+    user = User(student_id='2024001', name='张三')
+    user.set_password('123')
+    book = Book(title='Python', author='A', publisher='P', status='available')
+    db.session.add_all([admin, user, book])
+    db.session.commit()
+
+    client.post('/api/auth/login', json={'student_id': '2024001', 'password': '123'})
+    record_id = client.post('/api/borrows', json={'book_id': book.id}).get_json()['record']['id']
+
+    assert db.session.get(User, user.id).active_borrow_count == 1
+    assert db.session.get(Book, book.id).current_borrow_record_id == record_id
+    assert client.get(f'/api/books/{book.id}').get_json()['book']['current_borrow']['id'] == record_id
+
+    client.post('/api/auth/logout')
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+    client.put(f'/api/admin/borrows/{record_id}/approve')
+    client.post('/api/auth/logout')
+    client.post('/api/auth/login', json={'student_id': '2024001', 'password': '123'})
+    client.put(f'/api/borrows/{record_id}/return')
+    client.post('/api/auth/logout')
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+    client.put(f'/api/admin/borrows/{record_id}/confirm-return')
+
+    db.session.expire_all()
+    assert db.session.get(User, user.id).active_borrow_count == 0
+    assert db.session.get(Book, book.id).current_borrow_record_id is None
+    assert check_borrow_counters() == []
+
+    db.session.get(User, user.id).active_borrow_count = 3
+    db.session.commit()
+    assert check_borrow_counters(repair=True) == [('user', user.id, 3, 0)]
+    assert check_borrow_counters() == []
+
+
+def test_concurrent_transitions_conflict(client):
+    from services import borrow_service
+
+    user = User(student_id='2024001', name='张三')
+    user.set_password('123')
+    other = User(student_id='2024002', name='李四')
+    other.set_password('123')
+    book = Book(title='Python', author='A', publisher='P', status='available')
+    db.session.add_all([user, other, book])
+    db.session.commit()
+
+    # 另一个请求在本请求读取图书之后抢先借走
+    book = db.session.get(Book, book.id)
+    assert book.status == 'available'
+    Book.query.filter_by(id=book.id).update({'status': 'pending_borrow'}, synchronize_session=False)
+    result, status_code = borrow_service.request_borrow(book.id, other.id)
+    assert status_code == 409
+    assert db.session.get(User, other.id).active_borrow_count == 0
+
+    Book.query.filter_by(id=book.id).update({'status': 'available'}, synchronize_session=False)
+    db.session.commit()
+    result, status_code = borrow_service.request_borrow(book.id, user.id)
+    assert status_code == 201
+
+    # 两个管理员同时审批同一条记录，只有一个成功
+    record = db.session.get(BorrowRecord, result['record']['id'])
+    assert record.status == 'pending'
+    BorrowRecord.query.filter_by(id=record.id).update({'status': 'rejected'}, synchronize_session=False)
+    result, status_code = borrow_service.transition(record, 'approve')
+    assert status_code == 409
+    assert db.session.get(BorrowRecord, record.id).status == 'pending'
+
+
+def test_bulk_transition_commits_once(tmp_path, monkeypatch):
+    """整批在一个事务里：处理过程中另一个连接看不到任何一条已更新"""
+    import sqlite3
+    from flask import Flask
+    from config import Config
+    from services import borrow_service
+
+    path = tmp_path / 'bulk.db'
+    file_app = Flask(__name__)
+    file_app.config.from_object(Config)
+    file_app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(file_app)
+
+    with file_app.app_context():
+        db.create_all()
+        user = User(student_id='2024001', name='张三', password_hash='x')
+        books = [Book(title=f'Book {i}', author='A', publisher='P', status='pending_borrow') for i in range(3)]
+        db.session.add_all([user, *books])
+        db.session.commit()
+        records = [BorrowRecord(book_id=b.id, borrower_id=user.id, status='pending') for b in books]
+        db.session.add_all(records)
+        db.session.commit()
+        ids = [r.id for r in records]
+
+        observer = sqlite3.connect(path)
+        seen = []
+        apply_transition = borrow_service.apply_transition
+
+        def observed(record, action):
+            apply_transition(record, action)
+            seen.append([s for (s,) in observer.execute('SELECT status FROM borrow_records ORDER BY id')])
+
+        monkeypatch.setattr(borrow_service, 'apply_transition', observed)
+        results = borrow_service.bulk_transition(ids, 'approve')
+
+        assert [r['success'] for r in results] == [True] * 3
+        assert seen == [['pending'] * 3] * 3
+        assert [s for (s,) in observer.execute('SELECT status FROM borrow_records ORDER BY id')] == ['approved'] * 3
+        observer.close()
+        db.session.remove()
+        db.drop_all()
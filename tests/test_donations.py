@@ -0,0 +1,76 @@
+import pytest
+from datetime import datetime, timedelta
+from app import app, db
+from models import User, Book, BorrowRecord, DonorConfirm
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def _portfolio():
+    donor = User(student_id='2024001', name='捐赠者')
+    donor.set_password('123')
+    reader = User(student_id='2024002', name='读者')
+    reader.set_password('123')
+    db.session.add_all([donor, reader])
+    db.session.commit()
+
+    now = datetime(2024, 3, 1)
+    books = [Book(title=f'Book {i}', author='A', publisher='P', donor_id=donor.id,
+                  created_at=now + timedelta(days=i)) for i in range(3)]
+    db.session.add_all(books)
+    db.session.commit()
+
+    # Book 0 被借出两次，Book 2 有一条待确认申请
+    lends = [BorrowRecord(book_id=books[0].id, borrower_id=reader.id, status='returned', approve_at=now)
+             for _ in range(2)]
+    pending = BorrowRecord(book_id=books[2].id, borrower_id=reader.id, status='pending_donor')
+    db.session.add_all(lends + [pending])
+    db.session.commit()
+    db.session.add(DonorConfirm(borrow_record_id=pending.id, donor_id=donor.id, status='pending'))
+    db.session.commit()
+    return donor, books
+
+
+def test_donations_portfolio(client):
+    donor, books = _portfolio()
+    client.post('/api/auth/login', json={'student_id': '2024001', 'password': '123'})
+
+    data = client.get('/api/donations').get_json()
+    assert data['pending_confirm_count'] == 1
+    assert data['donations'] == []
+    assert 'next_cursor' not in data
+
+    by_title = {b['title']: b for b in data['donated_books']}
+    assert [b['title'] for b in data['donated_books']] == ['Book 2', 'Book 1', 'Book 0']
+    assert by_title['Book 0']['lend_count'] == 2
+    assert by_title['Book 1']['lend_count'] == 0
+    assert by_title['Book 2']['has_pending_confirm'] is True
+    assert by_title['Book 2']['pending_confirm']['borrow_record']['borrower_name'] == '读者'
+    assert by_title['Book 0']['has_pending_confirm'] is False
+
+
+def test_donations_pagination(client):
+    _portfolio()
+    client.post('/api/auth/login', json={'student_id': '2024001', 'password': '123'})
+
+    first = client.get('/api/donations?limit=2&fields=id,title').get_json()
+    assert [b['title'] for b in first['donated_books']] == ['Book 2', 'Book 1']
+    assert set(first['donated_books'][0]) == {'id', 'title'}
+    assert first['pending_confirm_count'] == 1
+    assert first['next_cursor']
+
+    second = client.get(f"/api/donations?limit=2&cursor={first['next_cursor']}").get_json()
+    assert [b['title'] for b in second['donated_books']] == ['Book 0']
+    assert second['next_cursor'] is None
+    assert 'donations' not in second
+
+    assert client.get('/api/donations?cursor=bogus').status_code == 400
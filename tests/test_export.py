@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+import pytest
+from datetime import datetime
+from app import app, db
+from models import User, Book, BorrowRecord
+from services import export_service
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def _setup():
+    admin = User(student_id='admin', name='管理员', is_admin=True)
+    admin.set_password('admin')
+    user = User(student_id='2024001', name='张三', password_hash='x')
+    book = Book(title='活着', author='余华', publisher='作家出版社')
+    db.session.add_all([admin, user, book])
+    db.session.commit()
+    db.session.add_all([
+        BorrowRecord(book_id=book.id, borrower_id=user.id, status='completed', request_at=datetime(2026, 3, 1)),
+        BorrowRecord(book_id=book.id, borrower_id=user.id, status='approved', request_at=datetime(2026, 9, 1)),
+    ])
+    db.session.commit()
+
+
+def test_export_borrows_csv_with_date_range(client, monkeypatch):
+    _setup()
+    monkeypatch.setattr(export_service, 'YIELD_PER', 1)
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+
+    response = client.get('/api/admin/export/borrows?format=csv&start=2026-02-01&end=2026-03-01')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/csv; charset=utf-8'
+    assert 'attachment' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True).lstrip('\ufeff'))))
+    assert len(rows) == 1
+    assert rows[0]['book_title'] == '活着' and rows[0]['status'] == 'completed'
+
+    response = client.get('/api/admin/export/borrows?format=ndjson')
+    assert response.headers['Content-Type'] == 'application/x-ndjson; charset=utf-8'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['status'] for line in lines] == ['completed', 'approved']
+    assert lines[0]['borrower_name'] == '张三'
+
+
+def test_export_rejects_unknown_kind_and_format(client):
+    _setup()
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+    assert client.get('/api/admin/export/users').status_code == 404
+    assert client.get('/api/admin/export/books?format=xlsx').status_code == 400
+    books = client.get('/api/admin/export/books?format=ndjson').get_data(as_text=True)
+    assert json.loads(books)['title'] == '活着'
+
+
+def test_export_rejects_unrepresentable_end(client):
+    _setup()
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+    assert client.get('/api/admin/export/borrows?end=9999-12-31').status_code == 400
@@ -0,0 +1,85 @@
+import io
+import pytest
+from app import app, db
+from models import User, Book, Tag
+from services import import_service, stats_service
+from services.search_service import ranked_matches
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+CSV = '''title,author,publisher,isbn,tags
+活着,余华,作家出版社,978-7-5063-6543-7,"小说,经典"
+活着（第二册）,余华,作家出版社,9787506365437,小说
+,无名,某出版社,,
+三体,刘慈欣,重庆出版社,7536692935,科幻
+骆驼祥子,老舍,人民文学出版社,9787020002207,经典
+'''
+
+
+def test_import_csv_dedupes_and_reports(client):
+    # 库里的 ISBN 按录入时的原样保存：带连字符的 ISBN-13 和 ISBN-10
+    db.session.add(Book(title='三体', author='刘慈欣', publisher='重庆出版社', isbn='978-7-5366-9293-0'))
+    db.session.add(Book(title='骆驼祥子', author='老舍', publisher='人民文学出版社', isbn='7-02-000220-X'))
+    db.session.commit()
+
+    report = import_service.import_books(io.StringIO(CSV), 'csv', chunk_size=1)
+    assert report == {
+        'total': 5, 'imported': 1, 'skipped': 3, 'failed': 1,
+        'errors': [{'line': 4, 'message': '缺少title'}]
+    }
+
+    book = Book.query.filter_by(isbn='9787506365437').one()
+    assert sorted(t.name for t in book.tag_items) == ['小说', '经典']
+    assert stats_service.get_stats()['books.total'] == 1
+    assert db.session.query(ranked_matches('活着')).count() == 1
+
+
+def test_import_endpoint_jsonl(client):
+    admin = User(student_id='admin', name='Admin', is_admin=True)
+    admin.set_password('admin')
+    db.session.add(admin)
+    db.session.commit()
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+
+    data = '{"title": "Python", "author": "A", "publisher": "P", "tags": ["编程"]}\nnot json\n'
+    response = client.post('/api/books/import', data={
+        'file': (io.BytesIO(data.encode('utf-8')), 'books.jsonl')
+    }, content_type='multipart/form-data')
+    report = response.get_json()['report']
+    assert report['imported'] == 1 and report['errors'] == [{'line': 2, 'message': 'JSON 格式错误'}]
+    assert Tag.query.one().name == '编程'
+
+    response = client.post('/api/books/import', data={
+        'file': (io.BytesIO(b'x'), 'books.xlsx')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 400
+
+
+def test_import_endpoint_reports_partial_import_on_decode_error(client):
+    admin = User(student_id='admin', name='Admin', is_admin=True)
+    admin.set_password('admin')
+    db.session.add(admin)
+    db.session.commit()
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+
+    lines = ''.join(f'{{"title": "书{i}", "author": "A", "publisher": "P"}}\n' for i in range(700))
+    response = client.post('/api/books/import', data={
+        'file': (io.BytesIO(lines.encode('utf-8') + b'\xff\xfe\n'), 'books.jsonl')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 200
+    report = response.get_json()['report']
+    # 第一块已提交，报告如实反映写入的行数，并指出解码失败的位置
+    assert report['imported'] == Book.query.count() >= 500
+    assert report['failed'] == 1
+    assert report['errors'][-1]['line'] == report['total'] + 1
+    assert 'UTF-8' in report['errors'][-1]['message']
@@ -0,0 +1,94 @@
+import pytest
+from app import app, db
+from models import User, IsbnCache
+from services import isbn_service
+from services.isbn_service import to_isbn10, to_isbn13
+
+DATASET = 'isbn,title,author,publisher,tags\n978-7-02-000220-7,骆驼祥子,老舍,人民文学出版社,"经典,小说"\n'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    dataset = tmp_path / 'isbn.csv'
+    dataset.write_text(DATASET, encoding='utf-8')
+    monkeypatch.setitem(app.config, 'ISBN_DATA_FILE', str(dataset))
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """在 local 之后挂一个记录调用的数据源，只认识 9780306406157"""
+    seen = []
+
+    def lookup(isbns):
+        seen.append(list(isbns))
+        if 'fail' in app.config:
+            raise OSError('unreachable')
+        return {i: {'title': 'Remote'} for i in isbns if i == '9780306406157'}
+
+    monkeypatch.setitem(isbn_service.PROVIDERS, 'recorder', lookup)
+    monkeypatch.setitem(app.config, 'ISBN_PROVIDERS', ['local', 'recorder'])
+    return seen
+
+
+def test_isbn_conversion():
+    assert to_isbn13('7-02-000220-x') == '9787020002207'
+    assert to_isbn10('9787020002207') == '702000220X'
+    assert to_isbn10('9790000000001') is None
+    assert to_isbn10('123') is None
+
+
+def test_lookup_uses_providers_and_cache(client, calls):
+    results = isbn_service.lookup(['7-02-000220-x', '9780306406157', '9781234567897', 'abc'])
+    assert [r['found'] for r in results] == [True, True, False, False]
+    assert results[0]['book'] == {'title': '骆驼祥子', 'author': '老舍', 'publisher': '人民文学出版社',
+                                  'tags': ['经典', '小说']}
+    assert results[3]['valid'] is False
+    # local 查到的不再询问后面的数据源
+    assert calls == [['9780306406157', '9781234567897']]
+
+    # 再次查询全部命中缓存，包括查不到的负缓存
+    again = isbn_service.lookup(['9787020002207', '9781234567897'])
+    assert [r['found'] for r in again] == [True, False]
+    assert len(calls) == 1
+    assert IsbnCache.query.filter_by(found=False).count() == 1
+
+
+def test_provider_failure_is_not_negatively_cached(client, calls):
+    app.config['fail'] = True
+    try:
+        assert isbn_service.lookup(['9780306406157'])[0]['found'] is False
+    finally:
+        del app.config['fail']
+    assert IsbnCache.query.count() == 0
+    assert isbn_service.lookup(['9780306406157'])[0]['found'] is True
+
+
+def test_cache_evicts_least_recently_used(client, calls, monkeypatch):
+    monkeypatch.setitem(app.config, 'ISBN_CACHE_SIZE', 2)
+    isbn_service.lookup(['9787020002207'])
+    isbn_service.lookup(['9780306406157'])
+    isbn_service.lookup(['9787020002207'])
+    isbn_service.lookup(['9781234567897'])
+    assert sorted(e.isbn13 for e in IsbnCache.query.all()) == ['9781234567897', '9787020002207']
+
+
+def test_batch_lookup_endpoint(client):
+    user = User(student_id='2024001', name='张三')
+    user.set_password('123')
+    db.session.add(user)
+    db.session.commit()
+    client.post('/api/auth/login', json={'student_id': '2024001', 'password': '123'})
+
+    data = client.post('/api/books/isbn', json={'isbns': ['702000220X', 'bad']}).get_json()
+    assert [(r['isbn13'], r['found']) for r in data['results']] == [('9787020002207', True), (None, False)]
+    assert client.get('/api/books/isbn/702000220X').get_json()['book']['title'] == '骆驼祥子'
+    assert client.get('/api/books/isbn/bad').status_code == 400
+    assert client.post('/api/books/isbn', json={'isbns': ['1'] * 501}).status_code == 400
+    assert client.post('/api/books/isbn', json={}).status_code == 400
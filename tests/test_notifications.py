@@ -0,0 +1,139 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from app import app, db
+from models import User, Book, BorrowRecord, Notification
+from services import notification_service
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def _setup_overdue():
+    admin = User(student_id='admin', name='管理员', is_admin=True)
+    admin.set_password('admin')
+    user = User(student_id='2024001', name='张三')
+    user.set_password('123')
+    book = Book(title='Python', author='A', publisher='P', status='borrowed')
+    db.session.add_all([admin, user, book])
+    db.session.commit()
+
+    approve_at = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=40)
+    record = BorrowRecord(book_id=book.id, borrower_id=user.id, status='approved',
+                          approve_at=approve_at, due_at=approve_at + timedelta(days=30))
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+
+def test_reminders_are_queued_delivered_and_read(client):
+    record = _setup_overdue()
+
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+    for bad in ('1,2', [None], ['abc'], {'id': 1}):
+        response = client.post('/api/admin/overdue/send-reminder', json={'record_ids': bad})
+        assert response.status_code == 400
+    assert Notification.query.count() == 0
+
+    data = client.post('/api/admin/overdue/send-reminder', json={'record_ids': [str(record.id)]}).get_json()
+    assert data['reminder_sent'][0]['book_title'] == 'Python'
+
+    # 同一天重复提醒（包括定时任务）不会重复入队
+    notification_service.enqueue_overdue_reminders()
+    assert Notification.query.count() == 1
+    assert Notification.query.one().status == 'pending'
+
+    assert notification_service.deliver_batch() == 1
+    client.post('/api/auth/logout')
+
+    client.post('/api/auth/login', json={'student_id': '2024001', 'password': '123'})
+    inbox = client.get('/api/notifications?unread=1').get_json()
+    assert inbox['unread_count'] == 1
+    assert 'Python' in inbox['notifications'][0]['title']
+
+    client.put(f"/api/notifications/{inbox['notifications'][0]['id']}/read")
+    assert client.get('/api/notifications/unread-count').get_json()['unread_count'] == 0
+
+
+def test_failed_delivery_backs_off_then_fails(client, monkeypatch):
+    _setup_overdue()
+
+    def broken(notification):
+        raise OSError('smtp down')
+
+    monkeypatch.setitem(notification_service.CHANNELS, 'inbox', broken)
+    monkeypatch.setitem(app.config, 'NOTIFICATION_MAX_ATTEMPTS', 2)
+    notification_service.enqueue_overdue_reminders()
+
+    notification_service.deliver_batch()
+    notification = Notification.query.one()
+    assert notification.status == 'pending' and notification.attempts == 1
+    assert notification.next_attempt_at > datetime.now(timezone.utc).replace(tzinfo=None)
+
+    # 未到重试时间不会再次投递
+    assert notification_service.deliver_batch() == 0
+
+    notification.next_attempt_at = datetime(2000, 1, 1)
+    db.session.commit()
+    notification_service.deliver_batch()
+    assert Notification.query.one().status == 'failed'
+    assert Notification.query.one().last_error == 'smtp down'
+
+
+def test_delivery_claims_each_notification_once(client, monkeypatch):
+    _setup_overdue()
+    delivered = []
+    monkeypatch.setitem(notification_service.CHANNELS, 'inbox', lambda n: delivered.append(n.id))
+    notification_service.enqueue_overdue_reminders()
+    notification_id = Notification.query.one().id
+
+    # 另一个进程的 worker 已经认领：本进程取不到，也不会重复投递
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    lease_until = now + timedelta(minutes=5)
+    assert notification_service._claim([notification_id], now, lease_until) == [notification_id]
+    assert notification_service._claim([notification_id], now, lease_until) == []
+    assert Notification.query.one().status == 'sending'
+    assert notification_service.deliver_batch() == 0
+    assert delivered == []
+
+    # 认领的进程中途退出，租约到期后重新认领投递
+    Notification.query.one().next_attempt_at = datetime(2000, 1, 1)
+    db.session.commit()
+    assert notification_service.deliver_batch() == 1
+    assert delivered == [notification_id]
+    assert Notification.query.one().status == 'sent'
+
+
+def test_claim_takes_the_batch_in_one_update(client):
+    from sqlalchemy import event
+
+    user = User(student_id='2024001', name='张三', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    notifications = [Notification(user_id=user.id, kind='overdue_reminder', title=f'提醒{i}',
+                                  next_attempt_at=now - timedelta(minutes=1)) for i in range(3)]
+    # 第三条已被其他 worker 认领，租约未到期
+    notifications[2].status = 'sending'
+    notifications[2].next_attempt_at = now + timedelta(minutes=5)
+    db.session.add_all(notifications)
+    db.session.commit()
+    ids = [n.id for n in notifications]
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        claimed = notification_service._claim(ids, now, now + timedelta(minutes=10))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert claimed == ids[:2]
+    assert len([s for s in statements if s.startswith('UPDATE notifications')]) == 1
@@ -0,0 +1,77 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from app import app, db
+from models import User, Book, BorrowRecord
+from services import settings_service
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            settings_service.invalidate_cache()
+            yield client
+            db.drop_all()
+            settings_service.invalidate_cache()
+
+
+def _approved(book, user, days_ago):
+    approve_at = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days_ago)
+    return BorrowRecord(book_id=book.id, borrower_id=user.id, status='approved',
+                        approve_at=approve_at, due_at=approve_at + timedelta(days=30))
+
+
+def test_overdue_endpoint_buckets_and_pages(client):
+    admin = User(student_id='admin', name='管理员', is_admin=True)
+    admin.set_password('admin')
+    user = User(student_id='2024001', name='张三', password_hash='x')
+    books = [Book(title=f'书{i}', author='A', publisher='P', status='borrowed') for i in range(4)]
+    db.session.add_all([admin, user, *books])
+    db.session.commit()
+
+    # 逾期 3 天、10 天、45 天，以及一条未逾期
+    db.session.add_all([_approved(books[0], user, 32), _approved(books[1], user, 39),
+                        _approved(books[2], user, 74), _approved(books[3], user, 5)])
+    db.session.commit()
+
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+    data = client.get('/api/admin/overdue?limit=2').get_json()
+    assert [r['book_title'] for r in data['records']] == ['书2', '书1']
+    assert [r['bucket'] for r in data['records']] == ['30+', '8-14']
+    assert data['buckets'] == {'1-7': 1, '8-14': 1, '15-30': 0, '30+': 1}
+
+    rest = client.get(f"/api/admin/overdue?limit=2&cursor={data['next_cursor']}").get_json()
+    assert [r['days_overdue'] for r in rest['records']] == [3]
+    assert rest['next_cursor'] is None
+
+    assert len(client.get('/api/admin/overdue?bucket=1-7').get_json()['records']) == 1
+    assert client.get('/api/admin/overdue?bucket=bad').status_code == 400
+    assert 'overdue' not in client.get('/api/admin/dashboard').get_json()
+
+
+def test_due_dates_follow_max_borrow_days(client):
+    admin = User(student_id='admin', name='管理员', is_admin=True)
+    admin.set_password('admin')
+    user = User(student_id='2024001', name='张三', password_hash='x')
+    book = Book(title='Python', author='A', publisher='P', status='pending_borrow')
+    db.session.add_all([admin, user, book])
+    db.session.commit()
+    record = BorrowRecord(book_id=book.id, borrower_id=user.id, status='pending')
+    db.session.add(record)
+    db.session.commit()
+
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+    approved = client.put(f'/api/admin/borrows/{record.id}/approve').get_json()['record']
+    approve_at = datetime.fromisoformat(approved['approve_at'])
+    assert datetime.fromisoformat(approved['due_at']) - approve_at == timedelta(days=30)
+
+    client.put('/api/admin/settings', json={'max_borrow_days': 7})
+    due_at = db.session.get(BorrowRecord, record.id).due_at
+    assert due_at == approve_at + timedelta(days=7)
+    # 与 ORM 写入的格式一致（带微秒），due_at 的字符串比较才可靠
+    stored = db.session.execute(db.text('SELECT due_at FROM borrow_records WHERE id = :id'),
+                                {'id': record.id}).scalar()
+    assert stored == due_at.strftime('%Y-%m-%d %H:%M:%S.%f')
@@ -0,0 +1,98 @@
+import pytest
+from app import app, db
+from models import User, Book
+from services.rating_service import rebuild_ratings
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def _review(client, student_id, book_id, rating, review_type='neutral'):
+    client.post('/api/auth/login', json={'student_id': student_id, 'password': '123'})
+    response = client.post(f'/api/books/{book_id}/reviews', json={'rating': rating, 'review_type': review_type})
+    client.post('/api/auth/logout')
+    return response
+
+
+def _setup():
+    users = [User(student_id=f'20240{i}', name=f'U{i}') for i in range(3)]
+    for u in users:
+        u.set_password('123')
+    books = [Book(title=f'Book {i}', author='A', publisher='P') for i in range(3)]
+    db.session.add_all(users + books)
+    db.session.commit()
+    return users, books
+
+
+def test_review_updates_aggregates(client):
+    users, books = _setup()
+    assert _review(client, '202400', books[0].id, 5, 'recommend').status_code == 201
+    assert _review(client, '202401', books[0].id, 2, 'warn').status_code == 201
+    assert _review(client, '202402', books[0].id, 6).status_code == 400
+    assert _review(client, '202402', books[0].id, 4, 'bogus').status_code == 400
+
+    rating = client.get(f'/api/books/{books[0].id}').get_json()['book']['rating']
+    assert rating['count'] == 2
+    assert rating['average'] == 3.5
+    assert rating['histogram'] == {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1}
+    assert rating['review_types'] == {'recommend': 1, 'warn': 1, 'neutral': 0}
+
+    summary = client.get(f'/api/books/{books[0].id}/reviews').get_json()['summary']
+    assert summary == rating
+
+    # 重建结果与增量累加一致
+    assert rebuild_ratings() == 1
+    assert client.get(f'/api/books/{books[0].id}').get_json()['book']['rating'] == rating
+    assert client.get(f'/api/books/{books[1].id}').get_json()['book']['rating']['average'] is None
+
+
+def test_books_sorted_and_filtered_by_rating(client):
+    users, books = _setup()
+    _review(client, '202400', books[0].id, 3)
+    _review(client, '202400', books[1].id, 5)
+    _review(client, '202401', books[1].id, 4)
+
+    data = client.get('/api/books?sort=rating&view=summary').get_json()
+    assert [b['title'] for b in data['books']] == ['Book 1', 'Book 0', 'Book 2']
+
+    first = client.get('/api/books?sort=rating&limit=1').get_json()
+    second = client.get(f"/api/books?sort=rating&limit=1&cursor={first['next_cursor']}").get_json()
+    assert [b['title'] for b in first['books'] + second['books']] == ['Book 1', 'Book 0']
+
+    data = client.get('/api/books?min_rating=4').get_json()
+    assert [b['title'] for b in data['books']] == ['Book 1']
+
+    assert client.get('/api/books?sort=bogus').status_code == 400
+    assert client.get('/api/books?min_rating=x').status_code == 400
+
+
+def test_review_feeds_paginate(client):
+    users, books = _setup()
+    for i, user in enumerate(users):
+        _review(client, user.student_id, books[0].id, i + 1)
+    _review(client, '202400', books[1].id, 5)
+
+    first = client.get(f'/api/books/{books[0].id}/reviews?limit=2').get_json()
+    assert [r['rating'] for r in first['reviews']] == [3, 2]
+    assert first['reviews'][0]['user_name'] == 'U2'
+    assert first['summary']['count'] == 3
+    second = client.get(f"/api/books/{books[0].id}/reviews?limit=2&cursor={first['next_cursor']}").get_json()
+    assert [r['rating'] for r in second['reviews']] == [1]
+    assert second['next_cursor'] is None
+    assert 'summary' not in second
+
+    # 不传分页参数时保持返回全部
+    assert len(client.get(f'/api/books/{books[0].id}/reviews').get_json()['reviews']) == 3
+
+    latest = client.get('/api/reviews/latest?limit=2').get_json()
+    assert [(r['book_title'], r['rating']) for r in latest['reviews']] == [('Book 1', 5), ('Book 0', 3)]
+    assert latest['next_cursor']
+    assert client.get('/api/reviews/latest?cursor=bogus').status_code == 400
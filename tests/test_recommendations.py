@@ -0,0 +1,114 @@
+import pytest
+from datetime import datetime, timedelta
+from app import app, db
+from models import User, Book, BorrowRecord, BookReview, BookSimilarity, StaleSimilarity
+from services import borrow_service, recommendation_service
+from services.rating_service import rebuild_ratings
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def _setup():
+    users = [User(student_id=f'20240{i}', name=f'U{i}') for i in range(3)]
+    for u in users:
+        u.set_password('123')
+    books = [Book(title=f'Book {i}', author='A', publisher='P') for i in range(5)]
+    db.session.add_all(users + books)
+    db.session.commit()
+
+    # U0: 0 1；U1: 0 1 2；U2: 2 3
+    history = {0: [0, 1], 1: [0, 1, 2], 2: [2, 3]}
+    now = datetime(2024, 3, 1)
+    for u, indexes in history.items():
+        for n, i in enumerate(indexes):
+            db.session.add(BorrowRecord(book_id=books[i].id, borrower_id=users[u].id, status='completed',
+                                        approve_at=now, return_at=now + timedelta(days=n)))
+    db.session.add(BookReview(book_id=books[2].id, user_id=users[1].id, rating=5))
+    db.session.commit()
+    rebuild_ratings()
+    return users, books
+
+
+def _snapshot():
+    rows = db.session.query(BookSimilarity.book_id, BookSimilarity.similar_book_id, BookSimilarity.score)
+    return sorted((b, s, round(score, 9)) for b, s, score in rows)
+
+
+def test_similar_books(client):
+    users, books = _setup()
+    assert recommendation_service.rebuild_similarities() > 0
+
+    data = client.get(f'/api/books/{books[0].id}/similar').get_json()
+    assert [b['title'] for b in data['books']] == ['Book 1', 'Book 2']
+    assert data['books'][0]['score'] > data['books'][1]['score']
+    assert client.get(f'/api/books/{books[4].id}/similar').get_json()['books'] == []
+    assert client.get('/api/books/999/similar').status_code == 404
+
+
+def test_recommendations_exclude_borrowed(client):
+    users, books = _setup()
+    recommendation_service.rebuild_similarities()
+
+    client.post('/api/auth/login', json={'student_id': '202400', 'password': '123'})
+    data = client.get('/api/recommendations').get_json()
+    assert [b['title'] for b in data['books']] == ['Book 2']
+
+    # 没有借阅历史时退回评分最高的图书
+    client.post('/api/auth/logout')
+    newcomer = User(student_id='202409', name='New')
+    newcomer.set_password('123')
+    db.session.add(newcomer)
+    db.session.commit()
+    client.post('/api/auth/login', json={'student_id': '202409', 'password': '123'})
+    data = client.get('/api/recommendations').get_json()
+    assert [(b['title'], b['score']) for b in data['books']] == [('Book 2', None)]
+
+
+def test_refresh_matches_rebuild(client, monkeypatch):
+    users, books = _setup()
+    # 与本次变化无关的读者：只借过 Book 0 和 Book 1
+    outsider = User(student_id='202408', name='Outsider', password_hash='x')
+    db.session.add(outsider)
+    db.session.commit()
+    db.session.add_all([BorrowRecord(book_id=books[i].id, borrower_id=outsider.id, status='completed',
+                                     approve_at=datetime(2024, 3, 1), return_at=datetime(2024, 3, 2))
+                        for i in (0, 1)])
+    db.session.commit()
+    recommendation_service.rebuild_similarities()
+
+    loaded = []
+    load_matrix = recommendation_service._load_matrix
+
+    def spy(*args, **kwargs):
+        by_user, readers = load_matrix(*args, **kwargs)
+        loaded.extend(by_user)
+        return by_user, readers
+
+    monkeypatch.setattr(recommendation_service, '_load_matrix', spy)
+
+    record = BorrowRecord(book_id=books[4].id, borrower_id=users[2].id, status='return_pending',
+                          approve_at=datetime(2024, 3, 5))
+    db.session.add(record)
+    db.session.commit()
+    result, status = borrow_service.transition(record, 'confirm_return')
+    assert status == 200
+    assert [s.book_id for s in StaleSimilarity.query.all()] == [books[4].id]
+
+    # 受影响的是 Book 4 和 U2 借过的 Book 2、Book 3
+    assert recommendation_service.refresh_stale() == 3
+    # 只读取了受影响图书的读者（U1 借过 Book 2，U2 借过 Book 2/3/4）的借阅
+    assert sorted(loaded) == [users[1].id, users[2].id]
+    assert StaleSimilarity.query.count() == 0
+    refreshed = _snapshot()
+    recommendation_service.rebuild_similarities()
+    assert refreshed == _snapshot()
+
@@ -0,0 +1,85 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from app import app, db
+from models import User, Book, BorrowRecord
+from services import rollup_service
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def test_leaderboards_by_window(client):
+    reader = User(student_id='2024001', name='张三', password_hash='x')
+    db.session.add(reader)
+    books = [Book(title=f'书{i}', author='A', publisher='P') for i in range(2)]
+    db.session.add_all(books)
+    db.session.commit()
+
+    now = datetime.now(timezone.utc)
+    rollup_service.record_borrow(books[0].id, reader.id, now - timedelta(days=60))
+    rollup_service.record_borrow(books[0].id, reader.id, now - timedelta(days=50))
+    rollup_service.record_borrow(books[1].id, reader.id, now)
+    rollup_service.record_return(now)
+    db.session.commit()
+
+    all_time = rollup_service.leaderboards()
+    assert [b['title'] for b in all_time['popular_books']] == ['书0', '书1']
+    assert all_time['top_readers'][0]['count'] == 3
+
+    recent = rollup_service.leaderboards(*rollup_service.resolve_range(window=7))
+    assert recent['popular_books'] == [{'book_id': books[1].id, 'title': '书1', 'count': 1}]
+
+    days = rollup_service.trend(*rollup_service.resolve_range(window=7))
+    assert len(days) == 7
+    assert days[-1]['borrows'] == 1 and days[-1]['returns'] == 1
+
+
+def test_rebuild_rollups_from_records(client):
+    reader = User(student_id='2024001', name='张三', password_hash='x')
+    book = Book(title='书', author='A', publisher='P')
+    db.session.add_all([reader, book])
+    db.session.commit()
+    db.session.add(BorrowRecord(book_id=book.id, borrower_id=reader.id, status='completed',
+                                approve_at=datetime(2026, 3, 1), return_at=datetime(2026, 3, 20)))
+    db.session.add(BorrowRecord(book_id=book.id, borrower_id=reader.id, status='rejected'))
+    db.session.commit()
+
+    assert rollup_service.rebuild_rollups() == 1
+    spring = rollup_service.leaderboards(*rollup_service.term_range('2026-spring'))
+    assert spring['popular_books'][0]['count'] == 1
+    assert rollup_service.leaderboards(*rollup_service.term_range('2026-autumn'))['popular_books'] == []
+
+
+def test_trends_endpoint_range(client):
+    admin = User(student_id='admin', name='Admin', is_admin=True)
+    admin.set_password('admin')
+    db.session.add(admin)
+    db.session.commit()
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+
+    assert len(client.get('/api/admin/trends').get_json()['trend']) == 30
+    response = client.get('/api/admin/trends?start=2026-03-01&end=2026-03-07')
+    assert len(response.get_json()['trend']) == 7
+    # 只给 end 时不能悄悄退回最近 30 天
+    assert client.get('/api/admin/trends?end=2026-03-07').status_code == 400
+
+
+def test_term_out_of_range_is_rejected(client):
+    admin = User(student_id='admin', name='Admin', is_admin=True)
+    admin.set_password('admin')
+    db.session.add(admin)
+    db.session.commit()
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+
+    assert rollup_service.term_range('0-spring') is None
+    assert client.get('/api/admin/leaderboards?term=0-spring').status_code == 400
+    assert client.get('/api/admin/trends?term=99999-autumn').status_code == 400
+    assert client.get('/api/admin/trends?term=9999-autumn').status_code == 400
@@ -0,0 +1,63 @@
+import io
+import pytest
+from app import app, db
+from models import User
+from services import roster_service, stats_service
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def test_import_roster_hashes_in_pool_and_reports(client, monkeypatch):
+    monkeypatch.setattr(roster_service, 'MIN_POOL_SIZE', 2)
+    db.session.add(User(student_id='2024001', name='已存在', password_hash='x'))
+    db.session.commit()
+
+    roster = 'student_id,name,password\n2024001,张三,111\n2024002,李四,222\n2024003,王五,\n2024002,重复,333\n2024004,,444\n'
+    report = roster_service.import_roster(io.StringIO(roster), 'csv')
+    assert (report['total'], report['imported'], report['skipped'], report['failed']) == (5, 2, 2, 1)
+    assert [e['line'] for e in report['errors']] == [5, 6, 2]
+
+    assert User.query.filter_by(student_id='2024002').one().check_password('222')
+    assert User.query.filter_by(student_id='2024003').one().check_password(roster_service.DEFAULT_PASSWORD)
+    assert stats_service.get_stats()['users.students'] == 2
+
+
+def test_hash_pool_does_not_fork(monkeypatch):
+    contexts = []
+    executor = roster_service.ProcessPoolExecutor
+
+    def recording(*args, mp_context=None, **kwargs):
+        contexts.append(mp_context.get_start_method())
+        return executor(*args, mp_context=mp_context, **kwargs)
+
+    monkeypatch.setattr(roster_service, 'ProcessPoolExecutor', recording)
+    monkeypatch.setattr(roster_service, 'MIN_POOL_SIZE', 2)
+    hashes = roster_service.hash_passwords(['a', 'b'], 'pbkdf2:sha256:1000', workers=2)
+    assert contexts == ['spawn']
+    assert all(h.startswith('pbkdf2:sha256:1000$') for h in hashes)
+
+
+def test_import_users_endpoint(client):
+    admin = User(student_id='admin', name='管理员', is_admin=True)
+    admin.set_password('admin')
+    db.session.add(admin)
+    db.session.commit()
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+
+    response = client.post('/api/admin/users/import', data={
+        'file': (io.BytesIO('student_id,name\n2024010,赵六\n'.encode('utf-8')), 'roster.csv')
+    }, content_type='multipart/form-data')
+    assert response.get_json()['report']['imported'] == 1
+
+    client.post('/api/auth/logout')
+    login = client.post('/api/auth/login', json={'student_id': '2024010', 'password': '123456'})
+    assert login.status_code == 200
@@ -0,0 +1,63 @@
+import pytest
+from app import app, db
+from models import User, Book, DonationRequest
+from services.search_service import build_match_query, rebuild_index
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def _search(client, keyword):
+    data = client.get('/api/books', query_string={'keyword': keyword, 'view': 'summary'}).get_json()
+    return [b['title'] for b in data['books']]
+
+
+def test_build_match_query():
+    assert build_match_query('机器学习') == '"机器" AND "器学" AND "学习"'
+    assert build_match_query('Python 书') == '"Python"* AND "书"'
+    assert build_match_query('!!') is None
+
+
+def test_search_chinese_ranked(client):
+    db.session.add_all([
+        Book(title='深度学习入门', author='斋藤康毅', publisher='人民邮电出版社', tags='AI'),
+        Book(title='Python编程', author='A', publisher='P', tags='学习,编程'),
+        Book(title='三体', author='刘慈欣', publisher='重庆出版社', tags='科幻'),
+    ])
+    db.session.commit()
+
+    assert _search(client, '学习') == ['深度学习入门', 'Python编程']
+    assert _search(client, '慈欣') == ['三体']
+    assert _search(client, 'pyth') == ['Python编程']
+
+    book = Book.query.filter_by(title='三体').first()
+    book.title = '球状闪电'
+    db.session.commit()
+    assert _search(client, '三体') == []
+    assert _search(client, '闪电') == ['球状闪电']
+
+    assert rebuild_index() == 3
+    assert _search(client, '闪电') == ['球状闪电']
+
+
+def test_approved_donation_is_searchable(client):
+    admin = User(student_id='admin', name='管理员', is_admin=True)
+    admin.set_password('admin')
+    db.session.add(admin)
+    db.session.flush()
+    donation = DonationRequest(user_id=admin.id, title='活着', author='余华', publisher='作家出版社')
+    db.session.add(donation)
+    db.session.commit()
+
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+    client.put(f'/api/admin/donations/{donation.id}/approve')
+
+    assert _search(client, '余华') == ['活着']
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import event
+from app import app, db
+from models import User, Book, BorrowRecord
+from services.serializers import serialize_books
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def _count_queries(fn):
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_execute)
+    return result, len(statements)
+
+
+def _seed(n):
+    donor = User(student_id='donor', name='捐赠者', password_hash='x')
+    reader = User(student_id='reader', name='读者', password_hash='x')
+    db.session.add_all([donor, reader])
+    db.session.flush()
+    for i in range(n):
+        book = Book(title=f'书{i}', author='A', publisher='P', status='borrowed',
+                    source='donated', donor_id=donor.id)
+        db.session.add(book)
+        db.session.flush()
+        db.session.add(BorrowRecord(book_id=book.id, borrower_id=reader.id, status='completed'))
+        db.session.add(BorrowRecord(book_id=book.id, borrower_id=reader.id, status='approved'))
+    db.session.commit()
+
+
+def test_serialize_books_matches_to_dict(client):
+    _seed(3)
+    books = Book.query.order_by(Book.id).all()
+    expected = [b.to_dict() for b in books]
+    db.session.expunge_all()
+
+    books = Book.query.order_by(Book.id).all()
+    assert serialize_books(books) == expected
+
+
+def test_serialize_books_constant_queries(client):
+    _seed(30)
+    db.session.expunge_all()
+
+    books = Book.query.all()
+    data, count = _count_queries(lambda: serialize_books(books))
+    assert len(data) == 30
+    assert count <= 4
+
+    db.session.expunge_all()
+    books = Book.query.all()
+    data, count = _count_queries(lambda: serialize_books(books, fields={'title', 'status'}))
+    assert data[0] == {'id': books[0].id, 'title': books[0].title, 'status': 'borrowed'}
+    assert count <= 1
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import event
+from app import app, db
+from models import Setting
+from services import settings_service
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            settings_service.invalidate_cache()
+            yield client
+            db.drop_all()
+
+
+def test_settings_defaults_and_update(client):
+    assert settings_service.get_max_borrow_days() == app.config['MAX_BORROW_DAYS']
+
+    settings_service.update({'max_borrow_days': '14', '_version': 'x'})
+    assert settings_service.get_max_borrow_days() == 14
+    assert Setting.query.filter_by(key='_version').first().value != 'x'
+
+
+def test_settings_cached_until_version_changes(client):
+    settings_service.get_all()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        for _ in range(10):
+            settings_service.get_max_books_per_user()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert statements == []
+
+    # 模拟另一个进程修改了设置
+    db.session.add_all([Setting(key='max_books_per_user', value='2'), Setting(key='_version', value='v2')])
+    db.session.commit()
+    assert settings_service.get_max_books_per_user() == app.config['MAX_BOOKS_PER_USER']
+
+    ttl = app.config['SETTINGS_CACHE_TTL']
+    app.config['SETTINGS_CACHE_TTL'] = 0
+    try:
+        assert settings_service.get_max_books_per_user() == 2
+    finally:
+        app.config['SETTINGS_CACHE_TTL'] = ttl
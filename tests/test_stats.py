@@ -0,0 +1,53 @@
+import pytest
+from app import app, db
+from models import User
+from services import stats_service
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def _login(client, student_id, password):
+    client.post('/api/auth/logout')
+    client.post('/api/auth/login', json={'student_id': student_id, 'password': password})
+
+
+def test_counters_match_rebuild(client):
+    admin = User(student_id='admin', name='管理员', is_admin=True)
+    admin.set_password('admin')
+    db.session.add(admin)
+    db.session.commit()
+
+    _login(client, 'admin', 'admin')
+    client.post('/api/admin/users', json={'student_id': '2024001', 'name': '张三', 'password': '123'})
+    client.post('/api/admin/users', json={'student_id': '2024002', 'name': '李四', 'password': '123'})
+    book_a = client.post('/api/books', json={'title': 'A', 'author': 'A', 'publisher': 'P'}).get_json()['book']
+    book_b = client.post('/api/books', json={'title': 'B', 'author': 'B', 'publisher': 'P'}).get_json()['book']
+    client.put(f"/api/books/{book_b['id']}/status", json={'status': 'unavailable'})
+
+    _login(client, '2024001', '123')
+    donation = client.post('/api/donations', json={'title': 'C'}).get_json()['donation']
+    client.post('/api/donations', json={'title': 'D'})
+    record = client.post('/api/borrows', json={'book_id': book_a['id']}).get_json()['record']
+
+    _login(client, 'admin', 'admin')
+    client.put(f"/api/admin/donations/{donation['id']}/approve")
+    client.put(f"/api/admin/borrows/{record['id']}/approve")
+
+    counters = {k: v for k, v in stats_service.get_stats().items() if v}
+    assert counters == stats_service.rebuild_stats()
+    assert counters['books.total'] == 3
+    assert counters['borrows.status.approved'] == 1
+
+    dashboard = client.get('/api/admin/dashboard').get_json()['stats']
+    assert dashboard['total_users'] == 2
+    assert dashboard['borrowed_books'] == 1
+    assert dashboard['pending_donations'] == 1
@@ -0,0 +1,42 @@
+import pytest
+from app import app, db
+from models import Book, Tag
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def test_tag_filter_is_exact(client):
+    db.session.add_all([
+        Book(title='人工智能', author='A', publisher='P', tags='AI,科普'),
+        Book(title='生成式模型', author='A', publisher='P', tags='AIGC，科普'),
+    ])
+    db.session.commit()
+
+    data = client.get('/api/books?tag=AI').get_json()
+    assert [b['title'] for b in data['books']] == ['人工智能']
+
+    data = client.get('/api/tags').get_json()
+    assert data['tags'][0] == {'name': '科普', 'count': 2}
+    assert {'name': 'AIGC', 'count': 1} in data['tags']
+
+
+def test_tags_follow_book_updates(client):
+    book = Book(title='三体', author='刘慈欣', publisher='P', tags='科幻')
+    db.session.add(book)
+    db.session.commit()
+
+    book.tags = '科幻, 经典'
+    db.session.commit()
+
+    assert sorted(t.name for t in book.tag_items) == ['科幻', '经典']
+    assert Tag.query.count() == 2
+    assert client.get('/api/books?tag=经典').get_json()['books'][0]['tags'] == ['科幻', '经典']
@@ -0,0 +1,82 @@
+import io
+import pytest
+from app import app, db
+from models import User, WishList, DonationRequest, Notification
+from services import import_service
+from services.isbn_service import to_isbn13
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+def _users():
+    admin = User(student_id='admin', name='Admin', is_admin=True)
+    admin.set_password('admin')
+    students = [User(student_id=f'20240{i}', name=f'U{i}') for i in range(4)]
+    for u in students:
+        u.set_password('123')
+    db.session.add_all([admin] + students)
+    db.session.commit()
+    return admin, students
+
+
+def test_to_isbn13():
+    assert to_isbn13('7-5366-9293-5') == '9787536692930'
+    assert to_isbn13('978-7-5366-9293-0') == '9787536692930'
+    assert to_isbn13('0-306-40615-2') == '9780306406157'
+    assert to_isbn13('9787536692931') is None
+    assert to_isbn13('') is None
+
+
+def test_most_wanted_groups_same_book(client):
+    admin, students = _users()
+    db.session.add_all([
+        WishList(user_id=students[0].id, book_title='三体', author='刘慈欣', isbn='7-5366-9293-5'),
+        WishList(user_id=students[1].id, book_title='三体', isbn='978-7-5366-9293-0'),
+        WishList(user_id=students[2].id, book_title='《三体》', author='刘慈欣'),
+        WishList(user_id=students[3].id, book_title='三 体', author='刘慈欣'),
+        WishList(user_id=students[0].id, book_title='Python', author='A'),
+    ])
+    db.session.commit()
+
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+    books = client.get('/api/admin/wishlists/most-wanted').get_json()['books']
+    assert [(b['book_title'], b['wishers']) for b in books] == [('三体', 2), ('《三体》', 2), ('Python', 1)]
+    assert books[0]['isbn'] == '9787536692930'
+
+
+def test_new_books_fulfil_wishes(client):
+    admin, students = _users()
+    db.session.add_all([
+        WishList(user_id=students[0].id, book_title='三体', isbn='7-5366-9293-5'),
+        WishList(user_id=students[1].id, book_title='《三体》'),
+        WishList(user_id=students[2].id, book_title='三体', author='别人'),
+        WishList(user_id=students[3].id, book_title='三体', isbn='9780306406157'),
+        WishList(user_id=students[0].id, book_title='活着', author='余华'),
+        WishList(user_id=students[1].id, book_title='Python'),
+    ])
+    db.session.add(DonationRequest(user_id=students[2].id, title='活着', author='余华', publisher='P'))
+    db.session.commit()
+    client.post('/api/auth/login', json={'student_id': 'admin', 'password': 'admin'})
+
+    response = client.post('/api/books', json={
+        'title': '三体', 'author': '刘慈欣', 'publisher': '重庆出版社', 'isbn': '9787536692930'})
+    assert response.get_json()['fulfilled_wishes'] == 2
+    fulfilled = WishList.query.filter_by(status='fulfilled').order_by(WishList.id).all()
+    assert [w.user_id for w in fulfilled] == [students[0].id, students[1].id]
+    assert fulfilled[0].fulfilled_book_id == response.get_json()['book']['id']
+    assert Notification.query.filter_by(kind='wish_fulfilled').count() == 2
+
+    donation = DonationRequest.query.one()
+    assert client.put(f'/api/admin/donations/{donation.id}/approve').get_json()['fulfilled_wishes'] == 1
+
+    import_service.import_books(io.StringIO('title,author,publisher\npython,B,P\n'), 'csv')
+    assert WishList.query.filter_by(status='pending').count() == 2